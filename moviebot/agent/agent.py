@@ -7,11 +7,29 @@ from dialoguekit.core import AnnotatedUtterance, Intent, Utterance
 from dialoguekit.participant import Agent, DialogueParticipant
 from moviebot.core.core_types import DialogueOptions
 from moviebot.core.intents.agent_intents import AgentIntents
+from moviebot.database.connection_pool import configure_connection_pools
 from moviebot.database.db_movies import DataBase
+from moviebot.database.db_movies_fts import FTSDataBase
+from moviebot.database.db_movies_inverted import InvertedIndexDataBase
+from moviebot.database.facet_index import get_facet_index
+from moviebot.database.query_budget import configure_query_budget
+from moviebot.database.result_cache import configure_result_cache
+from moviebot.database.similarity_index import get_similarity_index
+from moviebot.database.slot_statistics import get_slot_statistics
 from moviebot.dialogue_manager.dialogue_manager import DialogueManager
 from moviebot.domain.movie_domain import MovieDomain
 from moviebot.nlg.nlg import NLG
 from moviebot.nlu.rule_based_nlu import RuleBasedNLU as NLU
+from moviebot.nlu.text_processing import configure_tokenizer
+from moviebot.recommender.collaborative_filtering_recommender_model import (
+    CollaborativeFilteringRecommenderModel,
+)
+from moviebot.recommender.content_vector_recommender_model import (
+    ContentVectorRecommenderModel,
+)
+from moviebot.recommender.indexed_slot_based_recommender_model import (
+    IndexedSlotBasedRecommenderModel,
+)
 from moviebot.recommender.recommender_model import RecommenderModel
 from moviebot.recommender.slot_based_recommender_model import (
     SlotBasedRecommenderModel,
@@ -20,20 +38,34 @@ from moviebot.recommender.slot_based_recommender_model import (
 logger = logging.getLogger(__name__)
 
 
-def _get_db(db_path: str) -> DataBase:
+def _get_db(db_path: str, backend: str = "sql") -> DataBase:
     """Checks if the database file exists and get the file.
 
+    Database backends supported: sql, fts5, inverted.
+
     Args:
         db_path: The path to the file.
+        backend: Database backend used for lookups. Defaults to "sql".
 
     Returns:
         The database class instance.
+
+    Raises:
+        FileNotFoundError: If the database file does not exist.
+        ValueError: If the database backend is not supported.
     """
-    if os.path.isfile(db_path):
-        return DataBase(db_path)
-    else:
+    if not os.path.isfile(db_path):
         raise FileNotFoundError(f"Database file {db_path} not found.")
 
+    if backend == "sql":
+        return DataBase(db_path)
+    elif backend == "fts5":
+        return FTSDataBase(db_path)
+    elif backend == "inverted":
+        return InvertedIndexDataBase(db_path)
+
+    raise ValueError(f"Database backend {backend} is not supported.")
+
 
 class MovieBotAgent(Agent):
     def __init__(self, config: Dict[str, Any] = None) -> None:
@@ -58,7 +90,24 @@ class MovieBotAgent(Agent):
         domain_path = self.config.get("DATA", {}).get("domain_path")
         self.domain = MovieDomain(domain_path) if domain_path else None
         db_path = self.config.get("DATA", {}).get("db_path")
-        self.database = _get_db(db_path) if db_path else None
+        db_backend = self.config.get("DATA", {}).get("db_backend", "sql")
+        catalog_config = self.config.get("DATA", {}).get("catalog")
+        if catalog_config:
+            configure_connection_pools(**catalog_config)
+        result_cache_config = self.config.get("DATA", {}).get("result_cache")
+        if result_cache_config:
+            configure_result_cache(**result_cache_config)
+        query_budget_config = self.config.get("DATA", {}).get("query_budget")
+        if query_budget_config:
+            configure_query_budget(**query_budget_config)
+        lemma_lexicon_path = self.config.get("DATA", {}).get(
+            "lemma_lexicon_path"
+        )
+        if lemma_lexicon_path:
+            configure_tokenizer(lemma_lexicon_path)
+        self.database = _get_db(db_path, db_backend) if db_path else None
+        if self.database:
+            self.database.top_lists.load(self.database.catalog_version)
         self.slot_values_path = self.config.get("DATA", {}).get(
             "slot_values_path"
         )
@@ -76,10 +125,27 @@ class MovieBotAgent(Agent):
             self.config.get("RECOMMENDER", "slot_based")
         )
 
+        similarity_index = (
+            get_similarity_index(self.database) if self.database else None
+        )
         self.data_config = dict(
             domain=self.domain,
             database=self.database,
             recommender=_recommender,
+            similarity_index=similarity_index,
+            slot_statistics=(
+                get_slot_statistics(self.database.connection_pool)
+                if self.database
+                else None
+            ),
+            facet_index=(
+                get_facet_index(self.database.connection_pool)
+                if self.database
+                else None
+            ),
+            wikipedia_fallback=self.config.get("DATA", {}).get(
+                "wikipedia_fallback", True
+            ),
             slot_values_path=self.slot_values_path,
             tag_words_slots_path=nlu_tag_words_slots_path,
         )
@@ -102,7 +168,8 @@ class MovieBotAgent(Agent):
     def _get_recommender(self, recommender_type: str) -> RecommenderModel:
         """Creates a recommender model of given type.
 
-        Recommender types supported: slot_based.
+        Recommender types supported: slot_based, slot_based_index,
+        content_vector, collaborative_filtering.
 
         Args:
             recommender_type: Recommender type.
@@ -115,6 +182,18 @@ class MovieBotAgent(Agent):
         """
         if recommender_type == "slot_based":
             return SlotBasedRecommenderModel(self.database, self.domain)
+        elif recommender_type == "slot_based_index":
+            return IndexedSlotBasedRecommenderModel(self.database, self.domain)
+        elif recommender_type == "content_vector":
+            return ContentVectorRecommenderModel(self.database, self.domain)
+        elif recommender_type == "collaborative_filtering":
+            return CollaborativeFilteringRecommenderModel(
+                self.database,
+                self.domain,
+                self.config.get("DATA", {}).get(
+                    "item_factors_path", "data/item_factors"
+                ),
+            )
 
         raise ValueError(f"{recommender_type} is not supported.")
 
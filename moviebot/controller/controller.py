@@ -14,6 +14,7 @@ from dialoguekit.participant import User
 from dialoguekit.platforms import Platform as DialogueKitPlatform
 from moviebot.connector.dialogue_connector import MovieBotDialogueConnector
 from moviebot.core.utterance.utterance import UserUtterance
+from moviebot.database.connection_pool import get_connection_pool
 
 if TYPE_CHECKING:
     from moviebot.agent.agent import MovieBotAgent
@@ -72,11 +73,9 @@ class Controller(DialogueKitPlatform, ABC):
         return utterance.text == RESTART
 
     def get_cursor(self) -> sqlite3.Cursor:
-        """Returns SQL cursor."""
+        """Returns SQL cursor from the shared catalog connection pool."""
         db_path = self._config["config"]["DATA"]["db_path"]
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        return c
+        return get_connection_pool(db_path).cursor()
 
     def get_user_history_path(self, path: str, user_id: str) -> str:
         """Returns the path to conversation history for a given user.
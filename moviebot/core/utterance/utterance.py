@@ -10,7 +10,7 @@ from typing import List
 
 from dialoguekit.core import Utterance
 from dialoguekit.participant import DialogueParticipant
-from moviebot.nlu.text_processing import Token, Tokenizer
+from moviebot.nlu.text_processing import Token, get_tokenizer
 
 
 @dataclass(eq=True, unsafe_hash=True)
@@ -28,7 +28,7 @@ class UserUtterance(Utterance):
             List[Token]: List of tokens from the utterance.
         """
         if not hasattr(self, "_tokens"):
-            self._tokens = Tokenizer().process_text(self.text)
+            self._tokens = get_tokenizer().process_text(self.text)
 
         return self._tokens
 
@@ -0,0 +1,268 @@
+"""Builds the movie catalog from a CSV or JSONL export.
+
+The build streams the source file into a new database in bulk transactions,
+with typed numeric columns (see `catalog_schema`), and in the same pass
+collects the slot values loaded by the NLU and their frequencies. It then
+creates the indexes, the normalized slot value tables, the slot statistics,
+and the FTS5 index, and stamps the `catalog_info` table with the schema
+version and a hash of the content. The runtime refuses catalogs built with
+another schema version, and caches are keyed by the content version. The
+database is written to a temporary file and moved into place once complete,
+so a running agent never sees a partial catalog.
+
+Usage: python -m moviebot.database.build_catalog -s <path_to_source>
+    -d <path_to_db> --slot_values_path <path_to_slot_values>
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from moviebot.database.catalog_schema import (
+    NUMERIC_COLUMNS,
+    SCHEMA_VERSION,
+    get_column_definitions,
+    get_index_statements,
+)
+from moviebot.database.connection_pool import CATALOG_INFO_TABLE
+from moviebot.database.db_movies_fts import build_fts_index
+from moviebot.database.db_movies_inverted import build_slot_value_tables
+from moviebot.database.slot_statistics import write_slot_statistics
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.data_loader import DEFAULT_SLOT_VALUE_PATH
+from moviebot.nlu.slot_values import SlotValueCollector, normalize_value
+
+# Number of movies inserted per transaction.
+BATCH_SIZE = 10000
+# Page size of the built database, in bytes.
+PAGE_SIZE = 8192
+
+logger = logging.getLogger(__name__)
+
+
+def read_records(source_path: str) -> Iterator[Dict[str, Any]]:
+    """Reads movies from a CSV file with a header or a JSONL file.
+
+    Args:
+        source_path: Path to the source file. Files with the `.jsonl`
+          extension are read as JSON lines, others as CSV.
+
+    Yields:
+        Movies with column names as keys.
+    """
+    with open(source_path, newline="", encoding="utf-8") as source_file:
+        if source_path.endswith(".jsonl"):
+            for line in source_file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(source_file)
+
+
+def convert_value(column: str, value: Any) -> Any:
+    """Converts a source value to the type of its column.
+
+    Args:
+        column: Column name.
+        value: Source value.
+
+    Returns:
+        Converted value, None for empty values.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if column not in NUMERIC_COLUMNS:
+        return str(value)
+    if NUMERIC_COLUMNS[column] == "INTEGER":
+        return int(float(value))
+    return float(value)
+
+
+def _insert_batch(
+    connection: sqlite3.Connection, statement: str, batch: List[Tuple]
+) -> None:
+    """Inserts a batch of movies in a single transaction.
+
+    Args:
+        connection: SQLite connection.
+        statement: Parameterized insert statement.
+        batch: Rows to insert.
+    """
+    with connection:
+        connection.executemany(statement, batch)
+
+
+def build_catalog(
+    source_path: str,
+    db_path: str,
+    table_name: str = "movies",
+    slot_values_path: str = DEFAULT_SLOT_VALUE_PATH,
+    slots: List[str] = None,
+    lemmatize: Callable[[str], str] = normalize_value,
+    fts: bool = True,
+) -> str:
+    """Builds a catalog and the slot values file from a source file.
+
+    Args:
+        source_path: Path to the CSV or JSONL file with movies.
+        db_path: Path to the database file, replaced if it exists.
+        table_name (optional): Name of the movies table. Defaults to "movies".
+        slot_values_path (optional): Path to the slot values file, not written
+          if None. Defaults to DEFAULT_SLOT_VALUE_PATH.
+        slots (optional): Slots to collect values for. Defaults to the
+          annotated slots of the movie domain.
+        lemmatize (optional): Function lemmatizing slot values. Defaults to
+          normalize_value.
+        fts (optional): Whether to build the FTS5 index. Defaults to True.
+
+    Raises:
+        ValueError: If the source has no title or rating column.
+
+    Returns:
+        Version of the built catalog.
+    """
+    if slots is None:
+        slots = MovieDomain("data/movies_domain.yaml").slots_annotation
+    records = read_records(source_path)
+    first = next(records, {})
+    columns = list(first)
+    for column in (Slots.TITLE.value, Slots.RATING.value):
+        if column not in columns:
+            raise ValueError(f"Source {source_path} has no {column} column.")
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    connection.execute(f"PRAGMA page_size = {PAGE_SIZE};")
+    connection.execute("PRAGMA journal_mode = OFF;")
+    connection.execute("PRAGMA synchronous = OFF;")
+    connection.execute(
+        f"CREATE TABLE {table_name} "
+        f"({', '.join(get_column_definitions(columns))});"
+    )
+
+    insert = (
+        f"INSERT INTO {table_name} "
+        f"VALUES ({', '.join('?' for _ in columns)});"
+    )
+    collector = SlotValueCollector(slots, lemmatize)
+    content_hash = hashlib.sha1(SCHEMA_VERSION.encode())
+    count, batch = 0, []
+    for record in itertools.chain([first], records):
+        row = tuple(
+            convert_value(column, record.get(column)) for column in columns
+        )
+        batch.append(row)
+        collector.add(dict(zip(columns, row)))
+        content_hash.update(repr(row).encode())
+        if len(batch) == BATCH_SIZE:
+            _insert_batch(connection, insert, batch)
+            count += len(batch)
+            batch = []
+            logger.info(f"{count} movies inserted.")
+    _insert_batch(connection, insert, batch)
+    count += len(batch)
+
+    with connection:
+        for statement in get_index_statements(table_name, columns):
+            connection.execute(statement)
+    connection.close()
+
+    slot_values = collector.slot_values
+    build_slot_value_tables(tmp_path, table_name, slot_values, lemmatize)
+    version = content_hash.hexdigest()
+    write_slot_statistics(tmp_path, collector.frequencies, version)
+    if fts:
+        build_fts_index(tmp_path, table_name)
+
+    connection = sqlite3.connect(tmp_path)
+    with connection:
+        connection.execute(
+            f"CREATE TABLE {CATALOG_INFO_TABLE} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;"
+        )
+        connection.executemany(
+            f"INSERT INTO {CATALOG_INFO_TABLE} VALUES (?, ?);",
+            [
+                ("schema_version", SCHEMA_VERSION),
+                ("catalog_version", version),
+                ("table_name", table_name),
+                ("movies", str(count)),
+                (
+                    "built_at",
+                    time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                ),
+            ],
+        )
+        connection.execute("ANALYZE;")
+    connection.execute("PRAGMA journal_mode = DELETE;")
+    connection.close()
+    os.replace(tmp_path, db_path)
+    logger.info(f"Catalog {db_path} built with {count} movies.")
+
+    if slot_values_path:
+        with open(slot_values_path, "w") as slot_values_file:
+            json.dump(slot_values, slot_values_file, indent=4)
+        logger.info(f"Slot values written to {slot_values_path}.")
+    return version
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Builds the movie catalog from a CSV or JSONL file."
+    )
+    parser.add_argument(
+        "-s",
+        "--source_path",
+        type=str,
+        help="Path to the CSV or JSONL file with movies",
+        required=True,
+    )
+    parser.add_argument(
+        "-d",
+        "--db_path",
+        type=str,
+        help="Path to the database file",
+        default="data/movies_dbase.db",
+    )
+    parser.add_argument(
+        "--slot_values_path",
+        type=str,
+        help="Path to the slot values file",
+        default=DEFAULT_SLOT_VALUE_PATH,
+    )
+    parser.add_argument(
+        "--no_fts",
+        action="store_true",
+        help="Skip building the FTS5 index",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    build_catalog(
+        args.source_path,
+        args.db_path,
+        slot_values_path=args.slot_values_path,
+        fts=not args.no_fts,
+    )
@@ -0,0 +1,323 @@
+"""In-memory index of the movie catalog.
+
+The catalog is read-only while serving users, so it can be loaded once per
+process into columnar NumPy arrays. Rows are sorted by rating, and every slot
+value maps to a sorted array of row positions. Constraints of the current
+information needs are then evaluated as vectorized intersections and
+differences of these arrays, and the matching rows come out already in rating
+order, without querying SQLite.
+
+Values that do not match exactly are looked up as token sequences of the
+stored values in a positional inverted index (see `value_index`), the last
+token being matched as a prefix, e.g., "tom hank" for "Tom Hanks". Lookups
+return a lazy sequence over the matching rows, so dictionaries are only built
+for the movies that are actually read.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.facet_index import get_year_mask
+from moviebot.database.query_builder import (
+    MIN_RATING,
+    NEGATION_PREFIX,
+    iter_constraint_values,
+)
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.slot_values import split_slot_value
+from moviebot.nlu.annotation.value_index import ValueIndex
+
+INDEXED_SLOTS = [
+    Slots.GENRES.value,
+    Slots.KEYWORDS.value,
+    Slots.ACTORS.value,
+    Slots.DIRECTORS.value,
+    Slots.TITLE.value,
+]
+_EMPTY = np.empty(0, dtype=np.int32)
+_WORD = re.compile(r"\w+")
+
+_indexes: Dict[str, "MovieCatalogIndex"] = {}
+_indexes_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class MovieCatalogIndex:
+    def __init__(self, db: DataBase) -> None:
+        """Loads the movies rated above the minimum rating into memory.
+
+        Args:
+            db: Database with available items.
+        """
+        cursor = db.sql_connection.cursor()
+        cursor.execute(
+            f"SELECT rowid, * FROM {db.db_table_name} "
+            f"WHERE {Slots.RATING.value} > ? "
+            f"ORDER BY {Slots.RATING.value} DESC, rowid;",
+            (MIN_RATING,),
+        )
+        self.columns = [x[0] for x in cursor.description][1:]
+        rows = cursor.fetchall()
+        self.size = len(rows)
+
+        self.rowids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._data: Dict[str, np.ndarray] = {}
+        for i, column in enumerate(self.columns, start=1):
+            values = np.empty(self.size, dtype=object)
+            values[:] = [row[i] for row in rows]
+            self._data[column] = values
+        self._years = np.array(
+            [self._to_year(year) for year in self._data[Slots.YEAR.value]],
+            dtype=np.int32,
+        )
+        self._postings = {
+            slot: self._build_postings(slot) for slot in INDEXED_SLOTS
+        }
+        self._value_indexes = {
+            slot: self._build_value_index(slot) for slot in INDEXED_SLOTS
+        }
+        logger.info(f"Catalog index with {self.size} movies loaded.")
+
+    def _to_year(self, year: Any) -> int:
+        """Converts a stored year to an integer (-1 if it is not a year)."""
+        try:
+            return int(year)
+        except (TypeError, ValueError):
+            return -1
+
+    def _build_postings(self, slot: str) -> Dict[str, np.ndarray]:
+        """Maps every value of a slot to the sorted positions of its rows.
+
+        Args:
+            slot: Slot name.
+
+        Returns:
+            Dictionary with lowercased slot values as keys.
+        """
+        postings: Dict[str, List[int]] = {}
+        for position, value in enumerate(self._data[slot]):
+            values = (
+                [value]
+                if slot == Slots.TITLE.value
+                else split_slot_value(slot, value)
+            )
+            for key in {str(v).lower() for v in values if v}:
+                postings.setdefault(key, []).append(position)
+        return {
+            key: np.array(positions, dtype=np.int32)
+            for key, positions in postings.items()
+        }
+
+    def _build_value_index(
+        self, slot: str
+    ) -> Tuple[ValueIndex, List[List[str]]]:
+        """Indexes the words of the values of a slot.
+
+        Args:
+            slot: Slot name.
+
+        Returns:
+            Tuple with the index of the values, with their words separated by
+            spaces, and the keys of the postings of each indexed value.
+        """
+        keys: Dict[str, List[str]] = {}
+        for key in self._postings[slot]:
+            words = " ".join(_WORD.findall(key))
+            if words:
+                keys.setdefault(words, []).append(key)
+        return ValueIndex(keys), list(keys.values())
+
+    def get_postings(self, slot: str, value: str) -> np.ndarray:
+        """Returns the sorted positions of rows matching a slot value.
+
+        Values are matched exactly (ignoring case). If there is no exact
+        match, rows having a value that contains the words of the given
+        value, the last one as a prefix, are returned.
+
+        Args:
+            slot: Slot name.
+            value: Slot value.
+
+        Returns:
+            Array of row positions.
+        """
+        slot_postings = self._postings[slot]
+        key = value.strip().lower()
+        if key in slot_postings:
+            return slot_postings[key]
+
+        words = _WORD.findall(key)
+        value_index, value_keys = self._value_indexes[slot]
+        partial = [
+            slot_postings[key]
+            for value_id in value_index.match(words)
+            for key in value_keys[value_id]
+        ]
+        if not partial:
+            return _EMPTY
+        return np.unique(np.concatenate(partial))
+
+    def lookup(
+        self,
+        frame_CIN: Dict[str, Any],
+        domain: MovieDomain,
+        limit: Optional[int] = None,
+    ) -> np.ndarray:
+        """Returns the rows matching the current information needs.
+
+        Args:
+            frame_CIN: Current information needs.
+            domain: Domain to check specific parameters.
+            limit (optional): Maximum number of rows. Defaults to None.
+
+        Returns:
+            Row positions in rating order.
+        """
+        positive: List[np.ndarray] = []
+        negative: List[np.ndarray] = []
+        years: List[str] = []
+        for slot, value in iter_constraint_values(frame_CIN, domain):
+            if slot == Slots.YEAR.value:
+                years.append(value)
+            elif slot in self._postings:
+                negated = value.startswith(NEGATION_PREFIX)
+                postings = self.get_postings(
+                    slot, value.replace(NEGATION_PREFIX, "")
+                )
+                (negative if negated else positive).append(postings)
+
+        positions = self._intersect(positive)
+        for postings in negative:
+            if len(positions) == 0:
+                break
+            positions = np.setdiff1d(positions, postings, assume_unique=True)
+        for value in years:
+            positions = positions[get_year_mask(self._years[positions], value)]
+
+        return positions[:limit] if limit is not None else positions
+
+    def _intersect(self, postings: List[np.ndarray]) -> np.ndarray:
+        """Intersects posting arrays, starting with the shortest one.
+
+        Args:
+            postings: Sorted arrays of row positions.
+
+        Returns:
+            Sorted array of row positions, all rows if there are no postings.
+        """
+        if not postings:
+            return np.arange(self.size, dtype=np.int32)
+        postings = sorted(postings, key=len)
+        positions = postings[0]
+        for other in postings[1:]:
+            if len(positions) == 0:
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def lookup_titles(self, titles: Iterable[str]) -> np.ndarray:
+        """Returns the rows of movies with the given titles.
+
+        Args:
+            titles: Movie titles.
+
+        Returns:
+            Row positions in rating order.
+        """
+        title_postings = self._postings[Slots.TITLE.value]
+        postings = [
+            title_postings[key]
+            for key in {title.strip().lower() for title in titles}
+            if key in title_postings
+        ]
+        if not postings:
+            return _EMPTY
+        return np.unique(np.concatenate(postings))
+
+    def get_item(self, position: int) -> Dict[str, Any]:
+        """Returns the row at a given position as a dictionary.
+
+        Args:
+            position: Row position.
+
+        Returns:
+            Movie.
+        """
+        return {column: self._data[column][position] for column in self.columns}
+
+    def get_items(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        """Returns the rows at the given positions as dictionaries.
+
+        Args:
+            positions: Row positions.
+
+        Returns:
+            List of movies.
+        """
+        columns: List[Tuple[Any, ...]] = [
+            self._data[column][positions].tolist() for column in self.columns
+        ]
+        return [dict(zip(self.columns, row)) for row in zip(*columns)]
+
+
+class CatalogResults(Sequence[Dict[str, Any]]):
+    def __init__(
+        self, catalog_index: MovieCatalogIndex, positions: np.ndarray
+    ) -> None:
+        """Lazy sequence of the rows of a lookup in the catalog index.
+
+        Rows are only converted to dictionaries when they are read, e.g.,
+        when the next movie to recommend is searched for.
+
+        Args:
+            catalog_index: Catalog index the rows belong to.
+            positions: Row positions in rating order.
+        """
+        self._catalog_index = catalog_index
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        """Returns the row at the given position.
+
+        Args:
+            index: Position in rating order.
+
+        Raises:
+            IndexError: If there is no row at the position.
+        """
+        return self._catalog_index.get_item(self.positions[index])
+
+    def get_rowids(self) -> np.ndarray:
+        """Returns the row ids of all rows.
+
+        Returns:
+            Array of row ids in rating order.
+        """
+        return self._catalog_index.rowids[self.positions]
+
+
+def get_catalog_index(db: DataBase) -> MovieCatalogIndex:
+    """Returns the catalog index shared by the process for a database.
+
+    Args:
+        db: Database with available items.
+
+    Returns:
+        Catalog index.
+    """
+    key = os.path.abspath(db.db_file_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = MovieCatalogIndex(db)
+        return _indexes[key]
@@ -0,0 +1,187 @@
+"""Schema of the movie catalog.
+
+The original catalog stores all columns without type affinity, so year and
+rating comparisons and the ordering by rating cannot use an index. The
+migration in this module rebuilds the movies table with typed numeric columns
+(keeping row ids, so the auxiliary tables remain valid) and creates indexes
+matching the lookups:
+
+- `(imdb_rating DESC, ID, title)` returns candidate movies in rating order
+  without sorting, and covers the candidate columns.
+- `(year, imdb_rating)` answers year and decade constraints with a range
+  scan.
+
+Usage: python -m moviebot.database.catalog_schema -d <path_to_db>
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Dict, List
+
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.nlu.annotation.slots import Slots
+
+# Version of the catalog schema, stamped by the catalog build. Catalogs with
+# another schema version must be rebuilt.
+SCHEMA_VERSION = "1"
+# Types of the numeric columns, other columns are stored as text.
+NUMERIC_COLUMNS = {
+    Slots.YEAR.value: "INTEGER",
+    Slots.RATING.value: "REAL",
+    "imdb_votes": "INTEGER",
+    Slots.DURATION.value: "INTEGER",
+}
+# Indexed columns by index name suffix.
+INDEXES = {
+    "rating": [f"{Slots.RATING.value} DESC", Slots.ID.value, Slots.TITLE.value],
+    "year_rating": [Slots.YEAR.value, Slots.RATING.value],
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_column_definitions(columns: List[str]) -> List[str]:
+    """Returns the column definitions of a movies table.
+
+    Args:
+        columns: Column names.
+
+    Returns:
+        Column definitions with their types.
+    """
+    return [
+        f"{column} {NUMERIC_COLUMNS.get(column, 'TEXT')}" for column in columns
+    ]
+
+
+def get_index_statements(table_name: str, columns: List[str]) -> List[str]:
+    """Returns the statements creating the indexes of a movies table.
+
+    Indexes on columns missing from the table are skipped.
+
+    Args:
+        table_name: Name of the movies table.
+        columns: Column names of the table.
+
+    Returns:
+        List of SQL statements.
+    """
+    statements = []
+    for suffix, indexed_columns in INDEXES.items():
+        if all(column.split()[0] in columns for column in indexed_columns):
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {table_name}_{suffix}_idx "
+                f"ON {table_name} ({', '.join(indexed_columns)});"
+            )
+    return statements
+
+
+def _get_cast(column: str) -> str:
+    """Returns the expression converting a stored value to its column type.
+
+    Empty values are converted to NULL.
+
+    Args:
+        column: Column name.
+
+    Returns:
+        SQL expression.
+    """
+    if column not in NUMERIC_COLUMNS:
+        return column
+    return (
+        f"CASE WHEN trim({column}) = '' THEN NULL "
+        f"ELSE CAST({column} AS {NUMERIC_COLUMNS[column]}) END"
+    )
+
+
+def get_column_types(
+    connection: sqlite3.Connection, table_name: str
+) -> Dict[str, str]:
+    """Returns the declared types of the columns of a table.
+
+    Args:
+        connection: SQLite connection.
+        table_name: Name of the table.
+
+    Returns:
+        Dictionary with column names as keys and declared types as values.
+    """
+    return {
+        row[1]: row[2].upper()
+        for row in connection.execute(f"PRAGMA table_info({table_name});")
+    }
+
+
+def migrate_catalog(db_path: str, table_name: str) -> None:
+    """Converts a movies table to typed numeric columns and indexes it.
+
+    The migration runs in a single transaction. It is skipped for tables that
+    already have typed columns, but missing indexes are always created.
+
+    Args:
+        db_path: Path to the database file.
+        table_name: Name of the movies table.
+    """
+    connection = sqlite3.connect(db_path)
+    column_types = get_column_types(connection, table_name)
+    columns = list(column_types)
+    with connection:
+        connection.execute("BEGIN;")
+        if any(
+            column_types[column] != column_type
+            for column, column_type in NUMERIC_COLUMNS.items()
+            if column in column_types
+        ):
+            typed_table_name = f"{table_name}_typed"
+            connection.execute(f"DROP TABLE IF EXISTS {typed_table_name};")
+            connection.execute(
+                f"CREATE TABLE {typed_table_name} "
+                f"({', '.join(get_column_definitions(columns))});"
+            )
+            connection.execute(
+                f"INSERT INTO {typed_table_name} (rowid, {', '.join(columns)}) "
+                f"SELECT rowid, {', '.join(map(_get_cast, columns))} "
+                f"FROM {table_name};"
+            )
+            connection.execute(f"DROP TABLE {table_name};")
+            connection.execute(
+                f"ALTER TABLE {typed_table_name} RENAME TO {table_name};"
+            )
+            logger.info(f"Table {table_name} converted to typed columns.")
+
+        for statement in get_index_statements(table_name, columns):
+            connection.execute(statement)
+        connection.execute("ANALYZE;")
+    connection.close()
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Migrates the movie catalog to typed and indexed columns."
+    )
+    parser.add_argument(
+        "-d",
+        "--db_path",
+        type=str,
+        help="Path to the database file",
+        default="data/movies_dbase.db",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    table_name = ConnectionPool(args.db_path).table_name
+    migrate_catalog(args.db_path, table_name)
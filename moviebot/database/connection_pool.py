@@ -0,0 +1,273 @@
+"""Connection pool for the read-only movie catalog.
+
+The movie catalog is only read while serving users, so a single connection
+per worker thread is enough. Connections are opened once and reused across
+dialogue turns instead of reconnecting on every lookup. Connections are
+created with `check_same_thread=False` so that a connection owned by a thread
+that has finished can be handed over to a new worker thread.
+
+When several worker processes serve the same catalog, pools can open it as
+immutable: SQLite then skips locking and change detection, and pages are
+memory-mapped so that workers share them through the OS page cache instead
+of each filling its own page cache. The catalog file must not be modified
+while it is served this way, so the file version is checked whenever a
+connection is opened.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from moviebot.nlu.annotation.slots import Slots
+
+logger = logging.getLogger(__name__)
+
+# Table with metadata stamped by the catalog build (e.g., version).
+CATALOG_INFO_TABLE = "catalog_info"
+# Number of compiled statements kept by each connection. Queries are
+# parameterized, so statements are reused across turns with the same
+# constraint shape.
+STATEMENT_CACHE_SIZE = 256
+# Default number of bytes of the catalog memory-mapped by each connection.
+DEFAULT_MMAP_SIZE = 268435456
+
+_pools: Dict[str, "ConnectionPool"] = {}
+_pools_lock = threading.Lock()
+_pool_config = {"immutable": False, "mmap_size": 0}
+
+
+class ConnectionPool:
+    def __init__(
+        self, db_path: str, immutable: bool = False, mmap_size: int = 0
+    ) -> None:
+        """Pool of read-only SQLite connections, one per thread.
+
+        The table name and the schema of the catalog are read once, when the
+        first connection is opened, and cached for the lifetime of the pool.
+
+        Args:
+            db_path: Path to the database file.
+            immutable (optional): Whether to open the catalog as immutable,
+              without locking. Defaults to False.
+            mmap_size (optional): Number of bytes of the catalog memory-mapped
+              by each connection, 0 to disable memory mapping. Defaults to 0.
+        """
+        self.db_path = db_path
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self._file_version: Optional[str] = None
+        self._lock = threading.Lock()
+        # Connection and (weak reference to) owner thread by thread id.
+        self._connections: Dict[
+            int, Tuple[sqlite3.Connection, weakref.ref]
+        ] = {}
+        self._table_name: Optional[str] = None
+        self._columns: Optional[List[str]] = None
+        self._catalog_info: Optional[Dict[str, str]] = None
+        self._stats = {"opened": 0, "reused": 0, "handoffs": 0}
+
+    def _get_uri(self) -> str:
+        """Returns the URI used to open the catalog in read-only mode."""
+        uri = f"{Path(self.db_path).absolute().as_uri()}?mode=ro"
+        return f"{uri}&immutable=1" if self.immutable else uri
+
+    def _check_file_version(self) -> None:
+        """Checks that an immutable catalog has not been modified since the
+        first connection was opened.
+
+        Must be called while holding the pool lock.
+
+        Raises:
+            ValueError: If the catalog file has been modified.
+        """
+        stat = os.stat(self.db_path)
+        file_version = f"{stat.st_mtime_ns}-{stat.st_size}"
+        if self._file_version is None:
+            self._file_version = file_version
+        elif file_version != self._file_version:
+            raise ValueError(
+                f"Catalog {self.db_path} was modified while served as "
+                "immutable. Restart the workers to serve the new catalog."
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens a new read-only connection to the catalog."""
+        if self.immutable:
+            self._check_file_version()
+        connection = sqlite3.connect(
+            self._get_uri(),
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        if self.mmap_size:
+            connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)};")
+        return connection
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Returns the connection assigned to the calling thread.
+
+        If the thread does not have a connection yet, a connection of a
+        finished thread is handed over to it. A new connection is only opened
+        if there is none to hand over.
+
+        Returns:
+            SQLite connection.
+        """
+        thread = threading.current_thread()
+        thread_id = threading.get_ident()
+        with self._lock:
+            entry = self._connections.get(thread_id)
+            if entry and entry[1]() is thread:
+                self._stats["reused"] += 1
+                return entry[0]
+
+            connection = self._take_orphaned_connection()
+            if connection:
+                self._stats["handoffs"] += 1
+            else:
+                connection = self._connect()
+                self._stats["opened"] += 1
+            self._connections[thread_id] = (connection, weakref.ref(thread))
+
+        return connection
+
+    def _take_orphaned_connection(self) -> Optional[sqlite3.Connection]:
+        """Removes and returns a connection whose owner thread has finished.
+
+        Must be called while holding the pool lock.
+
+        Returns:
+            SQLite connection or None if all owners are still running.
+        """
+        for thread_id, (connection, owner) in list(self._connections.items()):
+            thread = owner()
+            if thread is None or not thread.is_alive():
+                del self._connections[thread_id]
+                return connection
+        return None
+
+    def cursor(self) -> sqlite3.Cursor:
+        """Returns a cursor of the connection assigned to the calling thread."""
+        return self.get_connection().cursor()
+
+    @property
+    def table_name(self) -> str:
+        """Name of the table holding the movies."""
+        if self._table_name is None:
+            self._load_schema()
+        return self._table_name
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns of the table holding the movies."""
+        if self._columns is None:
+            self._load_schema()
+        return self._columns
+
+    @property
+    def catalog_info(self) -> Dict[str, str]:
+        """Metadata stamped by the catalog build, empty for catalogs that
+        were not built with `moviebot.database.build_catalog`."""
+        if self._catalog_info is None:
+            self._load_schema()
+        return self._catalog_info
+
+    def _load_schema(self) -> None:
+        """Reads the table name, its columns, and the catalog metadata.
+
+        The movies table is the one named in the catalog metadata or else the
+        first table with title and rating columns, so that auxiliary tables
+        (e.g., indexes built offline) are skipped.
+
+        Raises:
+            ValueError: If there is no table in the database.
+        """
+        cursor = self.cursor()
+        result = cursor.execute(
+            "select * from sqlite_master where type = 'table';"
+        ).fetchall()
+
+        if not (result and result[0] and result[0][1]):
+            raise ValueError(
+                "Dialogue State Tracker cannot specify Table Name from "
+                f"database {self.db_path}"
+            )
+        tables = {}
+        for row in result:
+            tables[row[1]] = [
+                column[1]
+                for column in cursor.execute(f"PRAGMA table_info({row[1]});")
+            ]
+        catalog_info = {}
+        if CATALOG_INFO_TABLE in tables:
+            catalog_info = dict(
+                cursor.execute(f"SELECT key, value FROM {CATALOG_INFO_TABLE};")
+            )
+        table_name = catalog_info.get("table_name") or next(
+            (
+                name
+                for name, columns in tables.items()
+                if Slots.TITLE.value in columns
+                and Slots.RATING.value in columns
+            ),
+            result[0][1],
+        )
+        self._table_name, self._columns = table_name, tables[table_name]
+        self._catalog_info = catalog_info
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns statistics about the pool usage.
+
+        Returns:
+            Dictionary with the number of open connections and the number of
+            connections opened, reused and handed over between threads.
+        """
+        with self._lock:
+            return {"connections": len(self._connections), **self._stats}
+
+    def close(self) -> None:
+        """Closes all connections of the pool."""
+        with self._lock:
+            for connection, _ in self._connections.values():
+                connection.close()
+            self._connections = {}
+
+
+def configure_connection_pools(
+    immutable: bool = False, mmap_size: int = DEFAULT_MMAP_SIZE
+) -> None:
+    """Sets how the connection pools shared by the process open catalogs.
+
+    Pools created afterwards use the new settings.
+
+    Args:
+        immutable (optional): Whether to open catalogs as immutable, without
+          locking. Only set it if catalog files are never modified while
+          served. Defaults to False.
+        mmap_size (optional): Number of bytes of a catalog memory-mapped by
+          each connection. Defaults to DEFAULT_MMAP_SIZE.
+    """
+    with _pools_lock:
+        _pool_config.update(immutable=immutable, mmap_size=mmap_size)
+
+
+def get_connection_pool(db_path: str) -> ConnectionPool:
+    """Returns the connection pool shared by the process for a catalog.
+
+    Args:
+        db_path: Path to the database file.
+
+    Returns:
+        Connection pool.
+    """
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        if key not in _pools:
+            logger.info(f"Creating connection pool for {db_path}.")
+            _pools[key] = ConnectionPool(db_path, **_pool_config)
+        return _pools[key]
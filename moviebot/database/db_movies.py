@@ -5,14 +5,43 @@ IAI MovieBot. Currently, the database class is implemented for SQL DB.
 """
 
 
+import os
 import sqlite3
+from collections import Counter
 from copy import deepcopy
-from typing import Any, Dict, List, Union
-
+from typing import Counter as CounterType
+from typing import Callable, List, Optional, Tuple
+
+from moviebot.database.catalog_schema import SCHEMA_VERSION
+from moviebot.database.connection_pool import get_connection_pool
+from moviebot.database.facet_index import get_facet_index
+from moviebot.database.item_store import get_item_store
+from moviebot.database.lookup_result import (
+    LookupResult,
+    Results,
+    bounded_count,
+)
+from moviebot.database.query_budget import get_query_budget
+from moviebot.database.query_builder import (
+    EMPTY_PREDICATE,
+    NEGATION_PREFIX,
+    Predicate,
+    get_query_builder,
+    get_slot_predicate,
+    get_titles_predicate,
+    iter_constraint_values,
+)
+from moviebot.database.result_cache import (
+    get_result_cache,
+    get_result_cache_key,
+)
+from moviebot.database.slot_statistics import get_slot_statistics
+from moviebot.database.top_lists import get_top_lists
 from moviebot.dialogue_manager.dialogue_state import DialogueState
 from moviebot.domain.movie_domain import MovieDomain
-from moviebot.nlu.annotation.slots import Slots
-from moviebot.nlu.annotation.values import Values
+
+# Previous results with more movies are not narrowed down in memory.
+MAX_NARROWING_CANDIDATES = 10000
 
 
 class DataBase:
@@ -22,6 +51,11 @@ class DataBase:
     user preferences.
     """
 
+    # Whether constraints are matched as substrings of the stored values, as
+    # by the facet index. Results can then be filtered in memory (see
+    # `_narrow`) and single genre lookups answered by the top lists.
+    substring_matching = True
+
     def __init__(self, path: str) -> None:
         """Initializes the internal structures of the DataBase class.
 
@@ -32,140 +66,363 @@ class DataBase:
         self._initialize_sql()
         self.current_CIN = None
         self.backup_db_results = None
+        self._backup_constraints: Optional[CounterType[Tuple[str, str]]] = None
 
     def _initialize_sql(self) -> None:
-        """Initializes the SQL connection and the name of the table to query."""
-        self.sql_connection = sqlite3.connect(self.db_file_path)
-        self.db_table_name = self._get_table_name()
+        """Initializes the SQL connection pool and the name of the table to
+        query."""
+        self.connection_pool = get_connection_pool(self.db_file_path)
+        self.db_table_name = self.connection_pool.table_name
+        self._check_schema_version()
+        self.query_builder = get_query_builder(self.db_table_name)
+        self.result_cache = get_result_cache()
+        self.item_store = get_item_store(self.connection_pool)
+        self.slot_statistics = get_slot_statistics(self.connection_pool)
+        self.facet_index = get_facet_index(self.connection_pool)
+        self.top_lists = get_top_lists(self.connection_pool)
+        self.query_budget = get_query_budget()
+
+    @property
+    def sql_connection(self) -> sqlite3.Connection:
+        """SQL connection assigned to the current thread."""
+        return self.connection_pool.get_connection()
+
+    def _check_schema_version(self) -> None:
+        """Checks that a built catalog has the current schema version.
+
+        Raises:
+            ValueError: If the catalog was built with another schema version.
+        """
+        catalog_info = self.connection_pool.catalog_info
+        if catalog_info and catalog_info.get("schema_version") != (
+            SCHEMA_VERSION
+        ):
+            raise ValueError(
+                f"Catalog {self.db_file_path} has schema version "
+                f"{catalog_info.get('schema_version')}, expected "
+                f"{SCHEMA_VERSION}. Rebuild it with "
+                "`python -m moviebot.database.build_catalog`."
+            )
+
+    @property
+    def catalog_version(self) -> str:
+        """Version of the catalog.
+
+        It is the version stamped by the catalog build or, for other
+        catalogs, changes whenever the file is modified.
+        """
+        version = self.connection_pool.catalog_info.get("catalog_version")
+        if version:
+            return version
+        stat = os.stat(self.db_file_path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def has_table(self, table_name: str) -> bool:
+        """Checks whether a table exists in the database.
+
+        Args:
+            table_name: Name of the table.
+
+        Returns:
+            True if the table exists.
+        """
+        cursor = self.sql_connection.cursor()
+        return (
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name = ?;",
+                (table_name,),
+            ).fetchone()
+            is not None
+        )
 
-    def get_sql_condition(
+    def _require_table(self, table_name: str, build_module: str) -> None:
+        """Checks that an auxiliary table has been built in the database.
+
+        Args:
+            table_name: Name of the table.
+            build_module: Module building the table.
+
+        Raises:
+            ValueError: If the table does not exist.
+        """
+        if not self.has_table(table_name):
+            raise ValueError(
+                f"Table {table_name} not found in database "
+                f"{self.db_file_path}. Build it with "
+                f"`python -m {build_module}`."
+            )
+
+    def get_sql_predicates(
         self, dialogue_state: DialogueState, domain: MovieDomain
-    ) -> Union[str, None]:
-        """Returns the condition for a SQL query based on dialogue state.
+    ) -> List[Predicate]:
+        """Returns the predicates for a SQL query based on dialogue state.
 
         Args:
             dialogue_state: Dialogue state.
             domain: Domain to check specific parameters.
 
         Returns:
-            SQL condition if there is any.
+            List of parameterized predicates.
         """
         if dialogue_state.agent_should_offer_similar:
             similar_movies = list(dialogue_state.similar_movies.values())[0]
-            args = [
-                f'{Slots.TITLE.value} = "{title}"' for title in similar_movies
-            ]
-            return " OR ".join(args) if len(args) > 0 else None
-
-        args = []
-        for slot, values in dialogue_state.frame_CIN.items():
-            if slot not in domain.multiple_values_CIN:
-                values = [values]
-
-            args.extend(
-                [
-                    f"{slot} {self._get_value_for_query(slot, value)}"
-                    for value in values
-                    if value and value not in set(Values)
-                ]
+            predicate = get_titles_predicate(similar_movies)
+            return [predicate] if predicate else []
+
+        constraints = self.get_constraint_estimates(dialogue_state, domain)
+        if any(
+            estimate == 0 and not value.startswith(NEGATION_PREFIX)
+            for _, value, estimate in constraints
+        ):
+            return [EMPTY_PREDICATE]
+        return [
+            get_slot_predicate(
+                slot,
+                value,
+                self.slot_statistics is not None
+                and self.slot_statistics.prefers_scan(estimate),
             )
+            for slot, value, estimate in constraints
+        ]
 
-        return " AND ".join(args) if len(args) > 0 else None
+    def get_constraint_estimates(
+        self, dialogue_state: DialogueState, domain: MovieDomain
+    ) -> List[Tuple[str, str, Optional[int]]]:
+        """Returns the constraints of the current information needs with the
+        estimated number of movies matching them.
 
-    def database_lookup(
+        Constraints are sorted by their estimates, so that the most selective
+        ones are evaluated first. Constraints that cannot be estimated (e.g.,
+        without slot statistics) are kept last, in their original order.
+
+        Args:
+            dialogue_state: Dialogue state.
+            domain: Domain to check specific parameters.
+
+        Returns:
+            List of (slot, value, estimate) tuples.
+        """
+        constraints = [
+            (
+                slot,
+                value,
+                self.slot_statistics.estimate(slot, value)
+                if self.slot_statistics
+                else None,
+            )
+            for slot, value in iter_constraint_values(
+                dialogue_state.frame_CIN, domain
+            )
+        ]
+        return sorted(
+            constraints,
+            key=lambda constraint: (constraint[2] is None, constraint[2] or 0),
+        )
+
+    def get_cache_key(
         self, dialogue_state: DialogueState, domain: MovieDomain
-    ) -> List[Dict[str, Any]]:
-        """Performs an SQL query to answer a user requirement.
+    ) -> str:
+        """Returns the key of a lookup in the result cache.
 
         Args:
-            dialogue_state: The current dialogue state.
+            dialogue_state: Dialogue state.
             domain: Domain to check specific parameters.
 
         Returns:
-            The results of the SQL query.
+            Canonical hash of the lookup.
         """
-        if (
-            dialogue_state.isBot
-        ):  # restart the SQL connection if the app is running as a
-            # client-server app
-            self._initialize_sql()
+        if dialogue_state.agent_should_offer_similar:
+            similar_movies = list(dialogue_state.similar_movies.values())[0]
+            constraints = [["similar", title] for title in similar_movies]
+        else:
+            constraints = list(
+                iter_constraint_values(dialogue_state.frame_CIN, domain)
+            )
+        return get_result_cache_key(
+            type(self).__name__, self.db_file_path, constraints
+        )
 
-        sql_cursor = self.sql_connection.cursor()
-        sql_command = f"SELECT * FROM {self.db_table_name}"
-        condition = self.get_sql_condition(dialogue_state, domain)
+    def database_lookup(
+        self, dialogue_state: DialogueState, domain: MovieDomain
+    ) -> Results:
+        """Performs an SQL query to answer a user requirement.
 
-        if dialogue_state.agent_should_offer_similar and condition is None:
-            return []
+        Lookups without constraints or with a single genre or decade are
+        answered by the top lists. Other results are looked up in the result
+        cache shared by all sessions, then narrowed down from the previous
+        results, before querying the database. The previous results of the
+        session are kept in `backup_db_results`.
 
-        if (
-            self.current_CIN
-            and self.current_CIN == dialogue_state.frame_CIN
-            and not dialogue_state.agent_should_offer_similar
-        ):
+        Args:
+            dialogue_state: The current dialogue state.
+            domain: Domain to check specific parameters.
+
+        Returns:
+            The lazy result of the SQL query.
+        """
+        predicates = None
+        if dialogue_state.agent_should_offer_similar:
+            predicates = self.get_sql_predicates(dialogue_state, domain)
+            if not predicates:
+                return []
+        elif self.current_CIN and self.current_CIN == dialogue_state.frame_CIN:
             return self.backup_db_results
-        else:
-            self.current_CIN = deepcopy(dialogue_state.frame_CIN)
+        self.current_CIN = deepcopy(dialogue_state.frame_CIN)
+
+        catalog_version = self.catalog_version
+        self.item_store.check_version(catalog_version)
+        cache_key = self.get_cache_key(dialogue_state, domain)
+        if dialogue_state.agent_should_offer_similar:
+            return self._cached_lookup(
+                cache_key, catalog_version, lambda: self._lookup(predicates)
+            )
 
-        condition = f"{condition} AND " if condition else ""
-        sql_command = (
-            f"{sql_command} WHERE {condition}{Slots.RATING.value} > 5 "
-            f"ORDER BY {Slots.RATING.value} DESC;"
+        constraints = Counter(
+            iter_constraint_values(dialogue_state.frame_CIN, domain)
         )
 
-        query_result = sql_cursor.execute(sql_command).fetchall() or []
+        def lookup() -> Results:
+            result = self._narrow(constraints)
+            if result is None:
+                result = self._lookup(
+                    self.get_sql_predicates(dialogue_state, domain),
+                    lambda: self._get_fallback(constraints, catalog_version),
+                )
+            return result
+
+        result = self.top_lists.get(
+            constraints, catalog_version, self.substring_matching
+        )
+        if result is None:
+            result = self._cached_lookup(cache_key, catalog_version, lookup)
+        self.backup_db_results = result
+        self._backup_constraints = constraints
+        return result
 
-        slots = [x[0] for x in sql_cursor.description]
-        result = [dict(zip(slots, row)) for row in query_result]
+    def _cached_lookup(
+        self, cache_key: str, version: str, lookup: Callable[[], Results]
+    ) -> Results:
+        """Returns the results of a lookup from the result cache, looking
+        them up and caching them on a miss.
 
-        if not dialogue_state.agent_should_offer_similar:
-            self.backup_db_results = result
+        Args:
+            cache_key: Key of the lookup.
+            version: Current version of the catalog.
+            lookup: Function looking up the results.
 
+        Returns:
+            Results of the lookup.
+        """
+        result = self.result_cache.get(cache_key, version)
+        if result is None:
+            result = lookup()
+            self.result_cache.put(cache_key, version, result)
         return result
 
-    def _get_value_for_query(self, slot: str, value: str) -> str:
-        """Converts value to SQL query condition.
+    def _narrow(
+        self, constraints: CounterType[Tuple[str, str]]
+    ) -> Optional[Results]:
+        """Narrows down the previous results if constraints were only added.
+
+        The previous results are filtered in memory by the added constraints
+        instead of querying the database. Lookups removing or changing a
+        constraint, or adding a negated constraint or one that cannot be
+        filtered in memory, are not narrowed down. Neither are degraded
+        previous results, i.e., cut off by an interrupted query, as the
+        narrowed results would be cached as complete.
 
         Args:
-            slot: Slot the value belongs to.
-            value: Slot value.
+            constraints: Slot-value pairs of the lookup.
 
         Returns:
-            String that can be used as a condition in an SQL query.
+            Results in rating order or None if the previous results cannot be
+            narrowed down.
         """
-        if value.startswith(".NOT."):
-            value = value.replace(".NOT.", "")
-            if slot != Slots.YEAR.value:
-                value = f'NOT LIKE "%{value.strip()}%"'
-            else:
-                if value.startswith(">"):
-                    value = value.replace(">", "<")
-                elif value.startswith("<"):
-                    value = value.replace("<", ">")
-                else:
-                    value = f"NOT {value}"
-        else:
-            if slot != Slots.YEAR.value:
-                value = f'LIKE "%{value.strip()}%"'
-            elif str.isdigit(value[0]):
-                value = f"= {value}"
-        return value
+        previous = self.backup_db_results
+        if (
+            not self.substring_matching
+            or self._backup_constraints is None
+            or self._backup_constraints - constraints
+        ):
+            return None
+        added = list((constraints - self._backup_constraints).elements())
+        if not added or not all(
+            not value.startswith(NEGATION_PREFIX)
+            and self.facet_index.can_filter(slot, value)
+            for slot, value in added
+        ):
+            return None
+        if not previous:
+            return []
+        if bounded_count(previous, MAX_NARROWING_CANDIDATES + 1) > (
+            MAX_NARROWING_CANDIDATES
+        ):
+            return None
+
+        rows = list(previous)
+        if isinstance(previous, LookupResult) and previous.degraded:
+            return None
+        mask = self.facet_index.filter([row["rowid"] for row in rows], added)
+        return LookupResult.from_rows(
+            [row for row, keep in zip(rows, mask) if keep], self.item_store
+        )
+
+    def _get_fallback(
+        self, constraints: CounterType[Tuple[str, str]], version: str
+    ) -> Results:
+        """Returns approximate results of a lookup computed in memory, used
+        if its query is interrupted.
 
-    def _get_table_name(self) -> str:
-        """Gets the SQL database's table name in the database.
+        The list of all movies is filtered by the constraints the facet index
+        can check, other constraints are ignored.
+
+        Args:
+            constraints: Slot-value pairs of the lookup.
+            version: Current version of the catalog.
 
         Returns:
-            The table name.
+            Candidate movies in rating order.
         """
-        cursor = self.sql_connection.cursor()
-        result = cursor.execute(
-            "select * from sqlite_master where type = 'table';"
-        ).fetchall()
+        rows = list(self.top_lists.get(Counter(), version))
+        mask = self.facet_index.filter(
+            [row["rowid"] for row in rows],
+            [
+                (slot, value)
+                for slot, value in constraints.elements()
+                if self.facet_index.can_filter(slot, value)
+            ],
+        )
+        return [row for row, keep in zip(rows, mask) if keep]
 
-        if result and result[0] and result[0][1]:
-            db_table_name = result[0][1]
-        else:
-            raise ValueError(
-                "Dialogue State Tracker cannot specify Table Name from "
-                f"database {self.db_file_path}"
-            )
-        return db_table_name
+    def _lookup(
+        self,
+        predicates: List[Predicate],
+        fallback: Optional[Callable[[], Results]] = None,
+    ) -> Results:
+        """Returns the candidate movies matching all predicates.
+
+        Args:
+            predicates: Predicates to be satisfied.
+            fallback (optional): Function returning the results used if the
+              query is interrupted. Defaults to None, i.e., no results.
+
+        Returns:
+            Lazy result of the lookup or an empty list if no movie can match
+            the predicates.
+        """
+        if EMPTY_PREDICATE in predicates:
+            return []
+        select_sql, params = self.query_builder.build_select(predicates)
+        count_sql, _ = self.query_builder.build_count(predicates)
+        rowids_sql, _ = self.query_builder.build_rowids(predicates)
+        return LookupResult(
+            self.connection_pool.get_connection,
+            select_sql,
+            count_sql,
+            params,
+            self.item_store,
+            rowids_sql=rowids_sql,
+            budget=self.query_budget,
+            fallback=fallback,
+        )
@@ -0,0 +1,210 @@
+"""This file contains the FTS5-backed Database class for IAI MovieBot.
+
+Text slots (genres, keywords, actors, directors, and title) are indexed in a
+contentless FTS5 table that shares row ids with the movies table. Constraints
+on these slots are answered with a single MATCH query instead of scanning the
+movies table with `LIKE "%value%"`. The index is built offline with
+`build_fts_index`.
+
+Usage: python -m moviebot.database.db_movies_fts -d <path_to_db>
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import List, Optional
+
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.database.db_movies import DataBase
+from moviebot.database.query_builder import (
+    NEGATION_PREFIX,
+    Predicate,
+    get_slot_predicate,
+    iter_constraint_values,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+
+FTS_SLOTS = [
+    Slots.GENRES.value,
+    Slots.KEYWORDS.value,
+    Slots.ACTORS.value,
+    Slots.DIRECTORS.value,
+    Slots.TITLE.value,
+]
+# Porter stemming makes the lemmatized slot values (e.g., "tom hank") match
+# the stored values (e.g., "Tom Hanks").
+FTS_TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+logger = logging.getLogger(__name__)
+
+
+def get_fts_table_name(table_name: str) -> str:
+    """Returns the name of the FTS table indexing a movies table.
+
+    Args:
+        table_name: Name of the movies table.
+
+    Returns:
+        Name of the FTS table.
+    """
+    return f"{table_name}_fts"
+
+
+def get_fts_phrase(slot: str, value: str) -> str:
+    """Returns an FTS5 query matching a value in a slot column.
+
+    The value is matched as a phrase whose last token may be a prefix, which
+    mirrors substring matching of the SQL backend at the end of a value.
+
+    Args:
+        slot: Slot name.
+        value: Slot value.
+
+    Returns:
+        FTS5 query string.
+    """
+    value = value.replace('"', '""').strip()
+    return f'{slot} : "{value}" *'
+
+
+def build_fts_index(
+    db_path: str, table_name: str, slots: List[str] = FTS_SLOTS
+) -> None:
+    """Builds (or rebuilds) the FTS5 index of a movies table.
+
+    Args:
+        db_path: Path to the database file.
+        table_name: Name of the movies table.
+        slots: Slots to index. Defaults to all text slots.
+    """
+    fts_table_name = get_fts_table_name(table_name)
+    columns = ", ".join(slots)
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute(f"DROP TABLE IF EXISTS {fts_table_name};")
+        connection.execute(
+            f"CREATE VIRTUAL TABLE {fts_table_name} USING fts5({columns}, "
+            f"content='', tokenize='{FTS_TOKENIZER}');"
+        )
+        connection.execute(
+            f"INSERT INTO {fts_table_name}(rowid, {columns}) "
+            f"SELECT rowid, {columns} FROM {table_name};"
+        )
+        connection.execute(
+            f"INSERT INTO {fts_table_name}({fts_table_name}) "
+            "VALUES ('optimize');"
+        )
+    connection.close()
+    logger.info(f"FTS index {fts_table_name} built in {db_path}.")
+
+
+class FTSDataBase(DataBase):
+    """DataBase class answering text slot constraints with an FTS5 index."""
+
+    # Constraints are matched by tokens, not as substrings.
+    substring_matching = False
+
+    def _initialize_sql(self) -> None:
+        """Initializes the SQL connection pool and checks the FTS index.
+
+        Raises:
+            ValueError: If the database does not contain the FTS index.
+        """
+        super()._initialize_sql()
+        self.fts_table_name = get_fts_table_name(self.db_table_name)
+        self._require_table(self.fts_table_name, __name__)
+
+    def get_sql_predicates(
+        self, dialogue_state: DialogueState, domain: MovieDomain
+    ) -> List[Predicate]:
+        """Returns the predicates for a SQL query based on dialogue state.
+
+        Constraints on text slots are merged into MATCH queries on the FTS
+        index, other constraints are kept as SQL predicates.
+
+        Args:
+            dialogue_state: Dialogue state.
+            domain: Domain to check specific parameters.
+
+        Returns:
+            List of parameterized predicates.
+        """
+        if dialogue_state.agent_should_offer_similar:
+            return super().get_sql_predicates(dialogue_state, domain)
+
+        predicates = []
+        positive, negative = [], []
+        for slot, value in iter_constraint_values(
+            dialogue_state.frame_CIN, domain
+        ):
+            if slot not in FTS_SLOTS:
+                predicates.append(get_slot_predicate(slot, value))
+            elif value.startswith(NEGATION_PREFIX):
+                negative.append(
+                    get_fts_phrase(slot, value.replace(NEGATION_PREFIX, ""))
+                )
+            else:
+                positive.append(get_fts_phrase(slot, value))
+
+        fts_predicate = self._get_match_predicate(positive, negative)
+        if fts_predicate:
+            predicates.insert(0, fts_predicate)
+        return predicates
+
+    def _get_match_predicate(
+        self, positive: List[str], negative: List[str]
+    ) -> Optional[Predicate]:
+        """Combines phrase queries into a predicate on the FTS index.
+
+        Args:
+            positive: Phrases that must match.
+            negative: Phrases that must not match.
+
+        Returns:
+            Predicate or None if there are no phrases.
+        """
+        subquery = (
+            f"SELECT rowid FROM {self.fts_table_name} "
+            f"WHERE {self.fts_table_name} MATCH ?"
+        )
+        excluded = " OR ".join(negative)
+        if positive:
+            query = " AND ".join(positive)
+            if negative:
+                query = f"({query}) NOT ({excluded})"
+            return Predicate(f"rowid IN ({subquery})", (query,))
+        elif negative:
+            return Predicate(f"rowid NOT IN ({subquery})", (excluded,))
+        return None
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Builds the FTS5 index of the movie catalog."
+    )
+    parser.add_argument(
+        "-d",
+        "--db_path",
+        type=str,
+        help="Path to the database file",
+        default="data/movies_dbase.db",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    table_name = ConnectionPool(args.db_path).table_name
+    build_fts_index(args.db_path, table_name)
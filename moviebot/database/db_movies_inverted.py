@@ -0,0 +1,285 @@
+"""This file contains the inverted index Database class for IAI MovieBot.
+
+Multi-valued slots (genres, keywords, actors, and directors) are stored as
+comma-separated strings in the movies table. The migration in this module
+materializes them as `movie_<slot>(movie_id, value_norm)` tables holding one
+row per movie and normalized value, using the same lemmatized forms as
+`slot_values.json`. Constraints on these slots are then answered with index
+probes joined in order of selectivity, and values only match whole slot
+values (e.g., "war" no longer matches "star wars").
+
+Usage: python -m moviebot.database.db_movies_inverted -d <path_to_db>
+    -s <path_to_slot_values>
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.database.db_movies import DataBase
+from moviebot.database.query_builder import (
+    EMPTY_PREDICATE,
+    NEGATION_PREFIX,
+    Predicate,
+    get_slot_predicate,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.slot_values import normalize_value, split_slot_value
+
+INDEXED_SLOTS = [
+    Slots.GENRES.value,
+    Slots.KEYWORDS.value,
+    Slots.ACTORS.value,
+    Slots.DIRECTORS.value,
+]
+# Counting postings beyond this number does not change the join order.
+MAX_SELECTIVITY_COUNT = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def get_slot_table_name(slot: str) -> str:
+    """Returns the name of the table with the normalized values of a slot.
+
+    Args:
+        slot: Slot name.
+
+    Returns:
+        Table name.
+    """
+    return f"movie_{slot}"
+
+
+def build_slot_value_tables(
+    db_path: str,
+    table_name: str,
+    slot_values: Dict[str, Dict[str, str]] = None,
+    normalize: Callable[[str], str] = normalize_value,
+    slots: List[str] = INDEXED_SLOTS,
+) -> None:
+    """Materializes the normalized values of multi-valued slots.
+
+    Args:
+        db_path: Path to the database file.
+        table_name: Name of the movies table.
+        slot_values (optional): Lemmatized slot values, as loaded from
+          `slot_values.json`. Values missing from it are normalized with
+          `normalize`. Defaults to None.
+        normalize (optional): Function normalizing slot values. Defaults to
+          normalize_value.
+        slots (optional): Slots to materialize. Defaults to all multi-valued
+          slots.
+    """
+    slot_values = slot_values or {}
+    connection = sqlite3.connect(db_path)
+    with connection:
+        for slot in slots:
+            slot_table_name = get_slot_table_name(slot)
+            lemmas = slot_values.get(slot, {})
+            connection.execute(f"DROP TABLE IF EXISTS {slot_table_name};")
+            connection.execute(
+                f"CREATE TABLE {slot_table_name} ("
+                "value_norm TEXT NOT NULL, movie_id INTEGER NOT NULL, "
+                "PRIMARY KEY (value_norm, movie_id)) WITHOUT ROWID;"
+            )
+            rows = connection.execute(
+                f"SELECT rowid, {slot} FROM {table_name};"
+            )
+            connection.executemany(
+                f"INSERT OR IGNORE INTO {slot_table_name} VALUES (?, ?);",
+                (
+                    (lemmas.get(value) or normalize(value), movie_id)
+                    for movie_id, value_list in rows.fetchall()
+                    for value in split_slot_value(slot, value_list)
+                ),
+            )
+        connection.execute("ANALYZE;")
+    connection.close()
+    logger.info(f"Slot value tables built in {db_path}.")
+
+
+class InvertedIndexDataBase(DataBase):
+    # Constraints are matched against normalized values, not as substrings.
+    substring_matching = False
+
+    def __init__(
+        self, path: str, normalize: Callable[[str], str] = normalize_value
+    ) -> None:
+        """DataBase class answering multi-valued slot constraints with the
+        normalized slot value tables.
+
+        Args:
+            path: Path to the database file.
+            normalize (optional): Function normalizing slot values. It must
+              match the normalization used to build the tables. Defaults to
+              normalize_value.
+        """
+        self._normalize = normalize
+        super().__init__(path)
+
+    def _initialize_sql(self) -> None:
+        """Initializes the SQL connection pool and checks the slot tables.
+
+        Raises:
+            ValueError: If the database does not contain the slot tables.
+        """
+        super()._initialize_sql()
+        for slot in INDEXED_SLOTS:
+            self._require_table(get_slot_table_name(slot), __name__)
+
+    def count_postings(self, slot: str, value_norm: str) -> int:
+        """Counts the movies having a normalized slot value.
+
+        The count is capped at MAX_SELECTIVITY_COUNT.
+
+        Args:
+            slot: Slot name.
+            value_norm: Normalized slot value.
+
+        Returns:
+            Number of movies.
+        """
+        cursor = self.sql_connection.cursor()
+        return cursor.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {get_slot_table_name(slot)} "
+            "WHERE value_norm = ? LIMIT ?);",
+            (value_norm, MAX_SELECTIVITY_COUNT),
+        ).fetchone()[0]
+
+    def get_sql_predicates(
+        self, dialogue_state: DialogueState, domain: MovieDomain
+    ) -> List[Predicate]:
+        """Returns the predicates for a SQL query based on dialogue state.
+
+        Constraints on multi-valued slots are answered with a join of their
+        slot value tables, starting with the most selective value. Values
+        that most movies have are instead probed for each movie while
+        scanning in rating order, and values that are not in the slot value
+        tables (e.g., partial values) fall back to substring matching.
+
+        Args:
+            dialogue_state: Dialogue state.
+            domain: Domain to check specific parameters.
+
+        Returns:
+            List of parameterized predicates.
+        """
+        if dialogue_state.agent_should_offer_similar:
+            return super().get_sql_predicates(dialogue_state, domain)
+
+        predicates = []
+        postings: List[Tuple[int, str, str]] = []
+        constraints = self.get_constraint_estimates(dialogue_state, domain)
+        for slot, value, estimate in constraints:
+            negated = value.startswith(NEGATION_PREFIX)
+            if estimate == 0 and not negated:
+                return [EMPTY_PREDICATE]
+            scan = self.slot_statistics is not None and (
+                self.slot_statistics.prefers_scan(estimate)
+            )
+            if slot not in INDEXED_SLOTS:
+                predicates.append(get_slot_predicate(slot, value, scan))
+                continue
+
+            value_norm = self._normalize(value.replace(NEGATION_PREFIX, ""))
+            count = self.count_postings(slot, value_norm)
+            if count == 0:
+                predicates.append(get_slot_predicate(slot, value))
+            elif negated:
+                predicates.append(
+                    Predicate(
+                        f"rowid NOT IN (SELECT movie_id FROM "
+                        f"{get_slot_table_name(slot)} WHERE value_norm = ?)",
+                        (value_norm,),
+                    )
+                )
+            elif scan:
+                predicates.append(
+                    Predicate(
+                        f"EXISTS (SELECT 1 FROM {get_slot_table_name(slot)} "
+                        "WHERE value_norm = ? AND movie_id = rowid)",
+                        (value_norm,),
+                    )
+                )
+            else:
+                postings.append((count, slot, value_norm))
+
+        if postings:
+            predicates.insert(0, self._get_join_predicate(sorted(postings)))
+        return predicates
+
+    def _get_join_predicate(
+        self, postings: List[Tuple[int, str, str]]
+    ) -> Predicate:
+        """Returns a predicate joining slot value tables.
+
+        The join order is forced with CROSS JOIN, so that the most selective
+        value drives the join and the other values are primary key probes.
+
+        Args:
+            postings: Tuples of posting count, slot, and normalized value,
+              sorted by count.
+
+        Returns:
+            Predicate.
+        """
+        tables = " CROSS JOIN ".join(
+            f"{get_slot_table_name(slot)} AS t{i}"
+            for i, (_, slot, _) in enumerate(postings)
+        )
+        conditions = [f"t{i}.value_norm = ?" for i in range(len(postings))]
+        conditions.extend(
+            f"t{i}.movie_id = t0.movie_id" for i in range(1, len(postings))
+        )
+        return Predicate(
+            f"rowid IN (SELECT t0.movie_id FROM {tables} "
+            f"WHERE {' AND '.join(conditions)})",
+            tuple(value_norm for _, _, value_norm in postings),
+        )
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Builds the slot value tables of the movie catalog."
+    )
+    parser.add_argument(
+        "-d",
+        "--db_path",
+        type=str,
+        help="Path to the database file",
+        default="data/movies_dbase.db",
+    )
+    parser.add_argument(
+        "-s",
+        "--slot_values_path",
+        type=str,
+        help="Path to the lemmatized slot values",
+        default="data/slot_values.json",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    slot_values = None
+    if os.path.isfile(args.slot_values_path):
+        with open(args.slot_values_path) as slot_val_file:
+            slot_values = json.load(slot_val_file)
+    table_name = ConnectionPool(args.db_path).table_name
+    build_slot_value_tables(args.db_path, table_name, slot_values)
@@ -0,0 +1,412 @@
+"""Facet counts over candidate movies.
+
+When a lookup matches too many movies, the agent asks the user for another
+slot. To ask for the slot that narrows down the candidates the most, the
+values of every slot are counted over the candidate movies. The slot values
+of the whole catalog are loaded once per process into compressed sparse row
+arrays (the value ids of every movie), so counting the values of thousands of
+candidates is a gather and a `np.bincount` per slot instead of a GROUP BY
+query per turn.
+
+The same arrays filter candidate movies by an additional constraint, which
+lets lookups that only add constraints narrow down the previous results
+instead of querying the catalog again.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.database.query_builder import (
+    NEGATION_PREFIX,
+    parse_year_value,
+)
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.slot_values import split_slot_value
+
+FACET_SLOTS = [
+    Slots.GENRES.value,
+    Slots.KEYWORDS.value,
+    Slots.ACTORS.value,
+    Slots.DIRECTORS.value,
+    Slots.YEAR.value,
+]
+
+# Number of value masks kept per slot for filtering.
+VALUE_MASK_CACHE_SIZE = 256
+
+_indexes: Dict[str, "FacetIndex"] = {}
+_indexes_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_decade(year: object) -> Optional[str]:
+    """Returns the decade of a year, e.g., "1990s".
+
+    Args:
+        year: Stored year.
+
+    Returns:
+        Decade or None if the value is not a year.
+    """
+    year = _to_year(year)
+    return f"{year // 10 * 10}s" if year >= 0 else None
+
+
+def get_year_mask(years: np.ndarray, value: str) -> np.ndarray:
+    """Checks a year constraint for movies.
+
+    Args:
+        years: Years of the movies, -1 for movies without year.
+        value: Year value (see `parse_year_value`).
+
+    Returns:
+        Boolean mask over the movies.
+    """
+    operator, operands = parse_year_value(value)
+    if not all(isinstance(x, int) for x in operands):
+        # Values that are not years only exclude movies if negated.
+        return np.full(len(years), operator == "!=")
+    if operator in ("BETWEEN", "NOT BETWEEN"):
+        mask = (years >= operands[0]) & (years <= operands[1])
+        return ~mask if operator == "NOT BETWEEN" else mask
+
+    year = operands[0]
+    return {
+        "=": lambda: years == year,
+        "!=": lambda: years != year,
+        ">": lambda: years > year,
+        "<": lambda: years < year,
+        ">=": lambda: years >= year,
+        "<=": lambda: years <= year,
+    }[operator]()
+
+
+def _to_year(year: object) -> int:
+    """Converts a stored year to an integer (-1 if it is not a year)."""
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return -1
+
+
+class SlotFacet:
+    def __init__(self, value_lists: List[List[str]]) -> None:
+        """Value ids of every movie for a slot.
+
+        Args:
+            value_lists: Values of every movie, by movie position.
+        """
+        value_ids: Dict[str, int] = {}
+        indices: List[int] = []
+        indptr = [0]
+        for values in value_lists:
+            for value in dict.fromkeys(values):
+                indices.append(value_ids.setdefault(value, len(value_ids)))
+            indptr.append(len(indices))
+        self.values = np.array(list(value_ids), dtype=object)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self._lowercased = np.array(
+            [value.lower() for value in value_ids], dtype=str
+        )
+        self._value_masks: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _gather(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the value ids of the given movies.
+
+        Args:
+            positions: Positions of the movies.
+
+        Returns:
+            Tuple with the number of values of every movie and the
+            concatenated value ids.
+        """
+        starts = self.indptr[positions]
+        lengths = self.indptr[positions + 1] - starts
+        # Position of every value of the given movies in `indices`.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        offsets += np.arange(len(offsets))
+        return lengths, self.indices[offsets]
+
+    def count(self, positions: np.ndarray) -> np.ndarray:
+        """Counts the movies having each value among the given movies.
+
+        Args:
+            positions: Positions of the movies.
+
+        Returns:
+            Number of movies by value id.
+        """
+        _, value_ids = self._gather(positions)
+        return np.bincount(value_ids, minlength=len(self.values))
+
+    def get_value_mask(self, value: str) -> np.ndarray:
+        """Returns the values containing a given value, ignoring case, as in
+        the substring predicates of lookups.
+
+        Args:
+            value: Value to look for.
+
+        Returns:
+            Boolean mask by value id.
+        """
+        key = value.strip().lower()
+        with self._lock:
+            mask = self._value_masks.get(key)
+            if mask is not None:
+                self._value_masks.move_to_end(key)
+                return mask
+        mask = np.char.find(self._lowercased, key) >= 0
+        with self._lock:
+            self._value_masks[key] = mask
+            if len(self._value_masks) > VALUE_MASK_CACHE_SIZE:
+                self._value_masks.popitem(last=False)
+        return mask
+
+    def matches(self, positions: np.ndarray, value: str) -> np.ndarray:
+        """Checks which of the given movies have a value containing a given
+        value.
+
+        Args:
+            positions: Positions of the movies.
+            value: Value to look for.
+
+        Returns:
+            Boolean mask over the given movies.
+        """
+        lengths, value_ids = self._gather(positions)
+        hits = self.get_value_mask(value)[value_ids]
+        movies = np.repeat(np.arange(len(positions)), lengths)
+        return np.bincount(movies[hits], minlength=len(positions)) > 0
+
+
+class FacetIndex:
+    def __init__(
+        self, connection_pool: ConnectionPool, slots: List[str] = FACET_SLOTS
+    ) -> None:
+        """Counts slot values over sets of candidate movies.
+
+        The catalog is loaded on first use.
+
+        Args:
+            connection_pool: Connection pool of the catalog.
+            slots (optional): Slots to count values of. Defaults to
+              FACET_SLOTS.
+        """
+        self.connection_pool = connection_pool
+        self.slots = [slot for slot in slots if slot in connection_pool.columns]
+        self._rowids: Optional[np.ndarray] = None
+        self._years: Optional[np.ndarray] = None
+        self._facets: Dict[str, SlotFacet] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Loads the slot values of all movies, sorted by row id."""
+        with self._lock:
+            if self._rowids is not None:
+                return
+            cursor = self.connection_pool.cursor()
+            cursor.execute(
+                f"SELECT rowid, {', '.join(self.slots)} "
+                f"FROM {self.connection_pool.table_name} ORDER BY rowid;"
+            )
+            rows = cursor.fetchall()
+            for i, slot in enumerate(self.slots, start=1):
+                if slot == Slots.YEAR.value:
+                    self._years = np.array(
+                        [_to_year(row[i]) for row in rows], dtype=np.int32
+                    )
+                    value_lists = [
+                        [decade] if decade else []
+                        for decade in (get_decade(row[i]) for row in rows)
+                    ]
+                else:
+                    value_lists = [
+                        split_slot_value(slot, row[i]) for row in rows
+                    ]
+                self._facets[slot] = SlotFacet(value_lists)
+            self._rowids = np.array([row[0] for row in rows], dtype=np.int64)
+            logger.info(f"Facet index with {len(rows)} movies loaded.")
+
+    def _find(self, rowids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds movies in the index.
+
+        Args:
+            rowids: Row ids of the movies.
+
+        Returns:
+            Tuple with the positions of the movies found in the index and a
+            boolean mask over the given movies telling which were found.
+        """
+        self._load()
+        positions = np.searchsorted(self._rowids, rowids)
+        found = positions < len(self._rowids)
+        found[found] = self._rowids[positions[found]] == rowids[found]
+        return positions[found], found
+
+    def get_counts(
+        self, rowids: np.ndarray, slots: List[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """Counts the movies having each slot value among candidate movies.
+
+        Args:
+            rowids: Row ids of the candidate movies.
+            slots (optional): Slots to count values of. Defaults to all
+              indexed slots.
+
+        Returns:
+            Number of movies by value id, for every slot.
+        """
+        positions, _ = self._find(np.asarray(rowids, dtype=np.int64))
+        return {
+            slot: self._facets[slot].count(positions)
+            for slot in (self.slots if slots is None else slots)
+            if slot in self._facets
+        }
+
+    def get_histogram(
+        self, rowids: np.ndarray, slot: str, k: int = None
+    ) -> List[Tuple[str, int]]:
+        """Returns the most common values of a slot among candidate movies.
+
+        Args:
+            rowids: Row ids of the candidate movies.
+            slot: Slot name.
+            k (optional): Maximum number of values. Defaults to all values.
+
+        Returns:
+            List of (value, count) tuples sorted by count.
+        """
+        counts = self.get_counts(rowids, [slot]).get(slot)
+        if counts is None:
+            return []
+        value_ids = np.flatnonzero(counts)
+        if k is not None and k < len(value_ids):
+            top = np.argpartition(-counts[value_ids], k - 1)[:k]
+            value_ids = value_ids[top]
+        value_ids = value_ids[np.argsort(-counts[value_ids], kind="stable")]
+        values = self._facets[slot].values
+        return [(values[i], int(counts[i])) for i in value_ids]
+
+    def get_information_gain(
+        self, rowids: np.ndarray, slots: List[str] = None
+    ) -> Dict[str, float]:
+        """Returns the expected information gain of asking for each slot.
+
+        Answering with a value narrows the candidates down to the movies
+        having it. Assuming the user picks a value with probability
+        proportional to its count, the gain is the expected decrease of the
+        entropy of a uniform distribution over the candidates (in bits).
+
+        Args:
+            rowids: Row ids of the candidate movies.
+            slots (optional): Slots to consider. Defaults to all indexed
+              slots.
+
+        Returns:
+            Information gain by slot, 0 for slots without values.
+        """
+        total = len(rowids)
+        gains = {}
+        for slot, counts in self.get_counts(rowids, slots).items():
+            counts = counts[counts > 0].astype(np.float64)
+            if total == 0 or len(counts) == 0:
+                gains[slot] = 0.0
+                continue
+            remaining = float(np.dot(counts, np.log2(counts)) / counts.sum())
+            gains[slot] = float(np.log2(total)) - remaining
+        return gains
+
+    def get_values(self, slot: str) -> List[str]:
+        """Returns the distinct values of a slot in the catalog.
+
+        Years are returned as decades (see `get_decade`).
+
+        Args:
+            slot: Slot name.
+
+        Returns:
+            List of values, empty for slots that are not indexed.
+        """
+        self._load()
+        facet = self._facets.get(slot)
+        return list(facet.values) if facet else []
+
+    def can_filter(self, slot: str, value: str) -> bool:
+        """Checks whether candidates can be filtered by a constraint.
+
+        Args:
+            slot: Slot name.
+            value: Constraint value.
+
+        Returns:
+            True if the slot values are indexed and the constraint is matched
+            in the same way as by the SQL predicates.
+        """
+        if slot not in self.slots:
+            return False
+        if slot == Slots.YEAR.value:
+            return True
+        # Commas may span several values, wildcards are only interpreted by
+        # LIKE, which also only ignores the case of ASCII characters.
+        value = value.replace(NEGATION_PREFIX, "")
+        return value.isascii() and not any(c in value for c in ",%_")
+
+    def filter(
+        self, rowids: np.ndarray, constraints: Iterable[Tuple[str, str]]
+    ) -> np.ndarray:
+        """Checks which candidate movies satisfy all given constraints.
+
+        Year constraints are compared with the year of the movies, other
+        constraints are matched as substrings of the slot values, as in the
+        predicates of lookups. Negated constraints keep the movies without a
+        matching value, including movies without values, which SQL excludes
+        if the column is NULL.
+
+        Args:
+            rowids: Row ids of the candidate movies.
+            constraints: Slot-value pairs (see `can_filter`).
+
+        Returns:
+            Boolean mask over the candidate movies, False for movies missing
+            from the index.
+        """
+        rowids = np.asarray(rowids, dtype=np.int64)
+        positions, found = self._find(rowids)
+        mask = found.copy()
+        for slot, value in constraints:
+            if slot == Slots.YEAR.value:
+                years = self._years[positions]
+                # Comparisons with missing years are false in SQL.
+                mask[found] &= (years >= 0) & get_year_mask(years, value)
+            elif value.startswith(NEGATION_PREFIX):
+                mask[found] &= ~self._facets[slot].matches(
+                    positions, value.replace(NEGATION_PREFIX, "")
+                )
+            else:
+                mask[found] &= self._facets[slot].matches(positions, value)
+        return mask
+
+
+def get_facet_index(connection_pool: ConnectionPool) -> FacetIndex:
+    """Returns the facet index shared by the process for a catalog.
+
+    Args:
+        connection_pool: Connection pool of the catalog.
+
+    Returns:
+        Facet index.
+    """
+    key = os.path.abspath(connection_pool.db_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = FacetIndex(connection_pool)
+        return _indexes[key]
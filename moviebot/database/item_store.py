@@ -0,0 +1,112 @@
+"""Store of movies hydrated from the catalog.
+
+Lookups only retrieve the columns needed to select candidates (see
+`CANDIDATE_COLUMNS` in `query_builder`). The full attributes of a movie, e.g.,
+plot, cover image, and actors, are only fetched when the movie is offered to
+the user. Hydrated movies are kept in an LRU cache shared by the process,
+keyed by row id.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from moviebot.database.connection_pool import ConnectionPool
+
+# Default number of hydrated movies kept in memory.
+DEFAULT_MAX_ITEMS = 1024
+
+_stores: Dict[str, "ItemStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class ItemStore:
+    def __init__(
+        self,
+        connection_pool: ConnectionPool,
+        max_items: int = DEFAULT_MAX_ITEMS,
+    ) -> None:
+        """LRU cache of movies with all their attributes.
+
+        Args:
+            connection_pool: Connection pool of the catalog.
+            max_items (optional): Maximum number of cached movies. Defaults to
+              DEFAULT_MAX_ITEMS.
+        """
+        self.connection_pool = connection_pool
+        self.max_items = max_items
+        self._items: OrderedDict[int, Dict[str, Any]] = OrderedDict()
+        self._version: Optional[str] = None
+        self._stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def check_version(self, version: str) -> None:
+        """Discards cached movies if the catalog has changed.
+
+        Args:
+            version: Current version of the catalog.
+        """
+        with self._lock:
+            if version != self._version:
+                self._items.clear()
+                self._version = version
+
+    def get_item(self, rowid: int) -> Optional[Dict[str, Any]]:
+        """Returns a movie with all its attributes.
+
+        Args:
+            rowid: Row id of the movie.
+
+        Returns:
+            Movie or None if there is no movie with the row id.
+        """
+        with self._lock:
+            item = self._items.get(rowid)
+            if item is not None:
+                self._items.move_to_end(rowid)
+                self._stats["hits"] += 1
+                return item
+            self._stats["misses"] += 1
+
+        cursor = self.connection_pool.cursor()
+        cursor.execute(
+            f"SELECT * FROM {self.connection_pool.table_name} "
+            "WHERE rowid = ?;",
+            (rowid,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        item = dict(zip([x[0] for x in cursor.description], row))
+
+        with self._lock:
+            self._items[rowid] = item
+            if len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return item
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns cache statistics.
+
+        Returns:
+            Dictionary with the number of cached movies, hits and misses.
+        """
+        with self._lock:
+            return {"items": len(self._items), **self._stats}
+
+
+def get_item_store(connection_pool: ConnectionPool) -> ItemStore:
+    """Returns the item store shared by the process for a catalog.
+
+    Args:
+        connection_pool: Connection pool of the catalog.
+
+    Returns:
+        Item store.
+    """
+    key = os.path.abspath(connection_pool.db_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ItemStore(connection_pool)
+        return _stores[key]
@@ -0,0 +1,481 @@
+"""Lazy results of database lookups.
+
+A lookup may match thousands of movies, while a dialogue turn only needs to
+know whether there are more than `max_db_result` matches and the first movies
+that have not been recommended yet. `LookupResult` runs the query lazily,
+converts rows to dictionaries a page at a time with `fetchmany`, and counts
+matches with a separate query that stops at the given bound.
+
+Rows only hold the candidate columns (row id, ID, title, and rating). The
+other attributes of a movie are hydrated from the item store when needed.
+The row ids of all matches can be fetched at once, e.g., to count the slot
+values of the candidate movies (see `facet_index`).
+
+Every query step of a result (fetching a page of rows, counting matches,
+fetching the row ids) runs within its own time budget of `query_budget`.
+Results are cached and shared by sessions, so the time spent by earlier
+readers is not charged to later ones. If a step is interrupted, the result
+is cut off at the rows fetched so far or, if none were fetched, replaced by
+the fallback results of the lookup, and marked as degraded. The virtual
+machine instructions used by the queries are recorded in `vm_steps`.
+
+Results are shared between sessions, possibly served by different worker
+threads. A cursor is only used on the connection of the thread that opened
+it: a thread fetching more rows than its own cursor has read reopens the
+query on its own connection (see `connection_pool`) and skips the rows
+already fetched.
+
+Results are shared between sessions, so movies a session has already been
+recommended are not filtered out by the query. Instead, `ResultCursor` keeps
+the position of the next movie to recommend and skips excluded movies from
+there, so each result is checked at most once per session.
+"""
+
+import sqlite3
+import sys
+import threading
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
+
+from moviebot.database.item_store import ItemStore
+from moviebot.database.query_budget import QueryBudget, QueryTimeoutError
+from moviebot.nlu.annotation.slots import Slots
+
+# Number of rows fetched at a time.
+PAGE_SIZE = 25
+
+Results = Union["LookupResult", Sequence[Dict[str, Any]]]
+T = TypeVar("T")
+
+
+class LookupResult:
+    def __init__(
+        self,
+        get_connection: Callable[[], sqlite3.Connection],
+        select_sql: str,
+        count_sql: str,
+        params: List[Any],
+        item_store: ItemStore,
+        page_size: int = PAGE_SIZE,
+        rowids_sql: Optional[str] = None,
+        budget: Optional[QueryBudget] = None,
+        fallback: Optional[Callable[[], Results]] = None,
+    ) -> None:
+        """Results of a lookup, fetched on demand in rating order.
+
+        Fetched rows are kept, so the results can be iterated several times
+        (also from different threads) without running the query again.
+
+        Args:
+            get_connection: Function returning the connection of the calling
+              thread.
+            select_sql: Query returning the matching rows.
+            count_sql: Query counting the matching rows, with a parameter for
+              the maximum count after the lookup parameters.
+            params: Parameters of the lookup.
+            item_store: Store hydrating candidate movies.
+            page_size (optional): Number of rows fetched at a time. Defaults
+              to PAGE_SIZE.
+            rowids_sql (optional): Query returning the row ids of the matching
+              rows. If not provided, row ids are taken from the fetched rows.
+              Defaults to None.
+            budget (optional): Time budget of each query step. Defaults to
+              None, i.e., no budget.
+            fallback (optional): Function returning the results used if a
+              query step is interrupted before any row is fetched. Defaults
+              to None, i.e., no results.
+        """
+        self._get_connection = get_connection
+        self._select_sql = select_sql
+        self._count_sql = count_sql
+        self._rowids_sql = rowids_sql
+        self._rowids: Optional[np.ndarray] = None
+        self._params = params
+        self.item_store = item_store
+        self.page_size = page_size
+        # Open cursor and number of rows it has read by connection.
+        self._cursors: Dict[sqlite3.Connection, Tuple[sqlite3.Cursor, int]] = {}
+        self._rows: List[Dict[str, Any]] = []
+        self._exhausted = False
+        self._count: Optional[int] = None
+        self._nbytes = 0
+        self._budget = budget
+        self._fallback = fallback
+        self.vm_steps = 0
+        self.degraded = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rows(
+        cls, rows: List[Dict[str, Any]], item_store: ItemStore
+    ) -> "LookupResult":
+        """Creates results from rows that have already been fetched, e.g.,
+        rows of previous results filtered in memory.
+
+        Args:
+            rows: Rows in rating order.
+            item_store: Store hydrating candidate movies.
+
+        Returns:
+            Results that do not query the database.
+        """
+        result = cls(None, "", "", [], item_store)
+        result._rows = list(rows)
+        result._exhausted = True
+        result._count = len(result._rows)
+        result._nbytes = sum(
+            sys.getsizeof(row) + sum(map(sys.getsizeof, row.values()))
+            for row in result._rows
+        )
+        return result
+
+    def hydrate(self, candidate: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Returns a candidate movie with all its attributes.
+
+        Args:
+            candidate: Row of the result.
+
+        Returns:
+            Movie or None if it was removed from the catalog since the lookup.
+        """
+        return self.item_store.get_item(candidate["rowid"])
+
+    def iter_items(self) -> Iterator[Dict[str, Any]]:
+        """Iterates over the movies with all their attributes, skipping the
+        movies removed from the catalog since the lookup."""
+        for candidate in self:
+            item = self.hydrate(candidate)
+            if item is not None:
+                yield item
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the fetched rows in bytes."""
+        return self._nbytes
+
+    def _run(self, connection: sqlite3.Connection, query: Callable[[], T]) -> T:
+        """Runs a query step within its time budget, recording the virtual
+        machine instructions used.
+
+        Args:
+            connection: Connection the query runs on.
+            query: Function executing the statement or fetching its rows.
+
+        Raises:
+            QueryTimeoutError: If the step exceeded its time budget.
+
+        Returns:
+            Value returned by the function.
+        """
+        if self._budget is None:
+            return query()
+        try:
+            value, vm_steps = self._budget.run(connection, query)
+        except QueryTimeoutError as error:
+            self.vm_steps += error.vm_steps
+            raise
+        self.vm_steps += vm_steps
+        return value
+
+    def _degrade(self) -> None:
+        """Stops fetching rows after an interrupted query step.
+
+        The rows fetched so far are kept. If there are none, they are
+        replaced by the fallback results. Must be called while holding the
+        lock.
+        """
+        self._close_cursor()
+        if not self._rows and self._fallback is not None:
+            self._rows = list(self._fallback())
+        self.degraded = True
+        self._exhausted = True
+        self._count = len(self._rows)
+
+    def _close_cursor(self) -> None:
+        """Closes the cursor of the calling thread, if any. Must be called
+        while holding the lock.
+
+        Cursors of other threads are closed by these threads, or when the
+        result is garbage collected.
+        """
+        if not self._cursors:
+            return
+        cursor, _ = self._cursors.pop(self._get_connection(), (None, 0))
+        if cursor is not None:
+            cursor.close()
+
+    def _take_cursor(self, fetched: int) -> Tuple[sqlite3.Cursor, bool]:
+        """Takes the cursor of the calling thread if it is positioned after
+        the rows fetched so far, or opens a new one on the connection of the
+        thread. Must be called while holding the lock.
+
+        Args:
+            fetched: Number of rows fetched so far.
+
+        Returns:
+            Tuple with the cursor and whether the query must be run on it.
+        """
+        connection = self._get_connection()
+        cursor, position = self._cursors.pop(connection, (None, 0))
+        if cursor is not None:
+            if position == fetched:
+                return cursor, False
+            cursor.close()
+        return connection.cursor(), True
+
+    def _fetch_page(self) -> bool:
+        """Fetches the next page of rows.
+
+        The page is read with the cursor of the calling thread. If the thread
+        has no cursor, or other threads have fetched rows since it last read
+        from it, the query is run again on the connection of the thread and
+        the rows already fetched are skipped.
+
+        Returns:
+            True if rows were fetched, False if all rows have been fetched.
+        """
+        with self._lock:
+            if self._exhausted:
+                self._close_cursor()
+                return False
+            fetched = len(self._rows)
+            cursor, first = self._take_cursor(fetched)
+
+            def fetch() -> List[Any]:
+                if first:
+                    cursor.execute(self._select_sql, self._params)
+                    if fetched:
+                        cursor.fetchmany(fetched)
+                return cursor.fetchmany(self.page_size)
+
+            try:
+                rows = self._run(cursor.connection, fetch)
+            except QueryTimeoutError:
+                cursor.close()
+                self._degrade()
+                return len(self._rows) > fetched
+
+            columns = [x[0] for x in cursor.description]
+            for row in rows:
+                result = dict(zip(columns, row))
+                self._nbytes += sys.getsizeof(result) + sum(
+                    sys.getsizeof(value) for value in row
+                )
+                self._rows.append(result)
+            if len(rows) < self.page_size:
+                self._exhausted = True
+                self._count = len(self._rows)
+                cursor.close()
+            else:
+                self._cursors[cursor.connection] = (cursor, len(self._rows))
+            return bool(rows)
+
+    def get_rowids(self) -> np.ndarray:
+        """Returns the row ids of all matching rows, in no particular order.
+
+        Returns:
+            Array of row ids.
+        """
+        if self._rowids is None:
+            if self._rowids_sql is None or self._exhausted:
+                rowids = [row["rowid"] for row in self]
+            else:
+                connection = self._get_connection()
+                cursor = connection.cursor()
+                try:
+                    rowids = self._run(
+                        connection,
+                        lambda: [
+                            row[0]
+                            for row in cursor.execute(
+                                self._rowids_sql, self._params
+                            )
+                        ],
+                    )
+                except QueryTimeoutError:
+                    with self._lock:
+                        self._degrade()
+                    rowids = [row["rowid"] for row in self._rows]
+            self._rowids = np.array(rowids, dtype=np.int64)
+        return self._rowids
+
+    def bounded_count(self, limit: int) -> int:
+        """Counts matching rows, stopping at the given number.
+
+        Args:
+            limit: Maximum count, or -1 to count all rows.
+
+        Returns:
+            Number of matching rows or limit, whichever is smaller.
+        """
+        if self._count is not None:
+            return self._count if limit < 0 else min(self._count, limit)
+        if 0 <= limit <= len(self._rows):
+            return limit
+
+        connection = self._get_connection()
+        cursor = connection.cursor()
+        try:
+            count = self._run(
+                connection,
+                lambda: cursor.execute(
+                    self._count_sql, [*self._params, limit]
+                ).fetchone()[0],
+            )
+        except QueryTimeoutError:
+            with self._lock:
+                self._degrade()
+            return self.bounded_count(limit)
+        if limit < 0 or count < limit:
+            self._count = count
+        return count
+
+    def __len__(self) -> int:
+        """Counts all matching rows without fetching them."""
+        return self.bounded_count(-1)
+
+    def __bool__(self) -> bool:
+        return self.bounded_count(1) > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        i = 0
+        while i < len(self._rows) or self._fetch_page():
+            yield self._rows[i]
+            i += 1
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        """Returns the row at the given position.
+
+        Args:
+            index: Position in rating order. Negative positions fetch all
+              rows.
+
+        Raises:
+            IndexError: If there is no row at the position.
+        """
+        if index < 0:
+            while self._fetch_page():
+                pass
+        while index >= len(self._rows) and self._fetch_page():
+            pass
+        return self._rows[index]
+
+
+class ResultCursor:
+    def __init__(self) -> None:
+        """Position of the next movie to recommend in lookup results.
+
+        Movies are only added to the exclusion set of a dialogue (e.g., the
+        movies already recommended), so the search for the next movie resumes
+        where the previous search stopped instead of scanning the results
+        from the start. A new exclusion set, e.g., when the dialogue is
+        restarted, moves the cursor back to the start.
+        """
+        self._results: Optional[Results] = None
+        self._excluded: Optional[Container[str]] = None
+        self.position = 0
+
+    def next_item(
+        self, results: Results, excluded: Container[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the first result whose title is not excluded.
+
+        Args:
+            results: Lookup result or list of results.
+            excluded: Titles of excluded movies. Titles must not be removed
+              from it between calls.
+
+        Returns:
+            Result or None if all results are excluded.
+        """
+        if results is not self._results or excluded is not self._excluded:
+            self._results = results
+            self._excluded = excluded
+            self.position = 0
+        while True:
+            try:
+                result = results[self.position]
+            except IndexError:
+                return None
+            if result[Slots.TITLE.value] not in excluded:
+                return result
+            self.position += 1
+
+
+def get_rowids(results: Results) -> np.ndarray:
+    """Returns the row ids of all results.
+
+    Args:
+        results: Lookup result or list of results.
+
+    Returns:
+        Array of row ids, skipping results without row id.
+    """
+    if hasattr(results, "get_rowids"):
+        # Lazy results (e.g., lookup results) know their row ids without
+        # building all rows.
+        return results.get_rowids()
+    return np.array(
+        [result["rowid"] for result in results if "rowid" in result],
+        dtype=np.int64,
+    )
+
+
+def bounded_count(results: Results, limit: int) -> int:
+    """Counts results, stopping at the given number.
+
+    Args:
+        results: Lookup result or list of results.
+        limit: Maximum count.
+
+    Returns:
+        Number of results or limit, whichever is smaller.
+    """
+    if isinstance(results, LookupResult):
+        return results.bounded_count(limit)
+    return min(len(results), limit)
+
+
+def hydrate_item(
+    results: Results, result: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Returns a result with all the attributes of the movie.
+
+    Args:
+        results: Lookup result or list of results.
+        result: One of the results.
+
+    Returns:
+        Movie or None if it was removed from the catalog since the lookup.
+    """
+    if isinstance(results, LookupResult):
+        return results.hydrate(result)
+    return result
+
+
+def iter_items(results: Results) -> Iterable[Dict[str, Any]]:
+    """Returns the results with all the attributes of the movies.
+
+    Args:
+        results: Lookup result or list of results.
+
+    Returns:
+        Iterable over movies.
+    """
+    if isinstance(results, LookupResult):
+        return results.iter_items()
+    return results
@@ -0,0 +1,212 @@
+"""Time budget of the queries on the movie catalog.
+
+Some constraint combinations, e.g., several negated keywords, cannot use an
+index and scan the whole catalog, possibly several times. To keep such a
+query from stalling the worker serving other users, every query step
+(running the query and fetching a page of rows, counting matches) is given a
+time budget. Steps run together can draw on the same `QueryTimer`, so that
+they cannot stall the worker for more than one budget. A progress handler,
+called by SQLite every `progress_steps` virtual machine instructions,
+interrupts the statement once the budget is exceeded. The handler also
+measures the number of instructions used by each query.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+# Default time budget of a lookup in seconds.
+DEFAULT_TIME_BUDGET = 0.5
+# Default number of virtual machine instructions between progress checks.
+DEFAULT_PROGRESS_STEPS = 1000
+
+T = TypeVar("T")
+
+_budget: Optional["QueryBudget"] = None
+_budget_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimeoutError(Exception):
+    def __init__(self, time_budget: float, vm_steps: int) -> None:
+        """Raised when a query is interrupted for exceeding its time budget.
+
+        Args:
+            time_budget: Time budget of the query in seconds.
+            vm_steps: Virtual machine instructions run before the query was
+              interrupted.
+        """
+        super().__init__(
+            f"Query interrupted after {time_budget} seconds "
+            f"({vm_steps} VM steps)."
+        )
+        self.time_budget = time_budget
+        self.vm_steps = vm_steps
+
+
+class QueryTimer:
+    def __init__(self, time_budget: float) -> None:
+        """Time spent by the query steps of a lookup.
+
+        Args:
+            time_budget: Time budget of the lookup in seconds, 0 for no
+              budget.
+        """
+        self.time_budget = time_budget
+        self.elapsed = 0.0
+
+    @property
+    def remaining(self) -> float:
+        """Time left to the lookup in seconds."""
+        return self.time_budget - self.elapsed
+
+    @property
+    def expired(self) -> bool:
+        """Whether the lookup has used up its time budget."""
+        return self.time_budget > 0 and self.remaining <= 0
+
+
+class QueryBudget:
+    def __init__(
+        self,
+        time_budget: float = DEFAULT_TIME_BUDGET,
+        progress_steps: int = DEFAULT_PROGRESS_STEPS,
+    ) -> None:
+        """Interrupts lookups exceeding a time budget.
+
+        Args:
+            time_budget (optional): Time budget of a lookup in seconds, 0 for
+              no budget. Defaults to DEFAULT_TIME_BUDGET.
+            progress_steps (optional): Number of virtual machine instructions
+              between progress checks. Defaults to DEFAULT_PROGRESS_STEPS.
+        """
+        self.time_budget = time_budget
+        self.progress_steps = progress_steps
+        self._stats = {"queries": 0, "interrupted": 0, "vm_steps": 0}
+        self._lock = threading.Lock()
+
+    def start(self) -> QueryTimer:
+        """Starts the timer of a lookup.
+
+        Returns:
+            Timer to pass to all query steps of the lookup.
+        """
+        return QueryTimer(self.time_budget)
+
+    def run(
+        self,
+        connection: sqlite3.Connection,
+        query: Callable[[], T],
+        timer: Optional[QueryTimer] = None,
+    ) -> Tuple[T, int]:
+        """Runs a query step within the time left to its lookup.
+
+        Args:
+            connection: Connection the query runs on.
+            query: Function executing the statement or fetching its rows.
+            timer (optional): Timer of the lookup, charged with the time spent
+              by the step. Defaults to None, i.e., the step is a lookup on
+              its own.
+
+        Raises:
+            QueryTimeoutError: If the lookup exceeded the time budget.
+
+        Returns:
+            Tuple with the value returned by the function and the number of
+            virtual machine instructions used (rounded to progress steps).
+        """
+        if timer is None:
+            timer = self.start()
+        if timer.expired:
+            # Steps of a lookup that has used up its budget are not run.
+            self._record(0, True)
+            raise QueryTimeoutError(self.time_budget, 0)
+        calls = 0
+        interrupted = False
+        started = time.monotonic()
+        deadline = started + timer.remaining
+
+        def progress() -> bool:
+            nonlocal calls, interrupted
+            calls += 1
+            interrupted = timer.time_budget > 0 and time.monotonic() > deadline
+            return interrupted
+
+        connection.set_progress_handler(progress, self.progress_steps)
+        try:
+            return query(), calls * self.progress_steps
+        except sqlite3.OperationalError:
+            if not interrupted:
+                raise
+            raise QueryTimeoutError(
+                self.time_budget, calls * self.progress_steps
+            ) from None
+        finally:
+            connection.set_progress_handler(None, 0)
+            timer.elapsed += time.monotonic() - started
+            self._record(calls * self.progress_steps, interrupted)
+
+    def _record(self, vm_steps: int, interrupted: bool) -> None:
+        """Records a query step in the statistics.
+
+        Args:
+            vm_steps: Virtual machine instructions used by the step.
+            interrupted: Whether the step was interrupted.
+        """
+        with self._lock:
+            self._stats["queries"] += 1
+            self._stats["interrupted"] += interrupted
+            self._stats["vm_steps"] += vm_steps
+        if interrupted:
+            logger.warning(
+                f"Query interrupted after {self.time_budget} seconds."
+            )
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns query statistics.
+
+        Returns:
+            Dictionary with the number of query steps run and interrupted,
+            and the virtual machine instructions used.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+def configure_query_budget(
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    progress_steps: int = DEFAULT_PROGRESS_STEPS,
+) -> QueryBudget:
+    """Replaces the query budget shared by the process.
+
+    Databases created afterwards use the new budget.
+
+    Args:
+        time_budget (optional): Time budget of a lookup in seconds, 0 for no
+          budget. Defaults to DEFAULT_TIME_BUDGET.
+        progress_steps (optional): Number of virtual machine instructions
+          between progress checks. Defaults to DEFAULT_PROGRESS_STEPS.
+
+    Returns:
+        Query budget.
+    """
+    global _budget
+    with _budget_lock:
+        _budget = QueryBudget(time_budget, progress_steps)
+        return _budget
+
+
+def get_query_budget() -> QueryBudget:
+    """Returns the query budget shared by the process.
+
+    Returns:
+        Query budget.
+    """
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = QueryBudget()
+        return _budget
@@ -0,0 +1,304 @@
+"""Parameterized query builder for the movie catalog.
+
+Slot constraints of the current information needs are turned into SQL
+templates with bound parameters instead of interpolating the values into the
+query text. Queries with the same constraint shape (slots and operators) share
+the same SQL text, which lets SQLite reuse the compiled statements, and values
+containing quotes can no longer break a query.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.annotation.values import Values
+
+NEGATION_PREFIX = ".NOT."
+MIN_RATING = 5
+# Columns retrieved for candidate movies. The other attributes are fetched
+# only for the movies offered to the user (see `item_store`).
+CANDIDATE_COLUMNS = [
+    "rowid AS rowid",
+    Slots.ID.value,
+    Slots.TITLE.value,
+    Slots.RATING.value,
+]
+
+_YEAR_COMPARISON = re.compile(r"^(<=|>=|<|>|=)?\s*(\d+)$")
+_YEAR_BETWEEN = re.compile(r"^BETWEEN\s+(\d+)\s+AND\s+(\d+)$", re.I)
+_NEGATED_COMPARISON = {">": "<", "<": ">", ">=": "<=", "<=": ">="}
+
+_builders: Dict[str, "QueryBuilder"] = {}
+_builders_lock = threading.Lock()
+
+
+class Predicate(NamedTuple):
+    """SQL predicate template and the parameters bound to it."""
+
+    template: str
+    params: Tuple[Any, ...]
+
+
+# Predicate of lookups that no movie can match, answered without a query.
+EMPTY_PREDICATE = Predicate("0", ())
+
+
+def parse_year_value(value: str) -> Tuple[str, Tuple[Any, ...]]:
+    """Parses a year value into a comparison operator and its operands.
+
+    Year values may be a year ("1994"), a comparison ("> 2010") or a range
+    ("BETWEEN 1990 AND 2000"), optionally prefixed with ".NOT.".
+
+    Args:
+        value: Year value.
+
+    Returns:
+        Tuple with SQL operator (e.g., "=", ">", "NOT BETWEEN") and operands.
+    """
+    negated = value.startswith(NEGATION_PREFIX)
+    value = value.replace(NEGATION_PREFIX, "").strip()
+
+    match = _YEAR_BETWEEN.match(value)
+    if match:
+        operator = "NOT BETWEEN" if negated else "BETWEEN"
+        return operator, (int(match.group(1)), int(match.group(2)))
+
+    match = _YEAR_COMPARISON.match(value)
+    if match:
+        operator = match.group(1) or "="
+        if negated:
+            # Negated comparisons are flipped as in the original query logic.
+            operator = _NEGATED_COMPARISON.get(operator, "!=")
+        return operator, (int(match.group(2)),)
+
+    return "!=" if negated else "=", (value,)
+
+
+def get_slot_predicate(slot: str, value: str, scan: bool = False) -> Predicate:
+    """Converts a slot value to a parameterized SQL predicate.
+
+    Values prefixed with ".NOT." are negated. Year values are compared (see
+    `parse_year_value`) with range predicates, other slots are matched as
+    substrings of the stored value.
+
+    Args:
+        slot: Slot the value belongs to.
+        value: Slot value.
+        scan (optional): Whether the year index must not be used, e.g., for
+          ranges matching most movies, which are cheaper to filter while
+          scanning movies in rating order. Defaults to False.
+
+    Returns:
+        Predicate for the slot value.
+    """
+    if slot == Slots.YEAR.value:
+        operator, operands = parse_year_value(value)
+        # The unary plus disables the index on the column.
+        column = f"+{slot}" if scan else slot
+        if operator == "NOT BETWEEN" or (
+            operator == "!=" and isinstance(operands[0], int)
+        ):
+            # Excluded ranges are split into two ranges that can use the year
+            # index.
+            return Predicate(
+                f"({column} < ? OR {column} > ?)", (operands[0], operands[-1])
+            )
+        placeholders = " AND ".join("?" for _ in operands)
+        return Predicate(f"{column} {operator} {placeholders}", operands)
+
+    negated = value.startswith(NEGATION_PREFIX)
+    value = value.replace(NEGATION_PREFIX, "").strip()
+    operator = "NOT LIKE" if negated else "LIKE"
+    return Predicate(f"{slot} {operator} ?", (f"%{value}%",))
+
+
+def iter_constraint_values(
+    frame_CIN: Dict[str, Any], domain: MovieDomain
+) -> Iterator[Tuple[str, str]]:
+    """Iterates over the slot-value pairs of the current information needs.
+
+    Empty values and special values (e.g., don't care) are skipped.
+
+    Args:
+        frame_CIN: Current information needs.
+        domain: Domain to check specific parameters.
+
+    Yields:
+        Slot-value pairs.
+    """
+    special_values = set(Values)
+    for slot, values in frame_CIN.items():
+        if slot not in domain.multiple_values_CIN:
+            values = [values]
+        for value in values:
+            if value and value not in special_values:
+                yield slot, value
+
+
+def get_titles_predicate(titles: Iterable[str]) -> Optional[Predicate]:
+    """Returns a predicate matching any of the given titles.
+
+    Args:
+        titles: Movie titles.
+
+    Returns:
+        Predicate or None if there are no titles.
+    """
+    titles = tuple(titles)
+    if not titles:
+        return None
+    placeholders = ", ".join("?" for _ in titles)
+    return Predicate(f"{Slots.TITLE.value} IN ({placeholders})", titles)
+
+
+class QueryBuilder:
+    def __init__(self, table_name: str, cache_size: int = 128) -> None:
+        """Builds SELECT statements over the movies table.
+
+        The statement text is cached by the shape of the query, i.e., the
+        predicate templates without their values.
+
+        Args:
+            table_name: Name of the table holding the movies.
+            cache_size: Maximum number of cached statements. Defaults to 128.
+        """
+        self.table_name = table_name
+        self.cache_size = cache_size
+        self._statements: OrderedDict[Tuple[str, ...], str] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def build_select(
+        self, predicates: List[Predicate]
+    ) -> Tuple[str, List[Any]]:
+        """Builds a query returning candidate movies matching all predicates.
+
+        Only movies rated above the minimum rating are returned, sorted by
+        rating, with their row id and the columns in CANDIDATE_COLUMNS.
+
+        Args:
+            predicates: Predicates to be satisfied.
+
+        Returns:
+            Tuple with SQL statement and its parameters.
+        """
+        return self._build("select", predicates)
+
+    def build_count(self, predicates: List[Predicate]) -> Tuple[str, List[Any]]:
+        """Builds a query counting movies matching all predicates.
+
+        The statement has an additional parameter, after the parameters of
+        the predicates, with the maximum count (-1 to count all movies).
+
+        Args:
+            predicates: Predicates to be satisfied.
+
+        Returns:
+            Tuple with SQL statement and the parameters of the predicates.
+        """
+        return self._build("count", predicates)
+
+    def build_rowids(
+        self, predicates: List[Predicate]
+    ) -> Tuple[str, List[Any]]:
+        """Builds a query returning the row ids of all matching movies, in no
+        particular order.
+
+        Args:
+            predicates: Predicates to be satisfied.
+
+        Returns:
+            Tuple with SQL statement and its parameters.
+        """
+        return self._build("rowids", predicates)
+
+    def _build(
+        self, kind: str, predicates: List[Predicate]
+    ) -> Tuple[str, List[Any]]:
+        """Builds a statement of a given kind, using the statement cache.
+
+        Args:
+            kind: Kind of statement, either "select", "count", or "rowids".
+            predicates: Predicates to be satisfied.
+
+        Returns:
+            Tuple with SQL statement and the parameters of the predicates.
+        """
+        shape = (kind, *(predicate.template for predicate in predicates))
+        with self._lock:
+            statement = self._statements.get(shape)
+            if statement is None:
+                self._stats["misses"] += 1
+                statement = self._compose(kind, shape[1:])
+                self._statements[shape] = statement
+                if len(self._statements) > self.cache_size:
+                    self._statements.popitem(last=False)
+            else:
+                self._stats["hits"] += 1
+                self._statements.move_to_end(shape)
+
+        params = [
+            param for predicate in predicates for param in predicate.params
+        ]
+        return statement, params
+
+    def _compose(self, kind: str, templates: Tuple[str, ...]) -> str:
+        """Composes the SQL text of a statement.
+
+        Args:
+            kind: Kind of statement, either "select", "count", or "rowids".
+            templates: Predicate templates.
+
+        Returns:
+            SQL statement.
+        """
+        conditions = [f"({template})" for template in templates]
+        conditions.append(f"{Slots.RATING.value} > {MIN_RATING}")
+        where = " AND ".join(conditions)
+        if kind == "count":
+            return (
+                f"SELECT count(*) FROM (SELECT 1 FROM {self.table_name} "
+                f"WHERE {where} LIMIT ?);"
+            )
+        if kind == "rowids":
+            return f"SELECT rowid FROM {self.table_name} WHERE {where};"
+        return (
+            f"SELECT {', '.join(CANDIDATE_COLUMNS)} "
+            f"FROM {self.table_name} WHERE {where} "
+            f"ORDER BY {Slots.RATING.value} DESC;"
+        )
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns statement cache statistics.
+
+        Returns:
+            Dictionary with the number of cached statements, hits and misses.
+        """
+        return {"statements": len(self._statements), **self._stats}
+
+
+def get_query_builder(table_name: str) -> QueryBuilder:
+    """Returns the query builder shared by the process for a table.
+
+    Args:
+        table_name: Name of the table holding the movies.
+
+    Returns:
+        Query builder.
+    """
+    with _builders_lock:
+        if table_name not in _builders:
+            _builders[table_name] = QueryBuilder(table_name)
+        return _builders[table_name]
@@ -0,0 +1,252 @@
+"""Result cache for database lookups shared by all dialogue sessions.
+
+Most lookups are for a small number of popular information needs (e.g., a
+genre and a decade), so their results are cached across sessions. Results are
+keyed by a canonical hash of the constraints, i.e., independent of the order
+in which slots were filled. Entries are evicted in least recently used order
+when the cache exceeds its size in bytes, expire after a time to live, and
+are discarded when the version of the catalog they were computed from
+changes.
+
+Cached results are shared between sessions and must not be modified. Lazy
+results fetch more rows on the connection of the calling thread (see
+`lookup_result`), so they can be read by any worker thread.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional
+
+from moviebot.database.lookup_result import LookupResult, Results
+
+# Default maximum size of the cached results (64 MB).
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Default time to live of cached results in seconds.
+DEFAULT_TTL = 3600
+
+_cache: Optional["ResultCache"] = None
+_cache_lock = threading.Lock()
+
+
+class _Entry(NamedTuple):
+    results: Results
+    version: str
+    size: int
+    expires: float
+
+
+def get_result_cache_key(
+    backend: str, db_path: str, constraints: Iterable[Any]
+) -> str:
+    """Returns the canonical key of a lookup.
+
+    Args:
+        backend: Name of the database backend answering the lookup.
+        db_path: Path to the database file.
+        constraints: Constraints of the lookup (e.g., slot-value pairs). Their
+          order and duplicates are ignored.
+
+    Returns:
+        Hash of the lookup.
+    """
+    canonical = json.dumps(
+        [backend, db_path, sorted({json.dumps(c) for c in constraints})]
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def estimate_size(results: Results) -> int:
+    """Estimates the memory used by the results of a lookup in bytes.
+
+    Args:
+        results: Results of a lookup.
+
+    Returns:
+        Approximate size in bytes.
+    """
+    if isinstance(results, LookupResult):
+        return results.nbytes
+    size = sys.getsizeof(results)
+    for result in results:
+        size += sys.getsizeof(result)
+        size += sum(sys.getsizeof(value) for value in result.values())
+    return size
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """LRU cache of lookup results bounded in bytes.
+
+        Args:
+            max_bytes (optional): Maximum size of the cached results in
+              bytes. Defaults to DEFAULT_MAX_BYTES.
+            ttl (optional): Time to live of cached results in seconds.
+              Defaults to DEFAULT_TTL.
+            clock (optional): Function returning the current time in seconds.
+              Defaults to time.monotonic.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "degraded": 0,
+        }
+
+    def get(self, key: str, version: str) -> Optional[Results]:
+        """Returns the cached results of a lookup.
+
+        Args:
+            key: Key of the lookup.
+            version: Current version of the catalog.
+
+        Returns:
+            Results or None if they are not cached, have expired, were
+            computed from another version of the catalog, or are degraded.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version != version:
+                    self._remove(key)
+                    self._stats["invalidations"] += 1
+                elif entry.expires <= self._clock():
+                    self._remove(key)
+                    self._stats["expirations"] += 1
+                elif (
+                    isinstance(entry.results, LookupResult)
+                    and entry.results.degraded
+                ):
+                    # Results of interrupted queries are not reused.
+                    self._remove(key)
+                    self._stats["degraded"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    if isinstance(entry.results, LookupResult):
+                        self._resize(key, entry)
+                    return entry.results
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, version: str, results: Results) -> None:
+        """Caches the results of a lookup.
+
+        Results larger than the cache are not stored.
+
+        Args:
+            key: Key of the lookup.
+            version: Version of the catalog the results were computed from.
+            results: Results of the lookup.
+        """
+        size = estimate_size(results)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(
+                results, version, size, self._clock() + self.ttl
+            )
+            self._size += size
+            self._evict(keep=key)
+
+    def _resize(self, key: str, entry: _Entry) -> None:
+        """Updates the size of a lazy result that has fetched more rows since
+        it was cached. Must be called while holding the cache lock."""
+        size = estimate_size(entry.results)
+        self._entries[key] = entry._replace(size=size)
+        self._size += size - entry.size
+        self._evict(keep=key)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Evicts least recently used entries until the cache fits its size.
+        Must be called while holding the cache lock.
+
+        Args:
+            keep (optional): Key of an entry that is not evicted. Defaults to
+              None.
+        """
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        """Removes an entry. Must be called while holding the cache lock."""
+        self._size -= self._entries.pop(key).size
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns cache statistics.
+
+        Returns:
+            Dictionary with the number of entries, their size in bytes, and
+            the number of hits, misses, evictions, expirations,
+            invalidations, and degraded results.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                **self._stats,
+            }
+
+
+def configure_result_cache(
+    max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL
+) -> ResultCache:
+    """Replaces the result cache shared by the process.
+
+    Databases created afterwards use the new cache.
+
+    Args:
+        max_bytes (optional): Maximum size of the cached results in bytes.
+          Defaults to DEFAULT_MAX_BYTES.
+        ttl (optional): Time to live of cached results in seconds. Defaults to
+          DEFAULT_TTL.
+
+    Returns:
+        Result cache.
+    """
+    global _cache
+    with _cache_lock:
+        _cache = ResultCache(max_bytes, ttl)
+        return _cache
+
+
+def get_result_cache() -> ResultCache:
+    """Returns the result cache shared by the process.
+
+    Returns:
+        Result cache.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
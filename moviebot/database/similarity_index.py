@@ -0,0 +1,274 @@
+"""Item-to-item similarity index of the movie catalog.
+
+Movies are represented by the genres, keywords, directors, and actors they
+have, weighted by slot and by inverse document frequency, so that rare
+keywords or a shared director count more than a common genre. The top-k most
+similar movies (cosine similarity) of every movie are computed offline with
+sparse matrix products and stored in the `movie_similarity` table, keyed by
+movie ID and rank. Finding movies similar to the one in focus is then a
+primary key range scan.
+
+Usage: python -m moviebot.database.similarity_index -d <path_to_db>
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.database.db_movies import DataBase
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.slot_values import split_slot_value
+
+SIMILARITY_TABLE_NAME = "movie_similarity"
+# Weights of the slots shared by similar movies.
+SLOT_WEIGHTS = {
+    Slots.GENRES.value: 1.0,
+    Slots.KEYWORDS.value: 1.0,
+    Slots.DIRECTORS.value: 2.0,
+    Slots.ACTORS.value: 1.5,
+}
+DEFAULT_TOP_K = 20
+# Memory used by the similarities of a block of movies, in bytes.
+MAX_BLOCK_BYTES = 256 * 2**20
+# Bytes per similarity in a block: the dense float32 scores, the int64
+# indices of argpartition and the sparse product they are computed from.
+BYTES_PER_SCORE = 24
+
+_indexes: Dict[str, "SimilarityIndex"] = {}
+_indexes_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_feature_matrix(
+    rows: List[Dict[str, Optional[str]]], weights: Dict[str, float]
+) -> sparse.csr_matrix:
+    """Returns the L2-normalized TF-IDF vectors of movies.
+
+    Args:
+        rows: Movies with their slot values.
+        weights: Weights of the slots.
+
+    Returns:
+        Sparse matrix with one row per movie.
+    """
+    features: Dict[str, int] = {}
+    indices, indptr, data = [], [0], []
+    for row in rows:
+        row_features: Dict[int, float] = {}
+        for slot, weight in weights.items():
+            for value in split_slot_value(slot, row[slot]):
+                key = f"{slot}:{value.lower()}"
+                feature = features.setdefault(key, len(features))
+                row_features[feature] = weight
+        indices.extend(row_features.keys())
+        data.extend(row_features.values())
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.array(data, dtype=np.float32), indices, indptr),
+        shape=(len(rows), len(features)),
+    )
+    document_frequency = np.bincount(matrix.indices, minlength=len(features))
+    idf = np.log(len(rows) / np.maximum(document_frequency, 1)).astype(
+        np.float32
+    )
+    matrix = matrix @ sparse.diags(idf)
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+
+def get_block_size(size: int, max_block_bytes: int = MAX_BLOCK_BYTES) -> int:
+    """Returns the number of movies whose similarities are computed at once.
+
+    Each movie of a block is compared with all the movies, so the block gets
+    smaller as the catalog grows to keep memory usage under the limit.
+
+    Args:
+        size: Number of movies.
+        max_block_bytes (optional): Memory limit of a block in bytes.
+          Defaults to MAX_BLOCK_BYTES.
+
+    Returns:
+        Number of movies per block, at least 1.
+    """
+    return max(1, max_block_bytes // (max(size, 1) * BYTES_PER_SCORE))
+
+
+def get_top_k(
+    matrix: sparse.csr_matrix, k: int, max_block_bytes: int = MAX_BLOCK_BYTES
+) -> List[List[Tuple[int, float]]]:
+    """Returns the most similar movies of every movie.
+
+    Similarities are computed for blocks of movies at a time, sized by
+    `get_block_size` to bound memory usage.
+
+    Args:
+        matrix: Normalized feature vectors of the movies.
+        k: Number of similar movies per movie.
+        max_block_bytes (optional): Memory limit of a block in bytes.
+          Defaults to MAX_BLOCK_BYTES.
+
+    Returns:
+        For every movie, a list of (position, score) tuples sorted by score.
+    """
+    size = matrix.shape[0]
+    k = min(k, size - 1)
+    if k <= 0:
+        return [[] for _ in range(size)]
+    block_size = get_block_size(size, max_block_bytes)
+    transposed = matrix.T.tocsc()
+    top_k = []
+    for start in range(0, size, block_size):
+        end = min(start + block_size, size)
+        scores = (matrix[start:end] @ transposed).toarray()
+        scores[np.arange(end - start), np.arange(start, end)] = -1
+        # Negated in place, so that no copy of the block is made.
+        np.negative(scores, out=scores)
+        candidates = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        for i, row in enumerate(candidates):
+            row = row[np.lexsort((row, scores[i, row]))]
+            top_k.append(
+                [
+                    (int(j), -float(scores[i, j]))
+                    for j in row
+                    if scores[i, j] < 0
+                ]
+            )
+    return top_k
+
+
+def build_similarity_index(
+    db_path: str,
+    table_name: str,
+    k: int = DEFAULT_TOP_K,
+    weights: Dict[str, float] = SLOT_WEIGHTS,
+) -> None:
+    """Builds (or rebuilds) the similarity table of a movies table.
+
+    Args:
+        db_path: Path to the database file.
+        table_name: Name of the movies table.
+        k (optional): Number of similar movies per movie. Defaults to
+          DEFAULT_TOP_K.
+        weights (optional): Weights of the slots. Defaults to SLOT_WEIGHTS.
+    """
+    connection = sqlite3.connect(db_path)
+    columns = [Slots.ID.value, Slots.TITLE.value, *weights]
+    cursor = connection.execute(
+        f"SELECT {', '.join(columns)} FROM {table_name};"
+    )
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    top_k = get_top_k(get_feature_matrix(rows, weights), k)
+
+    with connection:
+        connection.execute(f"DROP TABLE IF EXISTS {SIMILARITY_TABLE_NAME};")
+        connection.execute(
+            f"CREATE TABLE {SIMILARITY_TABLE_NAME} ("
+            "movie_id TEXT NOT NULL, rank INTEGER NOT NULL, "
+            "similar_title TEXT NOT NULL, score REAL NOT NULL, "
+            "PRIMARY KEY (movie_id, rank)) WITHOUT ROWID;"
+        )
+        connection.executemany(
+            f"INSERT OR IGNORE INTO {SIMILARITY_TABLE_NAME} "
+            "VALUES (?, ?, ?, ?);",
+            (
+                (row[Slots.ID.value], rank, rows[j][Slots.TITLE.value], score)
+                for row, similar in zip(rows, top_k)
+                for rank, (j, score) in enumerate(similar)
+            ),
+        )
+    connection.close()
+    logger.info(f"Similarity table built in {db_path}.")
+
+
+class SimilarityIndex:
+    def __init__(self, connection_pool: ConnectionPool) -> None:
+        """Finds similar movies in the similarity table.
+
+        Args:
+            connection_pool: Connection pool of the catalog.
+        """
+        self.connection_pool = connection_pool
+
+    def get_similar_titles(
+        self, movie_id: str, k: int = DEFAULT_TOP_K
+    ) -> List[str]:
+        """Returns the titles of the movies most similar to a movie.
+
+        Args:
+            movie_id: ID of the movie.
+            k (optional): Maximum number of titles. Defaults to DEFAULT_TOP_K.
+
+        Returns:
+            Titles sorted by similarity.
+        """
+        cursor = self.connection_pool.cursor()
+        cursor.execute(
+            f"SELECT similar_title FROM {SIMILARITY_TABLE_NAME} "
+            "WHERE movie_id = ? ORDER BY rank LIMIT ?;",
+            (movie_id, k),
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_similarity_index(db: DataBase) -> Optional[SimilarityIndex]:
+    """Returns the similarity index shared by the process for a database.
+
+    Args:
+        db: Database with available items.
+
+    Returns:
+        Similarity index or None if the similarity table has not been built.
+    """
+    if not db.has_table(SIMILARITY_TABLE_NAME):
+        return None
+    key = os.path.abspath(db.db_file_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SimilarityIndex(db.connection_pool)
+        return _indexes[key]
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Builds the similarity table of the movie catalog."
+    )
+    parser.add_argument(
+        "-d",
+        "--db_path",
+        type=str,
+        help="Path to the database file",
+        default="data/movies_dbase.db",
+    )
+    parser.add_argument(
+        "-k",
+        type=int,
+        help="Number of similar movies per movie",
+        default=DEFAULT_TOP_K,
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    table_name = ConnectionPool(args.db_path).table_name
+    build_similarity_index(args.db_path, table_name, args.k)
@@ -0,0 +1,439 @@
+"""Statistics of the slot values in the movie catalog.
+
+The number of movies having each slot value (e.g., how many movies are
+dramas, or have Tom Hanks among the actors) is counted when the catalog and
+`slot_values.json` are built, and stored in the `slot_statistics` table. The
+query layer uses them to estimate how many movies match a constraint, to
+evaluate the most selective constraints first, to decide between an index
+probe and a scan, and to answer lookups with a constraint that no movie
+satisfies without querying the movies table. The dialogue policy can use them
+to find the most common values of a slot.
+
+Values without statistics of their own are estimated by scanning the values
+of the slot that contain them. These estimates are cached, so a scan runs
+once per slot value and process rather than on every turn.
+
+The statistics record the version of the catalog they were counted from.
+Statistics of another version (e.g., the movies table was reloaded without
+rerunning this module) are ignored, as they would report movies that do not
+exist or miss movies that do.
+
+Usage: python -m moviebot.database.slot_statistics -d <path_to_db>
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Counter, Dict, List, Optional, Set, Tuple
+
+from moviebot.database.connection_pool import (
+    CATALOG_INFO_TABLE,
+    ConnectionPool,
+)
+from moviebot.database.query_builder import NEGATION_PREFIX, parse_year_value
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.slot_values import SlotValueCollector
+
+STATISTICS_TABLE_NAME = "slot_statistics"
+STATISTICS_INFO_TABLE = "slot_statistics_info"
+# Constraints matching a larger fraction of the movies are checked while
+# scanning movies in rating order rather than looked up in an index.
+SCAN_SELECTIVITY = 0.1
+# Number of substring estimates kept in memory.
+ESTIMATE_CACHE_SIZE = 4096
+
+_statistics: Dict[str, "SlotStatistics"] = {}
+_statistics_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_statistics_version(
+    connection: sqlite3.Connection, table_name: str
+) -> str:
+    """Returns the version of a catalog that slot statistics are valid for.
+
+    It is the version stamped by the catalog build or, for other catalogs,
+    the number of movies and the largest rowid, which change when movies are
+    added, removed, or the table is reloaded. Unlike the file modification
+    time, it does not change when the statistics themselves are written.
+
+    Args:
+        connection: Connection to the catalog.
+        table_name: Name of the movies table.
+
+    Returns:
+        Catalog version.
+    """
+    if connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;",
+        (CATALOG_INFO_TABLE,),
+    ).fetchone():
+        row = connection.execute(
+            f"SELECT value FROM {CATALOG_INFO_TABLE} "
+            "WHERE key = 'catalog_version';"
+        ).fetchone()
+        if row:
+            return row[0]
+    count, max_rowid = connection.execute(
+        f"SELECT count(*), max(rowid) FROM {table_name};"
+    ).fetchone()
+    return f"{count}-{max_rowid}"
+
+
+def write_slot_statistics(
+    db_path: str, frequencies: Counter[Tuple[str, str]], version: str
+) -> None:
+    """Writes (or rewrites) the statistics table of a catalog.
+
+    Values are compared case-insensitively, so the frequencies of values
+    differing only in case are added up.
+
+    Args:
+        db_path: Path to the database file.
+        frequencies: Number of movies by slot and value.
+        version: Version of the catalog the movies were counted from (see
+            `get_statistics_version`).
+    """
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute(f"DROP TABLE IF EXISTS {STATISTICS_TABLE_NAME};")
+        connection.execute(f"DROP TABLE IF EXISTS {STATISTICS_INFO_TABLE};")
+        connection.execute(
+            f"CREATE TABLE {STATISTICS_TABLE_NAME} ("
+            "slot TEXT NOT NULL, value TEXT NOT NULL COLLATE NOCASE, "
+            "frequency INTEGER NOT NULL, "
+            "PRIMARY KEY (slot, value)) WITHOUT ROWID;"
+        )
+        connection.executemany(
+            f"INSERT INTO {STATISTICS_TABLE_NAME} VALUES (?, ?, ?) "
+            "ON CONFLICT (slot, value) "
+            "DO UPDATE SET frequency = frequency + excluded.frequency;",
+            (
+                (slot, value, count)
+                for (slot, value), count in frequencies.items()
+            ),
+        )
+        connection.execute(
+            f"CREATE INDEX {STATISTICS_TABLE_NAME}_frequency_idx "
+            f"ON {STATISTICS_TABLE_NAME} (slot, frequency DESC, value);"
+        )
+        connection.execute(
+            f"CREATE TABLE {STATISTICS_INFO_TABLE} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;"
+        )
+        connection.execute(
+            f"INSERT INTO {STATISTICS_INFO_TABLE} "
+            "VALUES ('catalog_version', ?);",
+            (version,),
+        )
+    connection.close()
+    logger.info(f"Slot statistics written to {db_path}.")
+
+
+def build_slot_statistics(
+    db_path: str, table_name: str, slots: List[str]
+) -> None:
+    """Counts the slot values of an existing catalog.
+
+    Args:
+        db_path: Path to the database file.
+        table_name: Name of the movies table.
+        slots: Slots to count values of.
+    """
+    connection = sqlite3.connect(db_path)
+    cursor = connection.execute(f"SELECT {', '.join(slots)} FROM {table_name};")
+    collector = SlotValueCollector(slots, str)
+    for row in cursor:
+        collector.add(dict(zip(slots, row)))
+    version = get_statistics_version(connection, table_name)
+    connection.close()
+    write_slot_statistics(db_path, collector.frequencies, version)
+
+
+class SlotStatistics:
+    def __init__(self, connection_pool: ConnectionPool) -> None:
+        """Estimates the number of movies matching slot constraints.
+
+        Args:
+            connection_pool: Connection pool of the catalog.
+        """
+        self.connection_pool = connection_pool
+        self._total: Optional[int] = None
+        self._slots: Optional[Set[str]] = None
+        self._substring_estimates: OrderedDict[
+            Tuple[str, str], int
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_current(self) -> bool:
+        """Checks whether the statistics were counted from the current
+        version of the catalog.
+
+        Returns:
+            True if the statistics are up to date.
+        """
+        cursor = self.connection_pool.cursor()
+        if not _has_table(cursor, STATISTICS_INFO_TABLE):
+            return False
+        row = cursor.execute(
+            f"SELECT value FROM {STATISTICS_INFO_TABLE} "
+            "WHERE key = 'catalog_version';"
+        ).fetchone()
+        version = get_statistics_version(
+            cursor.connection, self.connection_pool.table_name
+        )
+        return row is not None and row[0] == version
+
+    @property
+    def total(self) -> int:
+        """Number of movies in the catalog."""
+        if self._total is None:
+            cursor = self.connection_pool.cursor()
+            self._total = cursor.execute(
+                f"SELECT count(*) FROM {self.connection_pool.table_name};"
+            ).fetchone()[0]
+        return self._total
+
+    @property
+    def slots(self) -> Set[str]:
+        """Slots whose values are counted."""
+        if self._slots is None:
+            cursor = self.connection_pool.cursor()
+            self._slots = {
+                row[0]
+                for row in cursor.execute(
+                    f"SELECT DISTINCT slot FROM {STATISTICS_TABLE_NAME};"
+                )
+            }
+        return self._slots
+
+    def get_frequency(self, slot: str, value: str) -> int:
+        """Returns the number of movies having a slot value.
+
+        Args:
+            slot: Slot name.
+            value: Slot value, compared case-insensitively.
+
+        Returns:
+            Number of movies.
+        """
+        cursor = self.connection_pool.cursor()
+        row = cursor.execute(
+            f"SELECT frequency FROM {STATISTICS_TABLE_NAME} "
+            "WHERE slot = ? AND value = ?;",
+            (slot, value),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_top_values(self, slot: str, k: int) -> List[Tuple[str, int]]:
+        """Returns the values of a slot that most movies have.
+
+        Args:
+            slot: Slot name.
+            k: Maximum number of values.
+
+        Returns:
+            List of (value, frequency) tuples sorted by frequency and value.
+        """
+        cursor = self.connection_pool.cursor()
+        return cursor.execute(
+            f"SELECT value, frequency FROM {STATISTICS_TABLE_NAME} "
+            "WHERE slot = ? ORDER BY frequency DESC, value LIMIT ?;",
+            (slot, k),
+        ).fetchall()
+
+    def estimate(self, slot: str, value: str) -> Optional[int]:
+        """Estimates the number of movies matching a constraint.
+
+        Values of slots other than year are matched as substrings of the
+        stored values, as in the SQL predicates. The estimate is the number of
+        movies having the value itself or, if there are none, values
+        containing it, so no movie matches a positive constraint estimated
+        at 0.
+
+        Args:
+            slot: Slot name.
+            value: Constraint value, possibly negated.
+
+        Returns:
+            Estimated number of movies or None if it cannot be estimated.
+        """
+        if slot not in self.slots:
+            return None
+        negated = value.startswith(NEGATION_PREFIX)
+        if slot == Slots.YEAR.value:
+            count = self._estimate_year(value)
+        else:
+            value = value.replace(NEGATION_PREFIX, "").strip()
+            if "," in value:
+                return None
+            count = self.get_frequency(slot, value) or self._estimate_substring(
+                slot, value
+            )
+            if negated:
+                count = max(self.total - count, 0)
+        return count
+
+    def prefers_scan(self, estimate: Optional[int]) -> bool:
+        """Checks whether a constraint matches too many movies to be looked
+        up in an index.
+
+        Args:
+            estimate: Estimated number of movies matching the constraint.
+
+        Returns:
+            True if movies should be scanned in rating order instead.
+        """
+        return estimate is not None and estimate > SCAN_SELECTIVITY * self.total
+
+    def _estimate_year(self, value: str) -> Optional[int]:
+        """Estimates the number of movies matching a year constraint.
+
+        Args:
+            value: Year value (see `parse_year_value`).
+
+        Returns:
+            Number of movies or None for excluded years and ranges.
+        """
+        operator, operands = parse_year_value(value)
+        if operator in ("!=", "NOT BETWEEN") or not all(
+            isinstance(operand, int) for operand in operands
+        ):
+            return None
+        if operator == "BETWEEN":
+            condition = "BETWEEN ? AND ?"
+        else:
+            condition = f"{operator} ?"
+        cursor = self.connection_pool.cursor()
+        return cursor.execute(
+            f"SELECT coalesce(sum(frequency), 0) FROM {STATISTICS_TABLE_NAME} "
+            f"WHERE slot = ? AND CAST(value AS INTEGER) {condition};",
+            (Slots.YEAR.value, *operands),
+        ).fetchone()[0]
+
+    def _estimate_substring(self, slot: str, value: str) -> int:
+        """Returns the number of movies having a slot value that contains a
+        given value, counting a movie once per matching value.
+
+        The values of the slot are scanned on the first estimate of a value,
+        later estimates are taken from the cache.
+
+        Args:
+            slot: Slot name.
+            value: Value to look for.
+
+        Returns:
+            Upper bound of the number of movies.
+        """
+        key = (slot, value.lower())
+        with self._lock:
+            estimate = self._substring_estimates.get(key)
+            if estimate is not None:
+                self._substring_estimates.move_to_end(key)
+                return estimate
+
+        escaped = (
+            value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        cursor = self.connection_pool.cursor()
+        estimate = cursor.execute(
+            f"SELECT coalesce(sum(frequency), 0) FROM {STATISTICS_TABLE_NAME} "
+            "WHERE slot = ? AND value LIKE ? ESCAPE '\\';",
+            (slot, f"%{escaped}%"),
+        ).fetchone()[0]
+        with self._lock:
+            self._substring_estimates[key] = estimate
+            if len(self._substring_estimates) > ESTIMATE_CACHE_SIZE:
+                self._substring_estimates.popitem(last=False)
+        return estimate
+
+
+def get_slot_statistics(
+    connection_pool: ConnectionPool,
+) -> Optional[SlotStatistics]:
+    """Returns the slot statistics shared by the process for a catalog.
+
+    Args:
+        connection_pool: Connection pool of the catalog.
+
+    Returns:
+        Slot statistics or None if the statistics table has not been built or
+        was built from another version of the catalog.
+    """
+    key = os.path.abspath(connection_pool.db_path)
+    with _statistics_lock:
+        if key in _statistics:
+            return _statistics[key]
+    if not _has_table(connection_pool.cursor(), STATISTICS_TABLE_NAME):
+        return None
+    statistics = SlotStatistics(connection_pool)
+    if not statistics.is_current():
+        logger.warning(
+            f"Slot statistics of {connection_pool.db_path} are out of date "
+            "and are ignored. Rebuild them with "
+            "`python -m moviebot.database.slot_statistics`."
+        )
+        return None
+    with _statistics_lock:
+        return _statistics.setdefault(key, statistics)
+
+
+def _has_table(cursor: sqlite3.Cursor, table_name: str) -> bool:
+    """Checks whether a table exists in the database of a cursor.
+
+    Args:
+        cursor: Database cursor.
+        table_name: Name of the table.
+
+    Returns:
+        True if the table exists.
+    """
+    return (
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;",
+            (table_name,),
+        ).fetchone()
+        is not None
+    )
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Counts the slot values of the movie catalog."
+    )
+    parser.add_argument(
+        "-d",
+        "--db_path",
+        type=str,
+        help="Path to the database file",
+        default="data/movies_dbase.db",
+    )
+    parser.add_argument(
+        "--domain_path",
+        type=str,
+        help="Path to the domain file",
+        default="data/movies_domain.yaml",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    table_name = ConnectionPool(args.db_path).table_name
+    slots = MovieDomain(args.domain_path).slots_annotation
+    build_slot_statistics(args.db_path, table_name, slots)
@@ -0,0 +1,184 @@
+"""Precomputed lists of the top rated movies.
+
+Conversations usually start without constraints (or with "don't care"
+answers), or with a single genre or decade. These lookups match a large part
+of the catalog and would scan the movies table in rating order. The candidate
+movies of these lookups are instead materialized in memory once per process,
+in rating order, and shared by all sessions: the list of all movies, and one
+list per genre and per decade of the catalog.
+
+Lists are filtered from the list of all movies with the facet index, which
+matches genres as substrings of the stored values like the SQL predicates of
+`DataBase`. Decades are keyed by the year ranges of the NLU (e.g., "BETWEEN
+1990 AND 2000" for "90s").
+"""
+
+import logging
+import os
+import threading
+from typing import Counter, Dict, Optional, Tuple
+
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.database.facet_index import get_facet_index
+from moviebot.database.item_store import get_item_store
+from moviebot.database.lookup_result import LookupResult
+from moviebot.database.query_builder import (
+    NEGATION_PREFIX,
+    get_query_builder,
+    parse_year_value,
+)
+from moviebot.nlu.annotation.slots import Slots
+
+# Key of the list of all movies.
+ALL_MOVIES = ("", "")
+
+_lists: Dict[str, "TopLists"] = {}
+_lists_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_decade_value(decade: int) -> str:
+    """Returns the year value of a decade, as annotated by the NLU.
+
+    Args:
+        decade: First year of the decade.
+
+    Returns:
+        Year range, e.g., "BETWEEN 1990 AND 2000".
+    """
+    return f"BETWEEN {decade} AND {decade + 10}"
+
+
+def get_list_key(
+    constraints: Counter[Tuple[str, str]], substrings: bool = True
+) -> Optional[Tuple[str, str]]:
+    """Returns the key of the list answering a lookup.
+
+    Args:
+        constraints: Slot-value pairs of the lookup.
+        substrings (optional): Whether genres are matched as substrings of
+          the stored values. Defaults to True.
+
+    Returns:
+        Key of the list or None if no list answers the lookup.
+    """
+    if not constraints:
+        return ALL_MOVIES
+    if sum(constraints.values()) > 1:
+        return None
+    (slot, value), _ = constraints.most_common(1)[0]
+    if value.startswith(NEGATION_PREFIX):
+        return None
+    if slot == Slots.GENRES.value and substrings:
+        return slot, value.strip().lower()
+    if slot == Slots.YEAR.value:
+        operator, operands = parse_year_value(value)
+        if (
+            operator == "BETWEEN"
+            and operands[0] % 10 == 0
+            and operands[1] == operands[0] + 10
+        ):
+            return slot, str(operands[0])
+    return None
+
+
+class TopLists:
+    def __init__(self, connection_pool: ConnectionPool) -> None:
+        """Lists of candidate movies in rating order, kept in memory.
+
+        The lists are built on first use or by calling `load`, e.g., at
+        startup, and rebuilt when the catalog changes.
+
+        Args:
+            connection_pool: Connection pool of the catalog.
+        """
+        self.connection_pool = connection_pool
+        self.item_store = get_item_store(connection_pool)
+        self.facet_index = get_facet_index(connection_pool)
+        self._lists: Optional[Dict[Tuple[str, str], LookupResult]] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def load(self, version: str) -> None:
+        """Builds the lists from the catalog, unless they have already been
+        built for the given version.
+
+        Args:
+            version: Current version of the catalog.
+        """
+        with self._lock:
+            if self._lists is not None and self._version == version:
+                return
+            select_sql, params = get_query_builder(
+                self.connection_pool.table_name
+            ).build_select([])
+            cursor = self.connection_pool.cursor()
+            cursor.execute(select_sql, params)
+            columns = [x[0] for x in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            rowids = [row["rowid"] for row in rows]
+
+            constraints = {
+                (Slots.GENRES.value, genre): (Slots.GENRES.value, genre)
+                for genre in self.facet_index.get_values(Slots.GENRES.value)
+            }
+            for decade in self.facet_index.get_values(Slots.YEAR.value):
+                year = decade.rstrip("s")
+                constraints[(Slots.YEAR.value, year)] = (
+                    Slots.YEAR.value,
+                    get_decade_value(int(year)),
+                )
+
+            lists = {ALL_MOVIES: LookupResult.from_rows(rows, self.item_store)}
+            for key, constraint in constraints.items():
+                mask = self.facet_index.filter(rowids, [constraint])
+                lists[key] = LookupResult.from_rows(
+                    [row for row, keep in zip(rows, mask) if keep],
+                    self.item_store,
+                )
+            self._lists = lists
+            self._version = version
+            logger.info(
+                f"{len(lists)} top lists with {len(rows)} movies loaded."
+            )
+
+    def get(
+        self,
+        constraints: Counter[Tuple[str, str]],
+        version: str,
+        substrings: bool = True,
+    ) -> Optional[LookupResult]:
+        """Returns the list answering a lookup.
+
+        Args:
+            constraints: Slot-value pairs of the lookup.
+            version: Current version of the catalog.
+            substrings (optional): Whether genres are matched as substrings of
+              the stored values. Defaults to True.
+
+        Returns:
+            Candidate movies in rating order or None if no list answers the
+            lookup.
+        """
+        key = get_list_key(constraints, substrings)
+        if key is None:
+            return None
+        self.load(version)
+        return self._lists.get(key)
+
+
+def get_top_lists(connection_pool: ConnectionPool) -> TopLists:
+    """Returns the top lists shared by the process for a catalog.
+
+    Args:
+        connection_pool: Connection pool of the catalog.
+
+    Returns:
+        Top lists.
+    """
+    key = os.path.abspath(connection_pool.db_path)
+    with _lists_lock:
+        if key not in _lists:
+            _lists[key] = TopLists(connection_pool)
+        return _lists[key]
@@ -39,7 +39,10 @@ class DialogueManager:
         self.new_user = new_user
         self.dialogue_state_tracker = DialogueStateTracker(config, self.isBot)
         self.dialogue_policy = RuleBasedDialoguePolicy(
-            self.isBot, self.new_user
+            self.isBot,
+            self.new_user,
+            config.get("slot_statistics"),
+            config.get("facet_index"),
         )
         self.recommender: RecommenderModel = config.get("recommender")
 
@@ -4,10 +4,13 @@ agent based on the previous conversation and current dialogue."""
 
 import random
 from copy import deepcopy
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 
 from moviebot.core.intents.agent_intents import AgentIntents
 from moviebot.core.intents.user_intents import UserIntents
+from moviebot.database.facet_index import FacetIndex
+from moviebot.database.lookup_result import get_rowids, iter_items
+from moviebot.database.slot_statistics import SlotStatistics
 from moviebot.dialogue_manager.dialogue_act import DialogueAct
 from moviebot.dialogue_manager.dialogue_state import DialogueState
 from moviebot.nlu.annotation.item_constraint import ItemConstraint
@@ -16,15 +19,29 @@ from moviebot.nlu.annotation.slots import Slots
 
 
 class RuleBasedDialoguePolicy:
-    def __init__(self, isBot: bool, new_user: bool) -> None:
+    def __init__(
+        self,
+        isBot: bool,
+        new_user: bool,
+        slot_statistics: Optional[SlotStatistics] = None,
+        facet_index: Optional[FacetIndex] = None,
+    ) -> None:
         """Loads all necessary parameters for the policy.
 
         Args:
             isBot: If the conversation is via bot or not.
             new_user: Whether the user is new or not.
+            slot_statistics (optional): Statistics of the slot values in the
+              catalog. Defaults to None.
+            facet_index (optional): Index counting slot values over candidate
+              movies. If provided, the slot narrowing down the candidates the
+              most is elicited when there are too many results. Defaults to
+              None.
         """
         self.isBot = isBot
         self.new_user = new_user
+        self.slot_statistics = slot_statistics
+        self.facet_index = facet_index
 
     def _elict_dialogue_act(self, slot: str = None) -> DialogueAct:
         """Generates the elicitation dialogue act.
@@ -184,13 +201,11 @@ class RuleBasedDialoguePolicy:
             slots_to_elicit = (
                 [slot for slot in slots if not dialogue_state.frame_CIN[slot]]
                 if not dialogue_state.agent_req_filled
-                else CIN_slots,
+                else CIN_slots
             )
             agent_dacts.append(
                 self._elict_dialogue_act(
-                    random.choice(slots_to_elicit)[0]
-                    if slots_to_elicit
-                    else None
+                    self._select_slot_to_elicit(dialogue_state, slots_to_elicit)
                 )
             )
 
@@ -202,6 +217,33 @@ class RuleBasedDialoguePolicy:
             )
         return agent_dacts
 
+    def _select_slot_to_elicit(
+        self, dialogue_state: DialogueState, slots: List[str]
+    ) -> Optional[str]:
+        """Selects the slot to elicit when there are too many results.
+
+        With a facet index, it is the slot with the highest information gain
+        over the current results. Otherwise, it is the first slot.
+
+        Args:
+            dialogue_state: Current dialogue state.
+            slots: Slots that can be elicited.
+
+        Returns:
+            Slot or None if there are no slots.
+        """
+        if not slots:
+            return None
+        if self.facet_index and dialogue_state.database_result:
+            gains = self.facet_index.get_information_gain(
+                get_rowids(dialogue_state.database_result), slots
+            )
+            if gains:
+                return max(
+                    slots, key=lambda slot: gains.get(slot, float("-inf"))
+                )
+        return slots[0]
+
     def _get_agent_made_offer_dialogue_acts(
         self,
         dialogue_state: DialogueState,
@@ -380,13 +422,26 @@ class RuleBasedDialoguePolicy:
             ].slot not in [Slots.YEAR.value]:
                 if dialogue_state.database_result:
                     agent_dact.params[0].value = self._generate_examples(
-                        dialogue_state.database_result,
+                        iter_items(dialogue_state.database_result),
                         agent_dact.params[0].slot,
                     )
+                elif self.slot_statistics:
+                    # Without results, the most common values in the catalog
+                    # are given as examples.
+                    slot = agent_dact.params[0].slot
+                    agent_dact.params[0].value = self._generate_examples(
+                        (
+                            {slot: value}
+                            for value, _ in self.slot_statistics.get_top_values(
+                                slot, 20
+                            )
+                        ),
+                        slot,
+                    )
         return agent_dacts
 
     def _generate_examples(
-        self, database_result: List[Dict[str, Any]], slot: str
+        self, database_result: Iterable[Dict[str, Any]], slot: str
     ) -> str:
         """Generates a list of examples for specific slot.
 
@@ -6,6 +6,12 @@ from typing import Any, Dict, List
 
 from moviebot.core.intents.agent_intents import AgentIntents
 from moviebot.core.intents.user_intents import UserIntents
+from moviebot.database.lookup_result import (
+    ResultCursor,
+    Results,
+    bounded_count,
+    hydrate_item,
+)
 from moviebot.dialogue_manager.dialogue_act import DialogueAct
 from moviebot.dialogue_manager.dialogue_state import DialogueState
 from moviebot.domain.movie_domain import MovieDomain
@@ -27,6 +33,10 @@ class DialogueStateTracker:
         self.slots: List[str] = config.get("slots", [])
         self.isBot = isBot
         self.dialogue_state = DialogueState(self.domain, self.slots, self.isBot)
+        # Positions of the next movies to recommend in the results and in
+        # the backup results.
+        self._result_cursor = ResultCursor()
+        self._backup_cursor = ResultCursor()
 
     def initialize(self) -> None:
         """Initializes the dialogue state tracker."""
@@ -299,8 +309,8 @@ class DialogueStateTracker:
 
     def update_state_db(
         self,
-        database_result: List[Dict[str, Any]] = None,
-        backup_results: List[Dict[str, Any]] = None,
+        database_result: Results = None,
+        backup_results: Results = None,
     ) -> None:
         """Updates the state based on the results fetched from the database.
 
@@ -323,7 +333,9 @@ class DialogueStateTracker:
             ]
             self.dialogue_state.database_result = database_result
 
-            if len(database_result) > self.dialogue_state.max_db_result:
+            max_db_result = self.dialogue_state.max_db_result
+            count = bounded_count(database_result, max_db_result + 1)
+            if count > max_db_result:
                 if len(CIN_slots) > self.dialogue_state.slot_left_unasked:
                     self.dialogue_state.agent_made_partial_offer = True
                     self.dialogue_state.agent_offer_no_results = False
@@ -331,17 +343,9 @@ class DialogueStateTracker:
                     self.dialogue_state.agent_made_offer = False
                     return
 
-            # random.shuffle(database_result)
-            for result in database_result:
-                if (
-                    result[Slots.TITLE.value]
-                    not in self.dialogue_state.movies_recommended.keys()
-                ):
-                    item_found = True
-                    self.dialogue_state.item_in_focus = deepcopy(result)
-                    break
-                else:
-                    self.dialogue_state.items_in_context = True
+            item_found = self._focus_next_item(
+                database_result, self._result_cursor
+            )
 
         if (
             not item_found
@@ -349,16 +353,9 @@ class DialogueStateTracker:
             and backup_results
         ):
             self.dialogue_state.agent_should_offer_similar = False
-            for result in backup_results:
-                if (
-                    result[Slots.TITLE.value]
-                    not in self.dialogue_state.movies_recommended.keys()
-                ):
-                    item_found = True
-                    self.dialogue_state.item_in_focus = deepcopy(result)
-                    break
-                else:
-                    self.dialogue_state.items_in_context = True
+            item_found = self._focus_next_item(
+                backup_results, self._backup_cursor
+            )
 
         if item_found:
             self.dialogue_state.agent_made_partial_offer = False
@@ -371,6 +368,34 @@ class DialogueStateTracker:
             self.dialogue_state.agent_should_make_offer = False
             self.dialogue_state.agent_made_offer = False
 
+    def _focus_next_item(self, results: Results, cursor: ResultCursor) -> bool:
+        """Puts the first movie that has not been recommended in focus.
+
+        Results whose movie can no longer be hydrated (e.g., a stale row id)
+        are skipped.
+
+        Args:
+            results: Results of a lookup.
+            cursor: Position of the next movie to recommend in the results.
+
+        Returns:
+            True if a movie was found.
+        """
+        while True:
+            result = cursor.next_item(
+                results, self.dialogue_state.movies_recommended
+            )
+            if cursor.position > 0:
+                # Movies recommended before are in the results.
+                self.dialogue_state.items_in_context = True
+            if result is None:
+                return False
+            item = hydrate_item(results, result)
+            if item is not None:
+                self.dialogue_state.item_in_focus = deepcopy(item)
+                return True
+            cursor.position += 1
+
     def get_state(self) -> DialogueState:
         """Returns the current dialogue state.
 
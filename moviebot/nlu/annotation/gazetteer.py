@@ -0,0 +1,197 @@
+"""Token-level gazetteer matching slot values in an utterance.
+
+Complete values (exact matches) are found with an Aho-Corasick automaton
+whose alphabet are lemmatized tokens: a single pass over the lemmas of an
+utterance finds every value occurring in it, through failure and output
+links. Parts of values (partial matches) are found with a positional
+inverted index of the value tokens (see `value_index`), which also gives the
+number of values containing each part. The cost of matching depends on the
+length of the utterance and on the postings of its tokens, not on the number
+of values.
+
+Gazetteers are built once per process for a slot values file and shared by
+all annotators.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
+
+from moviebot.nlu.annotation.value_index import ValueIndex
+
+# Default maximum number of tokens of a match.
+DEFAULT_MAX_LENGTH = 8
+
+_gazetteers: Dict[Tuple[str, str, int], "Gazetteer"] = {}
+_gazetteers_lock = threading.Lock()
+
+
+class GazetteerMatch(NamedTuple):
+    """Token sequence of an utterance occurring in slot values.
+
+    Attributes:
+        start: Position of the first token.
+        end: Position after the last token.
+        count: Number of distinct values containing the sequence.
+        exact: Whether the sequence is a complete value.
+    """
+
+    start: int
+    end: int
+    count: int
+    exact: bool
+
+
+class Gazetteer:
+    def __init__(
+        self, values: Iterable[str], max_length: int = DEFAULT_MAX_LENGTH
+    ) -> None:
+        """Builds the automaton and the index from lemmatized slot values.
+
+        Args:
+            values: Lemmatized values, with tokens separated by whitespace.
+            max_length (optional): Maximum number of tokens of a match.
+              Defaults to DEFAULT_MAX_LENGTH.
+        """
+        values = list(dict.fromkeys(values))
+        self.max_length = max_length
+        self.index = ValueIndex(values)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._depth = [0]
+        self._exact = [False]
+        for value in values:
+            tokens = value.split()
+            if 0 < len(tokens) <= max_length:
+                self._add(tokens)
+        self._fail = [0] * len(self._goto)
+        self._output = [0] * len(self._goto)
+        self._link()
+
+    def __len__(self) -> int:
+        """Returns the number of nodes of the automaton."""
+        return len(self._goto)
+
+    def _add(self, tokens: List[str]) -> None:
+        """Inserts a value in the trie.
+
+        Args:
+            tokens: Tokens of the value.
+        """
+        node = 0
+        for token in tokens:
+            child = self._goto[node].get(token)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][token] = child
+                self._goto.append({})
+                self._depth.append(self._depth[node] + 1)
+                self._exact.append(False)
+            node = child
+        self._exact[node] = True
+
+    def _link(self) -> None:
+        """Computes the failure and output links, breadth first.
+
+        The output link of a node points to the longest value ending its
+        token sequence, or to the root.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            fail = self._fail[node]
+            self._output[node] = (
+                node if self._exact[node] else self._output[fail]
+            )
+            for token, child in self._goto[node].items():
+                self._fail[child] = self._step(fail, token)
+                queue.append(child)
+
+    def _step(self, node: int, token: str) -> int:
+        """Returns the state reached from a node with a token.
+
+        Args:
+            node: Current state.
+            token: Next token.
+
+        Returns:
+            Node of the longest prefix of a value ending with the token, or
+            the root.
+        """
+        while node and token not in self._goto[node]:
+            node = self._fail[node]
+        return self._goto[node].get(token, 0)
+
+    def find_exact(self, lemmas: Sequence[str]) -> Set[Tuple[int, int]]:
+        """Finds the values occurring in an utterance.
+
+        Args:
+            lemmas: Lemmas of the tokens of the utterance.
+
+        Returns:
+            Set of start and end positions of the values.
+        """
+        spans = set()
+        node = 0
+        for end, lemma in enumerate(lemmas, start=1):
+            node = self._step(node, lemma)
+            output = self._output[node]
+            while output:
+                spans.add((end - self._depth[output], end))
+                output = self._output[self._fail[output]]
+        return spans
+
+    def find(self, lemmas: Sequence[str]) -> List[GazetteerMatch]:
+        """Finds the token sequences of an utterance occurring in values.
+
+        Args:
+            lemmas: Lemmas of the tokens of the utterance.
+
+        Returns:
+            Matches, longest first and then in utterance order.
+        """
+        exact = self.find_exact(lemmas)
+        matches = []
+        for start in range(len(lemmas)):
+            postings = self.index.get_postings(lemmas[start : start + 1])
+            end = start + 1
+            while len(postings):
+                matches.append(
+                    GazetteerMatch(
+                        start,
+                        end,
+                        self.index.count_values(postings),
+                        (start, end) in exact,
+                    )
+                )
+                if end - start == self.max_length or end == len(lemmas):
+                    break
+                postings = self.index.extend(postings, end - start, lemmas[end])
+                end += 1
+        matches.sort(key=lambda match: (match.start - match.end, match.start))
+        return matches
+
+
+def get_gazetteer(
+    slot_values_path: str,
+    name: str,
+    values: Iterable[str],
+    max_length: int = DEFAULT_MAX_LENGTH,
+) -> Gazetteer:
+    """Returns the gazetteer shared by the process for slot values.
+
+    Args:
+        slot_values_path: Path to the slot values file.
+        name: Name of the gazetteer, e.g., the slot name.
+        values: Lemmatized values, only used if the gazetteer is not built.
+        max_length (optional): Maximum number of tokens of a match. Defaults
+          to DEFAULT_MAX_LENGTH.
+
+    Returns:
+        Gazetteer.
+    """
+    key = (os.path.abspath(slot_values_path), name, max_length)
+    with _gazetteers_lock:
+        if key not in _gazetteers:
+            _gazetteers[key] = Gazetteer(values, max_length)
+        return _gazetteers[key]
@@ -3,13 +3,14 @@ user utterance based on rules and keyword matching."""
 
 import re
 import string
-from copy import deepcopy
-from typing import Any, Callable, Dict, List, Tuple
+from itertools import groupby
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from nltk import ngrams
 from nltk.corpus import stopwords
 
 from moviebot.core.utterance.utterance import UserUtterance
+from moviebot.nlu.annotation.gazetteer import Gazetteer, get_gazetteer
 from moviebot.nlu.annotation.item_constraint import ItemConstraint
 from moviebot.nlu.annotation.operator import Operator
 from moviebot.nlu.annotation.semantic_annotation import (
@@ -19,6 +20,7 @@ from moviebot.nlu.annotation.semantic_annotation import (
 )
 from moviebot.nlu.annotation.slot_annotator import SlotAnnotator
 from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.annotation.utterance_spans import UtteranceSpans
 from moviebot.nlu.text_processing import Token
 
 
@@ -28,15 +30,20 @@ class RBAnnotator(SlotAnnotator):
         process_value: Callable[[str], str],
         lemmatize_value: Callable[[str], str],
         slot_values: Dict[str, Any],
+        slot_values_path: str = None,
     ) -> None:
         """A rule based annotator.
 
-        It uses regex and keyword matching for annotation.
+        It uses regex and keyword matching for annotation. Titles, keywords,
+        and person names are matched with gazetteers, shared by the process
+        if the path to the slot values file is given.
 
         Args:
             process_value: Function for processing text.
             lemmatize_value: Function for text lemmatization.
             slot_values: Dictionary with slot-value pairs.
+            slot_values_path (optional): Path to the slot values file.
+              Defaults to None, i.e., gazetteers are not shared.
         """
         self._process_value = process_value
         self._lemmatize_value = lemmatize_value
@@ -85,10 +92,63 @@ class RBAnnotator(SlotAnnotator):
             "historical": "history",
             "animated": "animation",
         }
-        # merging actors and directors
-        self.person_names = {}
-        for slot in [Slots.ACTORS.value, Slots.DIRECTORS.value]:
-            self.person_names.update(deepcopy(self.slot_values[slot]))
+        self._gazetteers: Dict[str, Gazetteer] = {}
+        for slot in [
+            Slots.TITLE.value,
+            Slots.KEYWORDS.value,
+            Slots.ACTORS.value,
+            Slots.DIRECTORS.value,
+        ]:
+            values = self.slot_values.get(slot, {}).values()
+            max_length = self.ngram_size.get(slot, self.ngram_size["person"])
+            self._gazetteers[slot] = (
+                get_gazetteer(slot_values_path, slot, values, max_length)
+                if slot_values_path
+                else Gazetteer(values, max_length)
+            )
+        self._spans: Optional[UtteranceSpans] = None
+
+    def annotate(
+        self, user_utterance: UserUtterance, slots: List[str]
+    ) -> List[ItemConstraint]:
+        """Annotates user utterance for several slots at once.
+
+        The tokens of the utterance are processed once and shared by the
+        annotators of all slots. Actors and directors are annotated together.
+
+        Args:
+            user_utterance: User utterance.
+            slots: Slot names.
+
+        Returns:
+            List of item constraints, in the order of the slots.
+        """
+        person_slots = [Slots.ACTORS.value, Slots.DIRECTORS.value]
+        constraints = []
+        person_name_checks = False
+        for slot in slots:
+            if slot in person_slots:
+                if person_name_checks:
+                    continue
+                person_name_checks = True
+            constraints.extend(self.slot_annotation(slot, user_utterance))
+        return constraints
+
+    def _get_spans(self, user_utterance: UserUtterance) -> UtteranceSpans:
+        """Returns the token features of an utterance.
+
+        The features of the last annotated utterance are reused.
+
+        Args:
+            user_utterance: User utterance.
+
+        Returns:
+            Token features.
+        """
+        tokens = user_utterance.get_tokens()
+        if self._spans is None or self._spans.tokens is not tokens:
+            self._spans = UtteranceSpans(tokens, self.stop_words)
+        return self._spans
 
     def slot_annotation(
         self, slot: str, user_utterance: UserUtterance
@@ -136,20 +196,26 @@ class RBAnnotator(SlotAnnotator):
             List of item constraints.
         """
         param = None
-        values = self.slot_values[slot]
-        tokens = user_utterance.get_tokens()
-        for i in range(len(tokens)):
-            for value, lem_value in values.items():
-                len_lem_value = len(lem_value.split())
-                token = (
-                    tokens[i]
-                    if len_lem_value == 1
-                    else sum(tokens[i : i + len_lem_value])
-                )
-
-                if token.lemma.startswith(lem_value):
+        spans = self._get_spans(user_utterance)
+        # TODO(Ivica Kostric): This could be merged with the main genre
+        # dictionary at initialization time.
+        options = [
+            (value, lem_value, len(lem_value.split()))
+            for value, lem_value in self.slot_values[slot].items()
+        ], [
+            (key, self._process_value(key), len(key.split()))
+            for key in self.genres_alternatives
+        ]
+        for i in range(len(spans)):
+            for genres in options:
+                for value, lem_value, size in genres:
+                    end = min(i + size, len(spans))
+                    if not spans.get_lemma(i, end).startswith(lem_value):
+                        continue
                     annotation = SemanticAnnotation.from_span(
-                        token, AnnotationType.NAMED_ENTITY, EntityType.GENRES
+                        spans.get_ngram(i, end).to_span(),
+                        AnnotationType.NAMED_ENTITY,
+                        EntityType.GENRES,
                     )
                     if param:
                         param.add_value(value.lower(), annotation)
@@ -158,25 +224,6 @@ class RBAnnotator(SlotAnnotator):
                             slot, Operator.EQ, value.lower(), annotation
                         )
 
-            # TODO(Ivica Kostric): This could be merged with the main genre
-            # dictionary at initialization time.
-            for key, value in self.genres_alternatives.items():
-                len_key = len(key.split())
-                token = (
-                    tokens[i] if len_key == 1 else sum(tokens[i : i + len_key])
-                )
-
-                if token.lemma.startswith(self._process_value(key)):
-                    annotation = SemanticAnnotation.from_span(
-                        token, AnnotationType.NAMED_ENTITY, EntityType.GENRES
-                    )
-                    if param:
-                        param.add_value(key.lower(), annotation)
-                    else:
-                        param = ItemConstraint(
-                            slot, Operator.EQ, key.lower(), annotation
-                        )
-
         return [param] if param else []
 
     def _title_annotator(
@@ -184,7 +231,9 @@ class RBAnnotator(SlotAnnotator):
     ) -> List[ItemConstraint]:
         """This annotator is used to check the movie title.
 
-        Sometimes the user can just enter a part of the name.
+        Sometimes the user can just enter a part of the name. Longer n-grams
+        are preferred; among partial matches of the same length, the one
+        occurring in the fewest titles is chosen.
 
         Args:
             slot: Slot name.
@@ -193,73 +242,29 @@ class RBAnnotator(SlotAnnotator):
         Returns:
             List of item constraints.
         """
-        tokens = user_utterance.get_tokens()
-        values = self.slot_values[slot]
-        processed_values = set(values.values())
-        # split into n-grams
-        for ngram_size in range(min(self.ngram_size[slot], len(tokens)), 0, -1):
+        spans = self._get_spans(user_utterance)
+        matches = self._gazetteers[slot].find(spans.lemmas)
+        for _, group in groupby(matches, key=lambda m: m.end - m.start):
             options = {}
-            for gram_list in ngrams(tokens, ngram_size):
-                gram = sum(gram_list).lemma
-                for processed_value in processed_values:
-                    if (
-                        processed_value == gram
-                        and len(
-                            [
-                                x.lemma
-                                for x in gram_list
-                                if x.lemma in self.stop_words
-                            ]
-                        )
-                        < ngram_size
-                    ):
-                        annotation = SemanticAnnotation.from_span(
-                            sum(gram_list),
-                            AnnotationType.NAMED_ENTITY,
-                            EntityType.TITLE,
-                        )
-                        param = ItemConstraint(
-                            slot, Operator.EQ, gram, annotation
-                        )
-                        return [param]
-                if (
-                    len([x for x in gram_list if x.lemma in self.stop_words])
-                    == 0
-                    and len([int(val) for val in re.findall(r"\b\d+", gram)])
-                    == 0
-                ):
-                    # Check if there are no words that are included in the list
-                    # of stop words or that are numbers.
-                    if ngram_size == 1:
-                        # TODO: Confirm that this is captured by the above for
-                        # loop and remove when refactoring.
-                        gram_occurrence = len(
-                            [
-                                value
-                                for value in processed_values
-                                if gram == value
-                            ]
-                        )
-                    else:
-                        gram_occurrence = len(
-                            [
-                                value
-                                for value in processed_values
-                                if f" {gram} " in f" {value} "
-                            ]
+            for match in group:
+                ngram = spans.get_ngram(match.start, match.end)
+                if match.exact and not spans.is_stop(match.start, match.end):
+                    annotation = SemanticAnnotation.from_span(
+                        ngram.to_span(),
+                        AnnotationType.NAMED_ENTITY,
+                        EntityType.TITLE,
+                    )
+                    return [
+                        ItemConstraint(
+                            slot, Operator.EQ, ngram.lemma, annotation
                         )
-                    if gram_occurrence:
-                        options[gram] = gram_occurrence
+                    ]
+                # Partial matches must not include stop words or numbers.
+                if len(ngram) > 1 and spans.is_content(match.start, match.end):
+                    options.setdefault(ngram.lemma, match.count)
             if options:
-                options = {
-                    k: v
-                    for k, v in sorted(
-                        options.items(), key=lambda item: item[1]
-                    )
-                }
-                for gram in options:
-                    param = ItemConstraint(slot, Operator.EQ, gram.strip())
-                    return [param]
+                gram = min(options, key=options.get)
+                return [ItemConstraint(slot, Operator.EQ, gram.strip())]
         return []
 
     def _keywords_annotator(
@@ -276,50 +281,24 @@ class RBAnnotator(SlotAnnotator):
         Returns:
             List of item constraints.
         """
-        tokens = user_utterance.get_tokens()
-        values = self.slot_values[slot]
-        for ngram_size in range(min(self.ngram_size[slot], len(tokens)), 0, -1):
-            for gram_list in ngrams(tokens, ngram_size):
-                gram = sum(gram_list).lemma
-
-                # TODO (Ivica Kostric): maybe 'no numbers' should be changed
-                # since there are some numbers in keywords (.44, 007, age).
-                # Same goes for stopwords. There are some stopwords as part of
-                # keywords.
-                # Alternatively, there is possibility to put a stopword flag
-                # directly on tokens beforehand.
-
-                if (
-                    len([int(val) for val in re.findall(r"\b\d+", gram)]) == 0
-                    and len(
-                        [
-                            x.lemma
-                            for x in gram_list
-                            if x.lemma in self.stop_words
-                        ]
-                    )
-                    == 0
-                ):
-                    for _, lem_value in values.items():
-                        if lem_value == gram:
-                            annotation = SemanticAnnotation.from_span(
-                                sum(gram_list), AnnotationType.KEYWORD
-                            )
-                            param = ItemConstraint(
-                                slot, Operator.EQ, gram, annotation
-                            )
-
-                            return [param]
-                        elif (ngram_size == 1 and gram == lem_value) or (
-                            ngram_size > 1 and f" {gram} " in f" {lem_value} "
-                        ):
-                            annotation = SemanticAnnotation.from_span(
-                                sum(gram_list), AnnotationType.KEYWORD
-                            )
-                            param = ItemConstraint(
-                                slot, Operator.EQ, gram, annotation
-                            )
-                            return [param]
+        spans = self._get_spans(user_utterance)
+        for match in self._gazetteers[slot].find(spans.lemmas):
+            ngram = spans.get_ngram(match.start, match.end)
+            # TODO (Ivica Kostric): maybe 'no numbers' should be changed
+            # since there are some numbers in keywords (.44, 007, age).
+            # Same goes for stopwords. There are some stopwords as part of
+            # keywords.
+            # Alternatively, there is possibility to put a stopword flag
+            # directly on tokens beforehand.
+            if (match.exact or len(ngram) > 1) and spans.is_content(
+                match.start, match.end
+            ):
+                annotation = SemanticAnnotation.from_span(
+                    ngram.to_span(), AnnotationType.KEYWORD
+                )
+                return [
+                    ItemConstraint(slot, Operator.EQ, ngram.lemma, annotation)
+                ]
         return []
 
     def _person_name_annotator(
@@ -335,38 +314,33 @@ class RBAnnotator(SlotAnnotator):
         Returns:
             List of item constraints.
         """
-        tokens = user_utterance.get_tokens()
-        if not slots:
-            slots = [Slots.ACTORS.value, Slots.DIRECTORS.value]
-            person_names = self.person_names
-        else:
-            slots = [slots]
-            person_names = self.slot_values[slots]
+        spans = self._get_spans(user_utterance)
+        slots = slots or [Slots.ACTORS.value, Slots.DIRECTORS.value]
+        exact = {
+            slot: self._gazetteers[slot].find_exact(spans.lemmas)
+            for slot in slots
+        }
         params = []
-        for ngram_size in range(self.ngram_size["person"], 0, -1):
-            for gram_list in ngrams(tokens, ngram_size):
-                gram = sum(gram_list).lemma
-                for _, lem_value in person_names.items():
-                    if (
-                        f" {gram} " in f" {lem_value} "
-                        and gram not in self.stop_words
-                    ):
-                        # gramR = self.find_in_raw_utterance(raw_utterance,
-                        #                                   ngram_size,
-                        #                                   gram)
-                        for slot in slots:
-                            if gram in self.slot_values[slot].values():
-                                annotation = SemanticAnnotation.from_span(
-                                    sum(gram_list),
-                                    AnnotationType.NAMED_ENTITY,
-                                    EntityType.PERSON,
-                                )
-                                params.append(
-                                    ItemConstraint(
-                                        slot, Operator.EQ, gram, annotation
-                                    )
-                                )
-                        break
+        for _, group in groupby(
+            sorted(
+                set().union(*exact.values()), key=lambda x: (x[0] - x[1], x[0])
+            ),
+            key=lambda x: x[1] - x[0],
+        ):
+            for start, end in group:
+                gram = spans.get_lemma(start, end)
+                if gram in self.stop_words:
+                    continue
+                for slot in slots:
+                    if (start, end) in exact[slot]:
+                        annotation = SemanticAnnotation.from_span(
+                            spans.get_ngram(start, end).to_span(),
+                            AnnotationType.NAMED_ENTITY,
+                            EntityType.PERSON,
+                        )
+                        params.append(
+                            ItemConstraint(slot, Operator.EQ, gram, annotation)
+                        )
             if len(params) > 0:
                 return params
         return []
@@ -0,0 +1,141 @@
+"""Token features of an utterance shared by the slot annotators.
+
+The lemmas of the tokens, and whether they are stop words or numbers, are
+computed once per utterance. Prefix counts of these flags let the annotators
+check any n-gram in constant time.
+
+N-grams are represented by views over the tokens (`NGram`), holding only
+token positions. Joined lemmas are cached per utterance, and a `Span` is only
+created when an annotation is emitted, instead of summing tokens for every
+n-gram.
+"""
+
+import re
+from itertools import accumulate
+from typing import Dict, List, Set, Tuple
+
+from moviebot.nlu.text_processing import Span, Token
+
+_NUMBER = re.compile(r"\b\d")
+
+
+class UtteranceSpans:
+    def __init__(self, tokens: List[Token], stop_words: Set[str]) -> None:
+        """Precomputes the token features of an utterance.
+
+        Args:
+            tokens: Tokens of the utterance.
+            stop_words: Stop words of the annotator.
+        """
+        self.tokens = tokens
+        self.lemmas = [token.lemma for token in tokens]
+        stop = [lemma in stop_words for lemma in self.lemmas]
+        other = [
+            is_stop or _NUMBER.search(lemma) is not None
+            for lemma, is_stop in zip(self.lemmas, stop)
+        ]
+        self._stop_counts = [0, *accumulate(stop)]
+        self._other_counts = [0, *accumulate(other)]
+        self._joined_lemmas: Dict[Tuple[int, int], str] = {}
+
+    def __len__(self) -> int:
+        """Returns the number of tokens."""
+        return len(self.tokens)
+
+    def is_stop(self, start: int, end: int) -> bool:
+        """Checks whether all tokens of an n-gram are stop words.
+
+        Args:
+            start: Position of the first token.
+            end: Position after the last token.
+
+        Returns:
+            True if all tokens are stop words.
+        """
+        return self._stop_counts[end] - self._stop_counts[start] == end - start
+
+    def is_content(self, start: int, end: int) -> bool:
+        """Checks that an n-gram has no stop words and no numbers.
+
+        Args:
+            start: Position of the first token.
+            end: Position after the last token.
+
+        Returns:
+            True if no token is a stop word or starts a number.
+        """
+        return self._other_counts[end] == self._other_counts[start]
+
+    def get_lemma(self, start: int, end: int) -> str:
+        """Returns the lemma of an n-gram.
+
+        Args:
+            start: Position of the first token.
+            end: Position after the last token.
+
+        Returns:
+            Lemmas of the tokens joined with spaces.
+        """
+        if end - start == 1:
+            return self.lemmas[start]
+        lemma = self._joined_lemmas.get((start, end))
+        if lemma is None:
+            lemma = " ".join(self.lemmas[start:end])
+            self._joined_lemmas[(start, end)] = lemma
+        return lemma
+
+    def get_ngram(self, start: int, end: int) -> "NGram":
+        """Returns a view of an n-gram.
+
+        Args:
+            start: Position of the first token.
+            end: Position after the last token.
+
+        Returns:
+            N-gram.
+        """
+        return NGram(self, start, end)
+
+
+class NGram:
+    __slots__ = ("utterance_spans", "start", "end")
+
+    def __init__(
+        self, utterance_spans: UtteranceSpans, start: int, end: int
+    ) -> None:
+        """View of consecutive tokens of an utterance.
+
+        Args:
+            utterance_spans: Token features of the utterance.
+            start: Position of the first token.
+            end: Position after the last token.
+        """
+        self.utterance_spans = utterance_spans
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        """Returns the number of tokens."""
+        return self.end - self.start
+
+    @property
+    def lemma(self) -> str:
+        """Lemmas of the tokens joined with spaces."""
+        return self.utterance_spans.get_lemma(self.start, self.end)
+
+    def to_span(self) -> Span:
+        """Creates the span of the n-gram in the original utterance.
+
+        Returns:
+            Span equal to the sum of the tokens, i.e., the token itself for
+            unigrams.
+        """
+        tokens = self.utterance_spans.tokens[self.start : self.end]
+        if len(tokens) == 1:
+            return tokens[0]
+        return Span(
+            " ".join(token.text for token in tokens),
+            tokens[0].start,
+            tokens[-1].end,
+            self.lemma,
+        )
@@ -0,0 +1,136 @@
+"""Positional inverted index of the tokens of slot values.
+
+Every lemma token is mapped to its postings: the positions at which it occurs
+in the values, encoded as `value_id * stride + position` in a sorted array.
+The occurrences of a token sequence are found by intersecting the postings of
+its first token with the postings of the following ones, shifted by their
+offset, so that partial values (e.g., "hanks" for "tom hanks") are looked up
+without scanning the values. Tokens starting with a prefix are found by
+binary search in the sorted vocabulary.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+
+class ValueIndex:
+    def __init__(self, values: Iterable[str]) -> None:
+        """Builds the index from lemmatized slot values.
+
+        Args:
+            values: Lemmatized values, with tokens separated by whitespace.
+              Duplicate values are indexed once.
+        """
+        values = [value.split() for value in dict.fromkeys(values)]
+        self.stride = max((len(tokens) for tokens in values), default=0) + 1
+        postings: Dict[str, List[int]] = {}
+        for value_id, tokens in enumerate(values):
+            for position, token in enumerate(tokens):
+                postings.setdefault(token, []).append(
+                    value_id * self.stride + position
+                )
+        # Values and positions are visited in order, so postings are sorted.
+        self._postings = {
+            token: np.array(token_postings, dtype=np.int64)
+            for token, token_postings in postings.items()
+        }
+        self._empty = np.array([], dtype=np.int64)
+        self._vocabulary = sorted(self._postings)
+
+    def get_postings(self, lemmas: Sequence[str]) -> np.ndarray:
+        """Returns the occurrences of a token sequence in the values.
+
+        Args:
+            lemmas: Token sequence.
+
+        Returns:
+            Sorted array of encoded positions of the first token of each
+            occurrence.
+        """
+        if not lemmas:
+            return self._empty
+        postings = self._postings.get(lemmas[0], self._empty)
+        for offset, lemma in enumerate(lemmas[1:], start=1):
+            if len(postings) == 0:
+                break
+            postings = self.extend(postings, offset, lemma)
+        return postings
+
+    def extend(
+        self, postings: np.ndarray, offset: int, lemma: str
+    ) -> np.ndarray:
+        """Keeps the occurrences of a token sequence followed by a token.
+
+        Args:
+            postings: Occurrences of the token sequence.
+            offset: Length of the token sequence.
+            lemma: Next token.
+
+        Returns:
+            Occurrences of the extended token sequence.
+        """
+        following = self._postings.get(lemma)
+        if following is None:
+            return self._empty
+        # An occurrence ends within its value, so shifted positions do not
+        # overflow into the next value.
+        shifted = postings + offset
+        found = np.searchsorted(following, shifted)
+        found[found == len(following)] = 0
+        return postings[following[found] == shifted]
+
+    def complete(self, prefix: str) -> List[str]:
+        """Returns the tokens starting with a prefix.
+
+        Args:
+            prefix: Prefix of the tokens.
+
+        Returns:
+            Sorted list of tokens.
+        """
+        start = bisect_left(self._vocabulary, prefix)
+        # Tokens starting with the prefix sort before the prefix followed by
+        # the last code point.
+        end = bisect_left(self._vocabulary, prefix + chr(0x10FFFF), start)
+        return self._vocabulary[start:end]
+
+    def match(self, lemmas: Sequence[str]) -> np.ndarray:
+        """Returns the values containing a token sequence, its last token
+        being matched as a prefix (e.g., "tom hank" for "tom hanks").
+
+        Args:
+            lemmas: Token sequence.
+
+        Returns:
+            Sorted array of value ids.
+        """
+        if not lemmas:
+            return self._empty
+        prefix = self.get_postings(lemmas[:-1])
+        if len(lemmas) > 1 and len(prefix) == 0:
+            return self._empty
+        occurrences = [
+            self.get_postings([lemma])
+            if len(lemmas) == 1
+            else self.extend(prefix, len(lemmas) - 1, lemma)
+            for lemma in self.complete(lemmas[-1])
+        ]
+        if not occurrences:
+            return self._empty
+        return np.unique(np.concatenate(occurrences) // self.stride)
+
+    def count_values(self, postings: np.ndarray) -> int:
+        """Returns the number of distinct values of occurrences.
+
+        Args:
+            postings: Sorted occurrences.
+
+        Returns:
+            Number of values.
+        """
+        if len(postings) == 0:
+            return 0
+        value_ids = postings // self.stride
+        return int(np.count_nonzero(np.diff(value_ids))) + 1
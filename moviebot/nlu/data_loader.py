@@ -8,7 +8,7 @@ from typing import Any, Callable, Dict
 
 from moviebot.database.db_movies import DataBase
 from moviebot.domain.movie_domain import MovieDomain
-from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.slot_values import SlotValueCollector
 
 DEFAULT_SLOT_VALUE_PATH = "data/slot_values.json"
 
@@ -87,46 +87,19 @@ class DataLoader:
         ).fetchall()
         total_count = round(len(all_data), -2)
         print_count = int(total_count / 4)
-        slot_values = {
-            slot: {} if slot != Slots.YEAR.value else []
-            for slot in self.domain.slots_annotation
-        }
-        multi_slots = {
-            x.value
-            for x in [
-                Slots.GENRES,
-                Slots.KEYWORDS,
-                Slots.ACTORS,
-                Slots.DIRECTORS,
-            ]
-        }
+        collector = SlotValueCollector(
+            self.domain.slots_annotation, self.lemmatize_value
+        )
 
         logger.info("Loading the database......")
         for count, row in enumerate(all_data):
-            for slot, value in zip(self.domain.slots_annotation, row):
-                if slot in multi_slots:
-                    temp_result = [x.strip() for x in value.split(",")]
-                    if slot == Slots.GENRES.value:
-                        temp_result = [x.lower() for x in temp_result]
-                    slot_values[slot].update(
-                        {
-                            temp_value: self.lemmatize_value(temp_value)
-                            for temp_value in temp_result
-                            if temp_value not in slot_values[slot]
-                        }
-                    )
-                elif value not in slot_values[slot]:
-                    if slot == Slots.YEAR.value:
-                        slot_values[slot].append(value)
-                    else:
-                        slot_values[slot].update(
-                            {value: self.lemmatize_value(value)}
-                        )
+            collector.add(dict(zip(self.domain.slots_annotation, row)))
             if (count + 1) % print_count == 0:
                 logger.info(
                     f"{int(100 * (count+1) / total_count)}% data is loaded."
                 )
 
+        slot_values = collector.slot_values
         with open(self.slot_values_path, "w") as slot_val_file:
             logger.info(f"Writing loaded database to {self.slot_values_path}")
             json.dump(slot_values, slot_val_file, indent=4)
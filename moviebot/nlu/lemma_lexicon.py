@@ -0,0 +1,141 @@
+"""Builds the lemma lexicon of the tokenizer.
+
+The lexicon maps every word of the slot values and of the training
+utterances (lowercased, without apostrophes) to its WordNet lemma. Loaded by
+the tokenizer at startup, it answers most lookups without WordNet, whose
+corpus is slow to load and to query.
+
+Usage: python -m moviebot.nlu.lemma_lexicon -s <path_to_slot_values>
+    -u <path_to_training_utterances> -o <path_to_lexicon>
+"""
+
+import argparse
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List
+
+import yaml
+
+from moviebot.nlu.text_processing import Tokenizer
+
+DEFAULT_LEXICON_PATH = "data/lemma_lexicon.json"
+
+logger = logging.getLogger(__name__)
+
+
+def iter_slot_value_texts(slot_values: Dict[str, Any]) -> Iterator[str]:
+    """Yields the values of all slots and their lemmatized forms.
+
+    Args:
+        slot_values: Slot values, as loaded from `slot_values.json`.
+
+    Yields:
+        Texts of the values.
+    """
+    for values in slot_values.values():
+        if isinstance(values, dict):
+            for value, lemmatized_value in values.items():
+                yield value
+                yield lemmatized_value
+
+
+def iter_utterance_texts(utterances: Dict[str, List[str]]) -> Iterator[str]:
+    """Yields the training utterances of all intents.
+
+    Args:
+        utterances: Annotated utterances by intent, as loaded from
+          `utterances.yaml`. Annotation markup is split as punctuation.
+
+    Yields:
+        Texts of the utterances.
+    """
+    for intent_utterances in utterances.values():
+        yield from intent_utterances or []
+
+
+def build_lemma_lexicon(
+    slot_values_path: str, utterances_path: str, output_path: str
+) -> Dict[str, str]:
+    """Lemmatizes the vocabulary of the slot values and training utterances
+    and saves the lexicon.
+
+    Args:
+        slot_values_path: Path to the slot values file.
+        utterances_path: Path to the training utterances file.
+        output_path: Path the lexicon is saved to.
+
+    Returns:
+        Lexicon with words as keys and lemmas as values.
+    """
+    tokenizer = Tokenizer()
+    texts: List[str] = []
+    if os.path.isfile(slot_values_path):
+        with open(slot_values_path) as slot_values_file:
+            texts.extend(iter_slot_value_texts(json.load(slot_values_file)))
+    else:
+        logger.warning(f"Slot values {slot_values_path} not found.")
+    if os.path.isfile(utterances_path):
+        with open(utterances_path) as utterances_file:
+            texts.extend(
+                iter_utterance_texts(yaml.safe_load(utterances_file) or {})
+            )
+    else:
+        logger.warning(f"Training utterances {utterances_path} not found.")
+
+    words = {
+        token.text.replace("'", "").lower()
+        for text in texts
+        for token in tokenizer.process_text(str(text))
+    }
+    words.discard("")
+    lexicon = {word: tokenizer.lemmatize_text(word) for word in sorted(words)}
+    with open(output_path, "w") as lexicon_file:
+        json.dump(lexicon, lexicon_file, indent=0)
+    logger.info(f"Lemma lexicon with {len(lexicon)} words written.")
+    return lexicon
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Builds the lemma lexicon of the tokenizer."
+    )
+    parser.add_argument(
+        "-s",
+        "--slot_values_path",
+        type=str,
+        help="Path to the slot values file",
+        default="data/slot_values.json",
+    )
+    parser.add_argument(
+        "-u",
+        "--utterances_path",
+        type=str,
+        help="Path to the training utterances file",
+        default="data/training/utterances.yaml",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_path",
+        type=str,
+        help="Path the lexicon is saved to",
+        default=DEFAULT_LEXICON_PATH,
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    build_lemma_lexicon(
+        args.slot_values_path, args.utterances_path, args.output_path
+    )
@@ -7,11 +7,10 @@ from abc import ABC, abstractmethod
 from copy import deepcopy
 from typing import Any, Dict, List, Optional, Union
 
-import wikipedia
-
 from moviebot.core.core_types import DialogueOptions
 from moviebot.core.intents import UserIntents
 from moviebot.core.utterance import UserUtterance
+from moviebot.database.similarity_index import SimilarityIndex
 from moviebot.dialogue_manager.dialogue_act import DialogueAct
 from moviebot.dialogue_manager.dialogue_state import DialogueState
 from moviebot.nlu.annotation.item_constraint import ItemConstraint
@@ -30,6 +29,12 @@ class NLU(ABC):
         self.config = config
         if config:
             self.intents_checker = UserIntentsChecker(config)
+        self.similarity_index: Optional[SimilarityIndex] = (
+            config.get("similarity_index") if config else None
+        )
+        self.wikipedia_fallback = (
+            config.get("wikipedia_fallback", True) if config else True
+        )
 
     @abstractmethod
     def generate_dacts(
@@ -87,7 +92,11 @@ class NLU(ABC):
     def generate_params_continue_recommendation(
         self, item_in_focus: Dict[str, Any]
     ) -> Optional[ItemConstraint]:
-        """Finds similar movies based on the title of item in focus.
+        """Finds similar movies to the item in focus.
+
+        Similar movies are read from the similarity index. Wikipedia is
+        searched instead if the index is not available or has no similar
+        movies, unless the Wikipedia fallback is disabled.
 
         Args:
             item_in_focus: Item in conversation focus.
@@ -95,6 +104,30 @@ class NLU(ABC):
         Returns:
             Item constraint with titles of similar movies to the item in focus.
         """
+        if self.similarity_index:
+            results = self.similarity_index.get_similar_titles(
+                item_in_focus[Slots.ID.value]
+            )
+            if results:
+                return [
+                    ItemConstraint(Slots.TITLE.value, Operator.EQ, str(results))
+                ]
+        if self.wikipedia_fallback:
+            return self._search_similar_movies(item_in_focus)
+
+    def _search_similar_movies(
+        self, item_in_focus: Dict[str, Any]
+    ) -> Optional[ItemConstraint]:
+        """Searches Wikipedia for similar movies to the item in focus.
+
+        Args:
+            item_in_focus: Item in conversation focus.
+
+        Returns:
+            Item constraint with titles of similar movies to the item in focus.
+        """
+        import wikipedia
+
         movie_title = item_in_focus[Slots.TITLE.value]
         for term in ["film", "movie"]:
             results = wikipedia.search(
@@ -253,7 +253,7 @@ class RuleBasedNLU(NLU):
                 isinstance(value, list) and value[0] == raw_utterance
             ) or value == raw_utterance:
                 if dact.intent == UserIntents.CONTINUE_RECOMMENDATION:
-                    dact.params = self.intents_checker.generate_params_continue_recommendation(  # noqa: E501
+                    dact.params = self.generate_params_continue_recommendation(
                         item_in_focus
                     )
                 dacts.append(dact)
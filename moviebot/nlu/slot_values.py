@@ -0,0 +1,101 @@
+"""Slot values of the movie catalog.
+
+Multi-valued slots (genres, keywords, actors, and directors) are stored as
+comma-separated strings. This module splits them, normalizes values to the
+lemmatized forms used by the NLU, and collects the values of all movies with
+their frequencies, e.g., to generate `slot_values.json` or the slot
+statistics. It does not depend on the database layer, so both the database
+and the NLU can use it.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.text_processing import get_tokenizer
+
+MULTI_VALUED_SLOTS = [
+    Slots.GENRES.value,
+    Slots.KEYWORDS.value,
+    Slots.ACTORS.value,
+    Slots.DIRECTORS.value,
+]
+
+
+def split_slot_value(slot: str, value: Optional[str]) -> List[str]:
+    """Splits a comma-separated value of a multi-valued slot.
+
+    Genres are lowercased as in the slot values loaded by the NLU.
+
+    Args:
+        slot: Slot name.
+        value: Comma-separated values.
+
+    Returns:
+        List of values.
+    """
+    if not value:
+        return []
+    values = [x.strip() for x in value.split(",") if x.strip()]
+    if slot == Slots.GENRES.value:
+        values = [x.lower() for x in values]
+    return values
+
+
+def normalize_value(value: str) -> str:
+    """Returns the lemmatized normal form of a slot value.
+
+    It follows the preprocessing used by the NLU to generate the lemmatized
+    slot values.
+
+    Args:
+        value: Slot value.
+
+    Returns:
+        Normalized value.
+    """
+    return get_tokenizer().lemmatize_value(value)
+
+
+class SlotValueCollector:
+    def __init__(
+        self, slots: List[str], lemmatize_value: Callable[[str], str]
+    ) -> None:
+        """Collects the values of slots, their lemmatized forms, and the
+        number of movies having each value.
+
+        Args:
+            slots: Slots to collect values for.
+            lemmatize_value: Function for lemmatization.
+        """
+        self.lemmatize_value = lemmatize_value
+        self.slot_values: Dict[str, Any] = {
+            slot: {} if slot != Slots.YEAR.value else [] for slot in slots
+        }
+        self.frequencies: Counter[Tuple[str, str]] = Counter()
+        self._years: Set[Any] = set()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Adds the slot values of a movie.
+
+        Args:
+            row: Movie with slots as keys.
+        """
+        for slot, values in self.slot_values.items():
+            value = row.get(slot)
+            if value is None:
+                continue
+            if slot == Slots.YEAR.value:
+                self.frequencies[(slot, str(value))] += 1
+                if value not in self._years:
+                    self._years.add(value)
+                    values.append(value)
+                continue
+            for temp_value in dict.fromkeys(
+                split_slot_value(slot, value)
+                if slot in MULTI_VALUED_SLOTS
+                else [value]
+            ):
+                self.frequencies[(slot, temp_value)] += 1
+                if temp_value not in values:
+                    values[temp_value] = self.lemmatize_value(temp_value)
@@ -2,14 +2,41 @@
 
 The user utterance is broken into tokens which contain additional
 information about the it.
+
+A single tokenizer is shared by the process (see `get_tokenizer`). Words are
+found with one compiled regex, keeping their offsets in the text. Lemmas are
+looked up in a lexicon precomputed for the slot values and the training
+utterances (see `moviebot.nlu.lemma_lexicon`), and unseen words are
+lemmatized with WordNet through a bounded LRU cache.
 """
 
+import json
+import logging
+import os
+import re
 import string
-from typing import List, Optional
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
 
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 
+# Maximum number of unseen words whose lemmas are cached.
+LEMMA_CACHE_SIZE = 10000
+
+# Words are separated by whitespace and punctuation, except apostrophes.
+_PUNCTUATION = string.punctuation.replace("'", "")
+_WORD = re.compile(rf"[^\s{re.escape(_PUNCTUATION)}]+")
+_VALUE_PUNCTUATION = str.maketrans(
+    string.punctuation, " " * len(string.punctuation)
+)
+
+_tokenizer: Optional["Tokenizer"] = None
+_tokenizer_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
 
 class Span:
     def __init__(
@@ -100,12 +127,21 @@ class Token(Span):
 
 
 class Tokenizer:
-    def __init__(self, additional_stop_words: List[str] = None) -> None:
+    def __init__(
+        self,
+        additional_stop_words: List[str] = None,
+        lexicon: Dict[str, str] = None,
+        cache_size: int = LEMMA_CACHE_SIZE,
+    ) -> None:
         """This class contains methods needed for preprocessing sentences.
 
         Args:
             additional_stop_words: Stop words to use in addition to NLTK
               stopword list.
+            lexicon (optional): Lemmas of lowercased words without
+              apostrophes. Defaults to None.
+            cache_size (optional): Maximum number of cached lemmas of words
+              missing from the lexicon. Defaults to LEMMA_CACHE_SIZE.
         """
         stop_words = stopwords.words("english")
         if additional_stop_words:
@@ -113,7 +149,10 @@ class Tokenizer:
 
         self._stop_words = set(stop_words)
         self._lemmatizer = WordNetLemmatizer()
-        self._punctuation = set(string.punctuation.replace("'", ""))
+        self.lexicon = lexicon or {}
+        self._lemmatize_unseen = lru_cache(maxsize=cache_size)(
+            self._lemmatizer.lemmatize
+        )
 
     def process_text(self, text: str) -> List[Token]:
         """Processes given text.
@@ -127,23 +166,16 @@ class Tokenizer:
         Returns:
             List of tokens.
         """
-        processed_text = self.remove_punctuation(text)
-        word_tokens = processed_text.split()
-
-        return self.tokenize(word_tokens, text)
-
-    def remove_punctuation(self, text: str) -> str:
-        """Defines patterns of punctuation marks to remove in the utterance.
-
-        Args:
-            text: A piece of text.
-
-        Returns:
-            A piece of text without punctuation.
-        """
-        return "".join(
-            ch if ch not in self._punctuation else " " for ch in text
-        )
+        return [
+            Token(
+                match.group(),
+                match.start(),
+                match.end(),
+                self.lemmatize_text(match.group()),
+                match.group() in self._stop_words,
+            )
+            for match in _WORD.finditer(text)
+        ]
 
     def lemmatize_text(self, text: str) -> str:
         """Returns string lemma.
@@ -154,25 +186,80 @@ class Tokenizer:
         Returns:
             Lemmatized piece of text.
         """
-        text = text.replace("'", "")
-        return self._lemmatizer.lemmatize(text.lower())
+        text = text.replace("'", "").lower()
+        lemma = self.lexicon.get(text)
+        return lemma if lemma is not None else self._lemmatize_unseen(text)
+
+    def lemmatize_value(self, value: str) -> str:
+        """Returns the lemmatized normal form of a slot value.
 
-    def tokenize(self, word_tokens: List[str], text: str) -> List[Token]:
-        """Returns a tokenized copy of text.
+        The value is lowercased, punctuation is removed, and every word is
+        lemmatized.
 
         Args:
-            text: A piece of text.
+            value: Slot value.
 
         Returns:
-            List of tokens.
+            Lemmas of the words joined with spaces.
         """
-        end = 0
-        tokens = []
-        for word in word_tokens:
-            start = text.index(word, end)
-            end = start + len(word)
-            lemma = self.lemmatize_text(word)
-            is_stopword = word in self._stop_words
-
-            tokens.append(Token(word, start, end, lemma, is_stopword))
-        return tokens
+        value = value.replace("'", "").translate(_VALUE_PUNCTUATION)
+        return " ".join(self.lemmatize_text(word) for word in value.split())
+
+
+def load_lexicon(lexicon_path: str) -> Dict[str, str]:
+    """Loads a lemma lexicon.
+
+    Args:
+        lexicon_path: Path to the JSON file with words as keys and lemmas as
+          values.
+
+    Returns:
+        Lexicon, empty if the file does not exist.
+    """
+    if not os.path.isfile(lexicon_path):
+        logger.warning(
+            f"Lemma lexicon {lexicon_path} not found, words are lemmatized "
+            "with WordNet."
+        )
+        return {}
+    with open(lexicon_path) as lexicon_file:
+        return json.load(lexicon_file)
+
+
+def configure_tokenizer(
+    lexicon_path: str = None, cache_size: int = LEMMA_CACHE_SIZE
+) -> Tokenizer:
+    """Replaces the tokenizer shared by the process.
+
+    Utterances tokenized afterwards use the new tokenizer. Without lexicon,
+    WordNet is loaded right away rather than on the first utterance.
+
+    Args:
+        lexicon_path (optional): Path to the lemma lexicon. Defaults to None.
+        cache_size (optional): Maximum number of cached lemmas of words
+          missing from the lexicon. Defaults to LEMMA_CACHE_SIZE.
+
+    Returns:
+        Tokenizer.
+    """
+    global _tokenizer
+    lexicon = load_lexicon(lexicon_path) if lexicon_path else {}
+    tokenizer = Tokenizer(lexicon=lexicon, cache_size=cache_size)
+    if not lexicon:
+        tokenizer.lemmatize_text("movies")
+    with _tokenizer_lock:
+        _tokenizer = tokenizer
+        return _tokenizer
+
+
+def get_tokenizer() -> Tokenizer:
+    """Returns the tokenizer shared by the process.
+
+    Returns:
+        Tokenizer.
+    """
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            _tokenizer = Tokenizer()
+        return _tokenizer
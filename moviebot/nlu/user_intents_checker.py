@@ -5,9 +5,6 @@ import string
 from copy import deepcopy
 from typing import Any, Dict, List
 
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
-
 from moviebot.core.intents.user_intents import UserIntents
 from moviebot.core.utterance.utterance import UserUtterance
 from moviebot.database.db_movies import DataBase
@@ -23,6 +20,7 @@ from moviebot.nlu.recommendation_decision_processing import (
     RecommendationChoices,
     convert_choice_to_preference,
 )
+from moviebot.nlu.text_processing import get_tokenizer
 
 PATTERN_BASIC = {
     UserIntents.ACKNOWLEDGE: ["yes", "okay", "fine", "sure"],
@@ -102,7 +100,7 @@ class UserIntentsChecker:
         self.database: DataBase = config["database"]
         # Load the preprocessing elements and the Database as slot-values
         self._punctuation_remover()
-        self.lemmatizer = WordNetLemmatizer()
+        self.tokenizer = get_tokenizer()
         self.data_loader = DataLoader(config, self._lemmatize_value)
         self.slot_values = self.data_loader.load_slot_value_pairs()
         # load the tag-words from the DB
@@ -116,9 +114,11 @@ class UserIntentsChecker:
         ]
         # Load the components for intent detection
         self.slot_annotator = RBAnnotator(
-            self._process_utterance, self._lemmatize_value, self.slot_values
+            self._process_utterance,
+            self._lemmatize_value,
+            self.slot_values,
+            config["slot_values_path"],
         )
-        self._lemmatize_value("temp")
 
     def _punctuation_remover(self, remove_ques: bool = True) -> None:
         """Defines a patterns of punctuation marks to remove/keep in the
@@ -167,10 +167,7 @@ class UserIntentsChecker:
             value: Value to lemmatize.
             skip_number: Defaults to False.
         """
-        value = self._process_utterance(value)
-        return " ".join(
-            [self.lemmatizer.lemmatize(word) for word in word_tokenize(value)]
-        )
+        return self.tokenizer.lemmatize_value(self._process_utterance(value))
 
     def is_dontcare(self, user_utterance: UserUtterance) -> bool:
         """Returns true if any keyword from dont care pattern is present.
@@ -248,21 +245,12 @@ class UserIntentsChecker:
         """
         user_dacts = []
         dact = DialogueAct(UserIntents.UNK, [])
-        person_name_checks = False
-        for slot in self.domain.slots_annotation:
-            if slot in [x.value for x in [Slots.ACTORS, Slots.DIRECTORS]]:
-                if person_name_checks:
-                    continue
-                else:
-                    person_name_checks = True
-            # if slot == Slots.TITLE.value and dact.intent!= UserIntents.UNK:
-            # continue
-            params = self.slot_annotator.slot_annotation(slot, user_utterance)
-            if params:
-                dact.intent = UserIntents.REVEAL
-                dact.params.extend(params)
-                # user_dacts.append(dact)
-                # return user_dacts
+        params = self.slot_annotator.annotate(
+            user_utterance, self.domain.slots_annotation
+        )
+        if params:
+            dact.intent = UserIntents.REVEAL
+            dact.params.extend(params)
         if dact.intent != UserIntents.UNK:
             # print(f'All Dacts\n{dact}')
             self._filter_dact(dact, user_utterance.text)
@@ -327,8 +315,7 @@ class UserIntentsChecker:
             A list of dialogue acts.
         """
         # checking for intent = 'reject'
-        tokens = user_utterance.get_tokens()
-        utterance = sum(tokens).lemma if tokens else ""
+        utterance = " ".join(x.lemma for x in user_utterance.get_tokens())
         user_dacts = []
         dact = DialogueAct(UserIntents.UNK, [])
         if any(
@@ -378,8 +365,7 @@ class UserIntentsChecker:
         """
         # matching intents to 'list', 'Summarize', 'Subset', 'Compare' and
         # 'Similar'
-        tokens = user_utterance.get_tokens()
-        utterance = sum(tokens).lemma if tokens else ""
+        utterance = " ".join(x.lemma for x in user_utterance.get_tokens())
         user_dacts = []
         dact = DialogueAct(UserIntents.UNK, [])
         for slot, values in self.tag_words_user_inquire.items():
@@ -482,7 +468,7 @@ class UserIntentsChecker:
             if param.slot in [Slots.YEAR.value, Slots.GENRES.value]:
                 continue
             param.value = self.slot_annotator.find_in_raw_utterance(
-                raw_utterance, param.value, len(word_tokenize(param.value))
+                raw_utterance, param.value, len(param.value.split())
             )
         for param in deepcopy(dact.params):
             if any(
@@ -0,0 +1,252 @@
+"""Recommender model ranking the movies satisfying the slot constraints with
+collaborative filtering.
+
+The candidate movies are looked up in the database as by the slot-based
+model, then ranked by the score of their latent factors (see `item_factors`)
+for the user: the bias of the movie plus the dot product of its factors with
+a profile built from the movies the user has accepted or rejected in the
+session. All candidates are scored at once and only the best ones are sorted,
+after selecting them with `np.argpartition`. Movies without factors are
+ranked last, by rating.
+"""
+
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.lookup_result import (
+    LookupResult,
+    Results,
+    get_rowids,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.recommendation_decision_processing import (
+    RecommendationChoices,
+    convert_choice_to_preference,
+)
+from moviebot.recommender.item_factors import ItemFactors, get_item_factors
+from moviebot.recommender.slot_based_recommender_model import (
+    SlotBasedRecommenderModel,
+)
+
+# Maximum number of recommended movies.
+MAX_RECOMMENDATIONS = 1000
+
+_indexes: Dict[Tuple[str, str], "CatalogFactors"] = {}
+_indexes_lock = threading.Lock()
+
+_CHOICES = {choice.value for choice in RecommendationChoices}
+
+
+class CatalogFactors:
+    def __init__(self, db: DataBase, item_factors: ItemFactors) -> None:
+        """Maps the movies of a catalog to their latent factors.
+
+        The mapping is built on first use from the list of all candidate
+        movies, and rebuilt when that list changes with the catalog.
+
+        Args:
+            db: Database with available items.
+            item_factors: Latent factors of the movies.
+        """
+        self._db = db
+        self.item_factors = item_factors
+        self.rows: List[Dict] = []
+        self._all_movies: Optional[LookupResult] = None
+        self._positions = np.array([], dtype=np.int32)
+        self._factor_rows = np.array([], dtype=np.int32)
+        self._titles: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Maps the candidate movies, in rating order, to their factors."""
+        all_movies = self._db.top_lists.get(Counter(), self._db.catalog_version)
+        with self._lock:
+            if all_movies is self._all_movies:
+                return
+            rows = list(all_movies)
+            rowids = np.array([row["rowid"] for row in rows], dtype=np.int64)
+            positions = np.full(
+                rowids.max() + 1 if len(rowids) else 0, -1, dtype=np.int32
+            )
+            positions[rowids] = np.arange(len(rows), dtype=np.int32)
+            self._factor_rows = np.array(
+                [
+                    self.item_factors.get_index(row[Slots.ID.value])
+                    for row in rows
+                ],
+                dtype=np.int32,
+            )
+            self._titles = {}
+            for i, row in enumerate(rows):
+                # Titles of the best rated movies are kept for duplicates.
+                self._titles.setdefault(row[Slots.TITLE.value], i)
+            self._positions = positions
+            self.rows = rows
+            self._all_movies = all_movies
+
+    def get_profile(self, preferences: Dict[str, float]) -> np.ndarray:
+        """Returns the profile of a user in the latent space.
+
+        Args:
+            preferences: Preferences of the user by movie title, within the
+              range [-1, 1].
+
+        Returns:
+            Sum of the factors of the movies weighted by the preferences.
+        """
+        factors = self.item_factors.factors
+        profile = np.zeros(factors.shape[1], dtype=np.float32)
+        for title, preference in preferences.items():
+            position = self._titles.get(title)
+            if position is None or preference == 0:
+                continue
+            factor_row = self._factor_rows[position]
+            if factor_row >= 0:
+                profile += preference * factors[factor_row]
+        return profile
+
+    def rank(
+        self,
+        rowids: np.ndarray,
+        preferences: Dict[str, float],
+        k: int = MAX_RECOMMENDATIONS,
+    ) -> np.ndarray:
+        """Ranks candidate movies by their score for a user.
+
+        Args:
+            rowids: Row ids of the candidate movies.
+            preferences: Preferences of the user by movie title.
+            k (optional): Maximum number of movies. Defaults to
+              MAX_RECOMMENDATIONS.
+
+        Returns:
+            Positions of the movies in `rows`, best first.
+        """
+        self._load()
+        rowids = rowids[rowids < len(self._positions)]
+        positions = self._positions[rowids]
+        # Sorted positions are in rating order, which breaks ties.
+        positions = np.sort(positions[positions >= 0])
+        factor_rows = self._factor_rows[positions]
+        known = factor_rows >= 0
+
+        scores = np.full(len(positions), -np.inf, dtype=np.float32)
+        if known.any():
+            rows = factor_rows[known]
+            scores[known] = self.item_factors.biases[rows] + (
+                self.item_factors.factors[rows] @ self.get_profile(preferences)
+            )
+        if len(positions) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            positions, scores = positions[top], scores[top]
+            order = np.lexsort((positions, -scores))
+        else:
+            order = np.argsort(-scores, kind="stable")
+        return positions[order]
+
+
+def get_catalog_factors(db: DataBase, item_factors_path: str) -> CatalogFactors:
+    """Returns the catalog factors shared by the process.
+
+    Args:
+        db: Database with available items.
+        item_factors_path: Directory with the saved factors.
+
+    Returns:
+        Catalog factors.
+    """
+    key = (os.path.abspath(db.db_file_path), os.path.abspath(item_factors_path))
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = CatalogFactors(
+                db, get_item_factors(item_factors_path)
+            )
+        return _indexes[key]
+
+
+class CollaborativeFilteringRecommenderModel(SlotBasedRecommenderModel):
+    def __init__(
+        self, db: DataBase, domain: MovieDomain, item_factors_path: str
+    ) -> None:
+        """Instantiates a recommender model ranking the movies satisfying the
+        slot constraints with collaborative filtering.
+
+        Args:
+            db: Database with available items.
+            domain: Domain knowledge.
+            item_factors_path: Directory with the saved factors.
+        """
+        super().__init__(db, domain)
+        self._catalog_factors = get_catalog_factors(db, item_factors_path)
+        self._candidates: Optional[Results] = None
+        self._preferences: Optional[Dict[str, float]] = None
+        self._previous_items: Optional[Results] = None
+
+    def get_preferences(
+        self, dialogue_state: DialogueState
+    ) -> Dict[str, float]:
+        """Returns the preferences of the user for the recommended movies.
+
+        Args:
+            dialogue_state: Dialogue state.
+
+        Returns:
+            Preferences by movie title, within the range [-1, 1].
+        """
+        preferences = {}
+        for title, choices in dialogue_state.movies_recommended.items():
+            preference = sum(
+                convert_choice_to_preference(RecommendationChoices(choice))
+                for choice in choices
+                if choice in _CHOICES
+            )
+            if preference:
+                preferences[title] = max(-1.0, min(1.0, preference))
+        return preferences
+
+    def recommend_items(self, dialogue_state: DialogueState) -> Results:
+        """Recommends the movies satisfying the slot constraints, ranked for
+        the user.
+
+        Rankings are reused while the candidates and the preferences of the
+        user do not change. Movies similar to a given one are not ranked.
+
+        Args:
+            dialogue_state: Dialogue state.
+
+        Returns:
+            Recommended movies, best first.
+        """
+        candidates = super().recommend_items(dialogue_state)
+        if dialogue_state.agent_should_offer_similar:
+            return candidates
+
+        preferences = self.get_preferences(dialogue_state)
+        if candidates is self._candidates and preferences == self._preferences:
+            return self._previous_items
+        self._candidates = candidates
+        self._preferences = preferences
+
+        positions = self._catalog_factors.rank(
+            get_rowids(candidates), preferences
+        )
+        rows = self._catalog_factors.rows
+        self._previous_items = LookupResult.from_rows(
+            [rows[i] for i in positions], self._db.item_store
+        )
+        return self._previous_items
+
+    def get_previous_recommend_items(self) -> Results:
+        """Retrieves the previous recommendations.
+
+        Returns:
+            Previously recommended movies.
+        """
+        return self._previous_items
@@ -0,0 +1,364 @@
+"""Content-based recommender model scoring movies with a sparse item-feature
+matrix.
+
+Unlike the slot-based models, which only return the movies satisfying all
+constraints, this model ranks movies by the number of constraints they
+satisfy. The genres, keywords, people (actors and directors), and title of
+every movie are encoded as binary features in a sparse matrix, built once per
+process and rebuilt when the catalog changes. Values without an exact match
+are looked up as word sequences of the feature values, the last word being
+matched as a prefix (see `value_index`), as in the catalog index. The
+current information needs are encoded as a sparse query vector, with
+positive weights for the requested values and negative weights for the
+excluded ones, and all movies are scored with a single sparse matrix-vector
+product. Year constraints are checked on the years of the movies, as in the
+catalog index. Only the best movies are sorted, after selecting them with
+`np.argpartition`; ties are broken by rating.
+"""
+
+import logging
+import os
+import re
+import threading
+from copy import deepcopy
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.facet_index import get_year_mask
+from moviebot.database.lookup_result import LookupResult, Results
+from moviebot.database.query_builder import (
+    CANDIDATE_COLUMNS,
+    MIN_RATING,
+    NEGATION_PREFIX,
+    iter_constraint_values,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.slots import Slots
+from moviebot.nlu.annotation.value_index import ValueIndex
+from moviebot.nlu.slot_values import split_slot_value
+from moviebot.recommender.recommender_model import RecommenderModel
+
+# Features of the movies by slot. Actors and directors share the people
+# features.
+FEATURE_SLOTS = {
+    Slots.GENRES.value: "genres",
+    Slots.KEYWORDS.value: "keywords",
+    Slots.ACTORS.value: "people",
+    Slots.DIRECTORS.value: "people",
+    Slots.TITLE.value: "titles",
+}
+# Maximum number of recommended movies.
+MAX_RECOMMENDATIONS = 1000
+# Weight of excluded values, outweighing all requested values.
+EXCLUSION_WEIGHT = -1e6
+# Weight of the rating, small enough to only break ties between movies
+# satisfying the same number of constraints.
+RATING_WEIGHT = 0.01
+_WORD = re.compile(r"\w+")
+
+_indexes: Dict[str, "ItemFeatureIndex"] = {}
+_indexes_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class _ItemFeatures(NamedTuple):
+    """Item-feature matrix built from a version of the catalog."""
+
+    version: str
+    rows: List[Dict[str, Any]]
+    years: np.ndarray
+    features: Dict[Tuple[str, str], int]
+    value_indexes: Dict[str, Tuple[ValueIndex, List[List[int]]]]
+    matrix: sparse.csr_matrix
+    bonus: np.ndarray
+
+
+class ItemFeatureIndex:
+    def __init__(self, db: DataBase) -> None:
+        """Sparse matrix of the features of the movies.
+
+        The movies are loaded on first use, and reloaded when the catalog
+        changes.
+
+        Args:
+            db: Database with available items.
+        """
+        self._db = db
+        self._items: Optional[_ItemFeatures] = None
+        self._lock = threading.Lock()
+
+    def load(self, version: str) -> _ItemFeatures:
+        """Builds the item-feature matrix from the catalog, unless it has
+        already been built for the given version.
+
+        Args:
+            version: Current version of the catalog.
+
+        Returns:
+            Item-feature matrix.
+        """
+        with self._lock:
+            if self._items is not None and self._items.version == version:
+                return self._items
+            slots = [
+                slot
+                for slot in FEATURE_SLOTS
+                if slot in self._db.connection_pool.columns
+            ]
+            cursor = self._db.connection_pool.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(CANDIDATE_COLUMNS)}, {Slots.YEAR.value}"
+                f"{''.join(f', {slot}' for slot in slots)} "
+                f"FROM {self._db.db_table_name} "
+                f"WHERE {Slots.RATING.value} > {MIN_RATING} "
+                f"ORDER BY {Slots.RATING.value} DESC;"
+            )
+            columns = [x[0] for x in cursor.description]
+            n_candidate_columns = len(CANDIDATE_COLUMNS)
+
+            rows: List[Dict[str, Any]] = []
+            years: List[int] = []
+            features: Dict[Tuple[str, str], int] = {}
+            items: List[int] = []
+            feature_ids: List[int] = []
+            for item, row in enumerate(cursor):
+                rows.append(dict(zip(columns[:n_candidate_columns], row)))
+                years.append(_to_year(row[n_candidate_columns]))
+                for slot, value in zip(slots, row[n_candidate_columns + 1 :]):
+                    for feature in split_slot_value(slot, value):
+                        key = (FEATURE_SLOTS[slot], feature.lower())
+                        feature_ids.append(
+                            features.setdefault(key, len(features))
+                        )
+                        items.append(item)
+
+            # Features by rows, so that the product with a sparse query
+            # vector only visits the movies of the requested features.
+            matrix = sparse.csr_matrix(
+                (
+                    np.ones(len(items), dtype=np.float32),
+                    (feature_ids, items),
+                ),
+                shape=(len(features), len(rows)),
+            )
+            matrix.data[:] = 1
+            ratings = np.array(
+                [row[Slots.RATING.value] or 0 for row in rows],
+                dtype=np.float32,
+            )
+            self._items = _ItemFeatures(
+                version,
+                rows,
+                np.array(years, dtype=np.int32),
+                features,
+                self._build_value_indexes(features),
+                matrix,
+                RATING_WEIGHT * ratings,
+            )
+            logger.info(
+                f"Item-feature matrix with {len(rows)} movies and "
+                f"{len(features)} features built."
+            )
+            return self._items
+
+    def _build_value_indexes(
+        self, features: Dict[Tuple[str, str], int]
+    ) -> Dict[str, Tuple[ValueIndex, List[List[int]]]]:
+        """Indexes the words of the feature values.
+
+        Args:
+            features: Feature ids by feature name and value.
+
+        Returns:
+            For every feature name, a tuple with the index of the values,
+            with their words separated by spaces, and the ids of the
+            features of each indexed value.
+        """
+        feature_ids: Dict[str, Dict[str, List[int]]] = {}
+        for (name, feature), feature_id in features.items():
+            words = " ".join(_WORD.findall(feature))
+            if words:
+                feature_ids.setdefault(name, {}).setdefault(words, []).append(
+                    feature_id
+                )
+        return {
+            name: (ValueIndex(ids), list(ids.values()))
+            for name, ids in feature_ids.items()
+        }
+
+    def _get_feature_ids(
+        self, items: _ItemFeatures, slot: str, value: str
+    ) -> np.ndarray:
+        """Returns the features matching a constraint.
+
+        Values are matched exactly (ignoring case) or, if there is no exact
+        match, as word sequences of the feature values, the last word being
+        matched as a prefix.
+
+        Args:
+            items: Item-feature matrix.
+            slot: Slot name.
+            value: Constraint value, without negation prefix.
+
+        Returns:
+            Array of feature ids.
+        """
+        name = FEATURE_SLOTS[slot]
+        key = value.strip().lower()
+        feature_id = items.features.get((name, key))
+        if feature_id is not None:
+            return np.array([feature_id])
+        if name not in items.value_indexes:
+            return np.array([], dtype=np.int64)
+        value_index, feature_ids = items.value_indexes[name]
+        return np.array(
+            [
+                feature_id
+                for value_id in value_index.match(_WORD.findall(key))
+                for feature_id in feature_ids[value_id]
+            ],
+            dtype=np.int64,
+        )
+
+    def rank(
+        self,
+        constraints: List[Tuple[str, str]],
+        version: str,
+        k: int = MAX_RECOMMENDATIONS,
+    ) -> List[Dict[str, Any]]:
+        """Ranks the movies by the number of constraints they satisfy.
+
+        Movies having an excluded value, title, or year, and movies
+        satisfying no constraint if there are positive constraints, are not
+        ranked. A requested title counts as one satisfied constraint. Year
+        constraints are checked on the years of the movies rather than
+        encoded as features, constraints on other slots are ignored.
+
+        Args:
+            constraints: Slot-value pairs of the current information needs.
+            version: Current version of the catalog.
+            k (optional): Maximum number of movies. Defaults to
+              MAX_RECOMMENDATIONS.
+
+        Returns:
+            Candidate movies, best first.
+        """
+        items = self.load(version)
+        scores = items.bonus.copy()
+        weights: Dict[int, float] = {}
+        positive = False
+        for slot, value in constraints:
+            negated = value.startswith(NEGATION_PREFIX)
+            if slot == Slots.YEAR.value:
+                mask = get_year_mask(items.years, value)
+                if negated:
+                    scores[~mask] += EXCLUSION_WEIGHT
+                else:
+                    scores[mask] += 1
+            elif slot in FEATURE_SLOTS:
+                for feature_id in self._get_feature_ids(
+                    items, slot, value.replace(NEGATION_PREFIX, "")
+                ):
+                    weights[feature_id] = weights.get(feature_id, 0) + (
+                        EXCLUSION_WEIGHT if negated else 1
+                    )
+            else:
+                continue
+            positive = positive or not negated
+
+        if weights:
+            active = np.fromiter(weights, dtype=np.int64, count=len(weights))
+            query = sparse.csr_matrix(
+                np.fromiter(weights.values(), np.float32, len(weights))
+            )
+            product = query @ items.matrix[active]
+            scores[product.indices] += product.data
+        threshold = 1 if positive else 0
+        candidates = np.flatnonzero(scores >= threshold)
+        if len(candidates) > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [items.rows[i] for i in candidates]
+
+
+def _to_year(year: Any) -> int:
+    """Converts a stored year to an integer (-1 if it is not a year)."""
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return -1
+
+
+def get_item_feature_index(db: DataBase) -> ItemFeatureIndex:
+    """Returns the item-feature index shared by the process for a database.
+
+    Args:
+        db: Database with available items.
+
+    Returns:
+        Item-feature index.
+    """
+    key = os.path.abspath(db.db_file_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = ItemFeatureIndex(db)
+        return _indexes[key]
+
+
+class ContentVectorRecommenderModel(RecommenderModel):
+    def __init__(self, db: DataBase, domain: MovieDomain) -> None:
+        """Instantiates a content-based recommender model backed by the
+        item-feature index shared by the process.
+
+        Args:
+            db: Database with available items.
+            domain: Domain knowledge.
+        """
+        super().__init__(db)
+        self._domain = domain
+        self._index = get_item_feature_index(db)
+        self._current_CIN = None
+        self._previous_items: Optional[Results] = None
+
+    def recommend_items(self, dialogue_state: DialogueState) -> Results:
+        """Recommends movies satisfying most constraints.
+
+        Results for unchanged information needs are reused, as in the
+        database lookup. Movies similar to a given one are looked up in the
+        database.
+
+        Args:
+            dialogue_state: Dialogue state.
+
+        Returns:
+            Recommended movies, best first.
+        """
+        if dialogue_state.agent_should_offer_similar:
+            return self._db.database_lookup(dialogue_state, self._domain)
+
+        if self._current_CIN and self._current_CIN == dialogue_state.frame_CIN:
+            return self._previous_items
+        self._current_CIN = deepcopy(dialogue_state.frame_CIN)
+
+        rows = self._index.rank(
+            list(
+                iter_constraint_values(dialogue_state.frame_CIN, self._domain)
+            ),
+            self._db.catalog_version,
+        )
+        self._previous_items = LookupResult.from_rows(rows, self._db.item_store)
+        return self._previous_items
+
+    def get_previous_recommend_items(self) -> Results:
+        """Retrieves the previous recommendations.
+
+        Returns:
+            Previously recommended movies.
+        """
+        return self._previous_items
@@ -0,0 +1,63 @@
+"""Recommender model based on slot value pairs using the in-memory catalog
+index instead of SQL queries."""
+
+from copy import deepcopy
+from typing import Optional
+
+from moviebot.database.catalog_index import CatalogResults, get_catalog_index
+from moviebot.database.db_movies import DataBase
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.recommender.slot_based_recommender_model import (
+    SlotBasedRecommenderModel,
+)
+
+
+class IndexedSlotBasedRecommenderModel(SlotBasedRecommenderModel):
+    def __init__(self, db: DataBase, domain: MovieDomain) -> None:
+        """Instantiates a slot-based recommender model backed by the catalog
+        index shared by the process.
+
+        Args:
+            db: Database with available items.
+            domain: Domain knowledge.
+        """
+        super().__init__(db, domain)
+        self._catalog_index = get_catalog_index(db)
+        self._current_CIN = None
+        self._previous_items = None
+
+    def recommend_items(self, dialogue_state: DialogueState) -> CatalogResults:
+        """Recommends movies based on slot-value pairs.
+
+        Results for unchanged information needs are reused, as in the
+        database lookup.
+
+        Args:
+            dialogue_state: Dialogue state.
+
+        Returns:
+            Lazy sequence of the recommended movies.
+        """
+        if dialogue_state.agent_should_offer_similar:
+            similar_movies = list(dialogue_state.similar_movies.values())[0]
+            positions = self._catalog_index.lookup_titles(similar_movies)
+            return CatalogResults(self._catalog_index, positions)
+
+        if self._current_CIN and self._current_CIN == dialogue_state.frame_CIN:
+            return self._previous_items
+        self._current_CIN = deepcopy(dialogue_state.frame_CIN)
+
+        positions = self._catalog_index.lookup(
+            dialogue_state.frame_CIN, self._domain
+        )
+        self._previous_items = CatalogResults(self._catalog_index, positions)
+        return self._previous_items
+
+    def get_previous_recommend_items(self) -> Optional[CatalogResults]:
+        """Retrieves the previous recommendations.
+
+        Returns:
+            Previously recommended movies.
+        """
+        return self._previous_items
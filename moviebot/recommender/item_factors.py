@@ -0,0 +1,273 @@
+"""Latent factors of movies learned from user ratings.
+
+The factors are trained offline from a MovieLens-style ratings file (with
+`userId`, `movieId`, and `rating` columns). MovieLens movie ids are mapped to
+the IMDb ids of the catalog with the `links.csv` file of the dataset, if
+given. Ratings are centered by the global mean and a damped bias per movie,
+and the residuals are factorized with a truncated SVD.
+
+The factors, the biases, and the IMDb ids of the movies are saved as `.npy`
+files in a directory. At serve time they are memory-mapped once per process
+and shared by all agents, so the operating system shares the pages between
+worker processes as well.
+
+Usage: python -m moviebot.recommender.item_factors -r <path_to_ratings>
+    -l <path_to_links> -o <output_dir>
+"""
+
+import argparse
+import csv
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+FACTORS_FILE = "factors.npy"
+BIASES_FILE = "biases.npy"
+ITEMS_FILE = "items.npy"
+# Default number of latent factors.
+DEFAULT_FACTORS = 64
+# Number of ratings the bias of a movie is damped towards the mean with.
+BIAS_DAMPING = 10
+
+_factors: Dict[str, "ItemFactors"] = {}
+_factors_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def read_links(links_path: str) -> Dict[str, str]:
+    """Reads the IMDb ids of MovieLens movies.
+
+    Args:
+        links_path: Path to the links file with `movieId` and `imdbId`
+          columns.
+
+    Returns:
+        Dictionary with MovieLens ids as keys and IMDb ids (e.g.,
+        "tt0111161") as values.
+    """
+    with open(links_path, newline="") as links_file:
+        return {
+            row["movieId"]: f"tt{int(row['imdbId']):07d}"
+            for row in csv.DictReader(links_file)
+            if row.get("imdbId")
+        }
+
+
+def read_ratings(
+    ratings_path: str, links: Optional[Dict[str, str]] = None
+) -> Tuple[List[str], List[str], np.ndarray]:
+    """Reads ratings from a CSV file.
+
+    Args:
+        ratings_path: Path to the ratings file with `userId`, `movieId`, and
+          `rating` columns.
+        links (optional): IMDb ids of the MovieLens movies. Ratings of movies
+          without IMDb id are skipped. Defaults to None, i.e., movie ids are
+          IMDb ids.
+
+    Returns:
+        Tuple with the user and movie ids of the ratings, and the ratings.
+    """
+    users: List[str] = []
+    items: List[str] = []
+    ratings: List[float] = []
+    with open(ratings_path, newline="") as ratings_file:
+        for row in csv.DictReader(ratings_file):
+            item = row["movieId"]
+            if links is not None:
+                item = links.get(item)
+                if item is None:
+                    continue
+            users.append(row["userId"])
+            items.append(item)
+            ratings.append(float(row["rating"]))
+    return users, items, np.array(ratings, dtype=np.float64)
+
+
+def train_item_factors(
+    ratings_path: str,
+    output_dir: str,
+    links_path: str = None,
+    n_factors: int = DEFAULT_FACTORS,
+) -> None:
+    """Trains the latent factors of movies and saves them.
+
+    Args:
+        ratings_path: Path to the ratings file.
+        output_dir: Directory the factors are saved to.
+        links_path (optional): Path to the MovieLens links file. Defaults to
+          None, i.e., movie ids of the ratings are IMDb ids.
+        n_factors (optional): Number of latent factors, reduced if there are
+          too few users or movies. Defaults to DEFAULT_FACTORS.
+
+    Raises:
+        ValueError: If there are no ratings.
+    """
+    links = read_links(links_path) if links_path else None
+    users, items, ratings = read_ratings(ratings_path, links)
+    if len(ratings) == 0:
+        raise ValueError(f"No ratings found in {ratings_path}.")
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    item_ids, item_index = np.unique(items, return_inverse=True)
+
+    mean = ratings.mean()
+    counts = np.bincount(item_index, minlength=len(item_ids))
+    biases = np.bincount(
+        item_index, weights=ratings - mean, minlength=len(item_ids)
+    ) / (counts + BIAS_DAMPING)
+    residuals = sparse.csr_matrix(
+        (ratings - mean - biases[item_index], (item_index, user_index)),
+        shape=(len(item_ids), len(user_ids)),
+    )
+    k = min(n_factors, min(residuals.shape) - 1)
+    if k < 1:
+        factors = np.zeros((len(item_ids), 0))
+    else:
+        u, s, _ = svds(residuals, k=k)
+        factors = u * np.sqrt(s)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, FACTORS_FILE), factors.astype(np.float32))
+    np.save(os.path.join(output_dir, BIASES_FILE), biases.astype(np.float32))
+    np.save(os.path.join(output_dir, ITEMS_FILE), item_ids.astype(str))
+    logger.info(
+        f"{k} factors of {len(item_ids)} movies trained from "
+        f"{len(ratings)} ratings of {len(user_ids)} users."
+    )
+
+
+class ItemFactors:
+    def __init__(self, path: str) -> None:
+        """Latent factors and biases of movies, memory-mapped on first use.
+
+        Args:
+            path: Directory with the saved factors.
+        """
+        self.path = path
+        self._factors: Optional[np.ndarray] = None
+        self._biases: Optional[np.ndarray] = None
+        self._item_index: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Memory-maps the saved factors.
+
+        Raises:
+            FileNotFoundError: If the factors have not been trained.
+        """
+        with self._lock:
+            if self._factors is not None:
+                return
+            factors_path = os.path.join(self.path, FACTORS_FILE)
+            if not os.path.isfile(factors_path):
+                raise FileNotFoundError(
+                    f"Item factors not found in {self.path}. Train them with "
+                    f"`python -m {__name__}`."
+                )
+            item_ids = np.load(os.path.join(self.path, ITEMS_FILE))
+            self._item_index = {
+                item_id: i for i, item_id in enumerate(item_ids.tolist())
+            }
+            self._biases = np.load(
+                os.path.join(self.path, BIASES_FILE), mmap_mode="r"
+            )
+            self._factors = np.load(factors_path, mmap_mode="r")
+            logger.info(f"Item factors of {len(item_ids)} movies loaded.")
+
+    @property
+    def factors(self) -> np.ndarray:
+        """Latent factors by movie."""
+        self._load()
+        return self._factors
+
+    @property
+    def biases(self) -> np.ndarray:
+        """Biases by movie."""
+        self._load()
+        return self._biases
+
+    def get_index(self, item_id: str) -> int:
+        """Returns the position of a movie in the factors.
+
+        Args:
+            item_id: IMDb id of the movie.
+
+        Returns:
+            Position or -1 if the movie has no factors.
+        """
+        self._load()
+        return self._item_index.get(item_id, -1)
+
+
+def get_item_factors(path: str) -> ItemFactors:
+    """Returns the item factors shared by the process.
+
+    Args:
+        path: Directory with the saved factors.
+
+    Returns:
+        Item factors.
+    """
+    key = os.path.abspath(path)
+    with _factors_lock:
+        if key not in _factors:
+            _factors[key] = ItemFactors(path)
+        return _factors[key]
+
+
+def parse_args(args: str = None) -> argparse.Namespace:
+    """Parses command line arguments.
+
+    Args:
+        args (optional): List of arguments to parse. If not provided, uses
+            sys.argv[1:]. Defaults to None.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Trains the latent factors of movies from ratings."
+    )
+    parser.add_argument(
+        "-r",
+        "--ratings_path",
+        type=str,
+        help="Path to the ratings file",
+        required=True,
+    )
+    parser.add_argument(
+        "-l",
+        "--links_path",
+        type=str,
+        help="Path to the MovieLens links file",
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        type=str,
+        help="Directory the factors are saved to",
+        default="data/item_factors",
+    )
+    parser.add_argument(
+        "-k",
+        "--n_factors",
+        type=int,
+        help="Number of latent factors",
+        default=DEFAULT_FACTORS,
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    train_item_factors(
+        args.ratings_path, args.output_dir, args.links_path, args.n_factors
+    )
@@ -1,9 +1,8 @@
 """Interface for recommender model."""
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
-
 from moviebot.database.db_movies import DataBase
+from moviebot.database.lookup_result import Results
 from moviebot.dialogue_manager.dialogue_state import DialogueState
 
 
@@ -18,9 +17,7 @@ class RecommenderModel(ABC):
         self._db = db
 
     @abstractmethod
-    def recommend_items(
-        self, dialogue_state: DialogueState
-    ) -> List[Dict[str, Any]]:
+    def recommend_items(self, dialogue_state: DialogueState) -> Results:
         """Recommends movies.
 
         Args:
@@ -34,7 +31,7 @@ class RecommenderModel(ABC):
         """
         raise NotImplementedError
 
-    def get_previous_recommend_items(self) -> List[Dict[str, Any]]:
+    def get_previous_recommend_items(self) -> Results:
         """Retrieves the previous recommendations.
 
         Returns:
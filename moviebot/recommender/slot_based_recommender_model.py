@@ -1,8 +1,7 @@
 """Recommender model based on slot value pairs."""
 
-from typing import Any, Dict, List
-
 from moviebot.database.db_movies import DataBase
+from moviebot.database.lookup_result import Results
 from moviebot.dialogue_manager.dialogue_state import DialogueState
 from moviebot.domain.movie_domain import MovieDomain
 from moviebot.recommender.recommender_model import RecommenderModel
@@ -19,9 +18,7 @@ class SlotBasedRecommenderModel(RecommenderModel):
         super().__init__(db)
         self._domain = domain
 
-    def recommend_items(
-        self, dialogue_state: DialogueState
-    ) -> List[Dict[str, Any]]:
+    def recommend_items(self, dialogue_state: DialogueState) -> Results:
         """Recommends movies based on slot-value pairs.
 
         Args:
@@ -6,6 +6,7 @@ from typing import Any, Dict, List
 
 from moviebot.core.intents import AgentIntents
 from moviebot.core.intents.user_intents import UserIntents
+from moviebot.database.lookup_result import hydrate_item
 from moviebot.dialogue_manager.dialogue_act import DialogueAct
 from moviebot.dialogue_manager.dialogue_manager import DialogueManager
 from moviebot.nlu.annotation.item_constraint import ItemConstraint
@@ -32,10 +33,13 @@ class DialogueManagerRL(DialogueManager):
             self.recommender.get_previous_recommend_items(),
         )
         if recommended_movies:
+            recommendation = hydrate_item(
+                recommended_movies, recommended_movies[0]
+            )
             self.dialogue_state_tracker.dialogue_state.item_in_focus = (
-                recommended_movies[0]
+                recommendation
             )
-            return recommended_movies[0]
+            return recommendation
         return None
 
     def replace_placeholders(
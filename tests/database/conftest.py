@@ -0,0 +1,185 @@
+"""Fixtures for movie catalog tests."""
+
+import sqlite3
+
+import pytest
+
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+MOVIES = [
+    {
+        "ID": "tt0111161",
+        "title": "The Shawshank Redemption",
+        "year": 1994,
+        "genres": "Drama",
+        "keywords": "prison, escape, friendship",
+        "imdb_rating": 9.3,
+        "imdb_votes": 2500000,
+        "duration": 142,
+        "actors": "Tim Robbins, Morgan Freeman",
+        "directors": "Frank Darabont",
+        "plot": "Two imprisoned men bond over a number of years.",
+        "cover": "https://example.com/shawshank.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0111161",
+    },
+    {
+        "ID": "tt0076759",
+        "title": "Star Wars",
+        "year": 1977,
+        "genres": "Action, Adventure, Fantasy",
+        "keywords": "rebellion, space opera, death star",
+        "imdb_rating": 8.6,
+        "imdb_votes": 1300000,
+        "duration": 121,
+        "actors": "Mark Hamill, Harrison Ford, Carrie Fisher",
+        "directors": "George Lucas",
+        "plot": "Luke Skywalker joins forces with a Jedi Knight.",
+        "cover": "https://example.com/starwars.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0076759",
+    },
+    {
+        "ID": "tt0120815",
+        "title": "Saving Private Ryan",
+        "year": 1998,
+        "genres": "Drama, War",
+        "keywords": "world war two, soldier, normandy",
+        "imdb_rating": 8.6,
+        "imdb_votes": 1400000,
+        "duration": 169,
+        "actors": "Tom Hanks, Matt Damon",
+        "directors": "Steven Spielberg",
+        "plot": "A group of soldiers go behind enemy lines.",
+        "cover": "https://example.com/ryan.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0120815",
+    },
+    {
+        "ID": "tt0109830",
+        "title": "Forrest Gump",
+        "year": 1994,
+        "genres": "Drama, Romance",
+        "keywords": "vietnam war, running, friendship",
+        "imdb_rating": 8.8,
+        "imdb_votes": 2000000,
+        "duration": 142,
+        "actors": "Tom Hanks, Robin Wright",
+        "directors": "Robert Zemeckis",
+        "plot": "The history of the United States through the eyes of Forrest.",
+        "cover": "https://example.com/gump.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0109830",
+    },
+    {
+        "ID": "tt0114709",
+        "title": "Toy Story",
+        "year": 1995,
+        "genres": "Animation, Adventure, Comedy",
+        "keywords": "toy, friendship, rivalry",
+        "imdb_rating": 8.3,
+        "imdb_votes": 1000000,
+        "duration": 81,
+        "actors": "Tom Hanks, Tim Allen",
+        "directors": "John Lasseter",
+        "plot": "A cowboy doll is threatened by a new spaceman figure.",
+        "cover": "https://example.com/toystory.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0114709",
+    },
+    {
+        "ID": "tt0468569",
+        "title": "The Dark Knight",
+        "year": 2008,
+        "genres": "Action, Crime, Drama",
+        "keywords": "joker, vigilante, gotham",
+        "imdb_rating": 9.0,
+        "imdb_votes": 2600000,
+        "duration": 152,
+        "actors": "Christian Bale, Heath Ledger",
+        "directors": "Christopher Nolan",
+        "plot": "Batman faces the Joker.",
+        "cover": "https://example.com/darkknight.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0468569",
+    },
+    {
+        "ID": "tt1375666",
+        "title": "Inception",
+        "year": 2010,
+        "genres": "Action, Adventure, Sci-Fi",
+        "keywords": "dream, subconscious, heist",
+        "imdb_rating": 8.8,
+        "imdb_votes": 2300000,
+        "duration": 148,
+        "actors": "Leonardo DiCaprio, Tom Hardy",
+        "directors": "Christopher Nolan",
+        "plot": "A thief steals secrets through dream-sharing technology.",
+        "cover": "https://example.com/inception.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt1375666",
+    },
+    {
+        "ID": "tt0499549",
+        "title": "Avatar",
+        "year": 2009,
+        "genres": "Action, Adventure, Fantasy",
+        "keywords": "alien planet, marine, war",
+        "imdb_rating": 7.9,
+        "imdb_votes": 1300000,
+        "duration": 162,
+        "actors": "Sam Worthington, Zoe Saldana",
+        "directors": "James Cameron",
+        "plot": "A paraplegic marine on the moon Pandora.",
+        "cover": "https://example.com/avatar.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0499549",
+    },
+    {
+        "ID": "tt0000001",
+        "title": "Bad Comedy",
+        "year": 2015,
+        "genres": "Comedy",
+        "keywords": "friendship",
+        "imdb_rating": 3.1,
+        "imdb_votes": 1000,
+        "duration": 90,
+        "actors": "Tom Hanks",
+        "directors": "Nobody Known",
+        "plot": "Not worth watching.",
+        "cover": "https://example.com/bad.jpg",
+        "imdb_link": "https://www.imdb.com/title/tt0000001",
+    },
+]
+
+
+def create_movies_table(db_path: str) -> None:
+    """Creates a movies table in the style of the original catalog.
+
+    Args:
+        db_path: Path to the database file.
+    """
+    columns = list(MOVIES[0].keys())
+    connection = sqlite3.connect(db_path)
+    connection.execute(f"CREATE TABLE movies ({', '.join(columns)});")
+    connection.executemany(
+        f"INSERT INTO movies VALUES ({', '.join('?' for _ in columns)});",
+        [tuple(movie[column] for column in columns) for movie in MOVIES],
+    )
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def movies_db_path(tmp_path) -> str:
+    """Returns the path to a small movie catalog."""
+    db_path = str(tmp_path / "movies_dbase.db")
+    create_movies_table(db_path)
+    return db_path
+
+
+@pytest.fixture
+def domain() -> MovieDomain:
+    """Returns the movie domain."""
+    return MovieDomain("data/movies_domain.yaml")
+
+
+@pytest.fixture
+def dialogue_state(domain: MovieDomain) -> DialogueState:
+    """Returns an initialized dialogue state with empty information needs."""
+    dialogue_state = DialogueState(domain, domain.slots_annotation, False)
+    dialogue_state.initialize()
+    return dialogue_state
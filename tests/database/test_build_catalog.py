@@ -0,0 +1,125 @@
+"""Tests for the catalog build pipeline."""
+
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from moviebot.database.build_catalog import build_catalog
+from moviebot.database.catalog_schema import SCHEMA_VERSION, get_column_types
+from moviebot.database.connection_pool import CATALOG_INFO_TABLE
+from moviebot.database.db_movies import DataBase
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from tests.database.conftest import MOVIES
+
+
+@pytest.fixture
+def source_path(tmp_path) -> str:
+    """Returns the path to a CSV export of the small movie catalog."""
+    source_path = str(tmp_path / "movies.csv")
+    with open(source_path, "w", newline="") as source_file:
+        writer = csv.DictWriter(source_file, fieldnames=list(MOVIES[0]))
+        writer.writeheader()
+        writer.writerows(MOVIES)
+    return source_path
+
+
+@pytest.fixture
+def built_db_path(tmp_path, source_path: str, domain: MovieDomain) -> str:
+    """Returns the path to a catalog built from the CSV export."""
+    db_path = str(tmp_path / "built.db")
+    build_catalog(
+        source_path,
+        db_path,
+        slot_values_path=str(tmp_path / "slot_values.json"),
+        slots=domain.slots_annotation,
+        lemmatize=str.lower,
+    )
+    return db_path
+
+
+def test_build_catalog_schema(built_db_path: str) -> None:
+    connection = sqlite3.connect(built_db_path)
+    column_types = get_column_types(connection, "movies")
+    info = dict(connection.execute(f"SELECT * FROM {CATALOG_INFO_TABLE};"))
+    indexes = {
+        row[0]
+        for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index';"
+        )
+    }
+    count = connection.execute("SELECT count(*) FROM movies;").fetchone()[0]
+    connection.close()
+
+    assert column_types["year"] == "INTEGER"
+    assert column_types["imdb_rating"] == "REAL"
+    assert {"movies_rating_idx", "movies_year_rating_idx"} <= indexes
+    assert count == len(MOVIES)
+    assert info["schema_version"] == SCHEMA_VERSION
+    assert info["table_name"] == "movies"
+    assert info["movies"] == str(len(MOVIES))
+
+
+def test_build_catalog_slot_values(tmp_path, built_db_path: str) -> None:
+    with open(tmp_path / "slot_values.json") as slot_values_file:
+        slot_values = json.load(slot_values_file)
+
+    assert slot_values["genres"]["drama"] == "drama"
+    assert slot_values["actors"]["Tom Hanks"] == "tom hanks"
+    assert sorted(slot_values["year"]) == sorted(
+        {movie["year"] for movie in MOVIES}
+    )
+
+
+def test_build_catalog_version(
+    tmp_path, source_path: str, built_db_path: str, domain: MovieDomain
+) -> None:
+    version = build_catalog(
+        source_path,
+        str(tmp_path / "rebuilt.db"),
+        slot_values_path=None,
+        slots=domain.slots_annotation,
+        lemmatize=str.lower,
+        fts=False,
+    )
+
+    assert DataBase(built_db_path).catalog_version == version
+
+
+def test_built_catalog_lookup(
+    built_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(built_db_path)
+    assert db.slot_statistics.get_frequency("genres", "drama") == 4
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["year"] = "BETWEEN 1990 AND 2000"
+
+    assert [r["title"] for r in db.database_lookup(dialogue_state, domain)] == [
+        "The Shawshank Redemption",
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+
+
+def test_build_catalog_missing_column(tmp_path) -> None:
+    source_path = str(tmp_path / "movies.jsonl")
+    with open(source_path, "w") as source_file:
+        source_file.write(json.dumps({"title": "Avatar"}) + "\n")
+
+    with pytest.raises(ValueError):
+        build_catalog(source_path, str(tmp_path / "built.db"), slots=[])
+
+
+def test_schema_version_mismatch(built_db_path: str) -> None:
+    connection = sqlite3.connect(built_db_path)
+    with connection:
+        connection.execute(
+            f"UPDATE {CATALOG_INFO_TABLE} SET value = '0' "
+            "WHERE key = 'schema_version';"
+        )
+    connection.close()
+
+    with pytest.raises(ValueError):
+        DataBase(built_db_path)
@@ -0,0 +1,117 @@
+"""Tests for the in-memory catalog index."""
+
+import pytest
+
+from moviebot.database.catalog_index import (
+    CatalogResults,
+    MovieCatalogIndex,
+    get_catalog_index,
+)
+from moviebot.database.db_movies import DataBase
+from moviebot.database.lookup_result import get_rowids
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.recommender.indexed_slot_based_recommender_model import (
+    IndexedSlotBasedRecommenderModel,
+)
+
+
+@pytest.fixture
+def catalog_index(movies_db_path: str) -> MovieCatalogIndex:
+    return MovieCatalogIndex(DataBase(movies_db_path))
+
+
+def _titles(index: MovieCatalogIndex, positions) -> list:
+    return [item["title"] for item in index.get_items(positions)]
+
+
+def test_lookup_without_constraints(
+    catalog_index: MovieCatalogIndex, domain: MovieDomain
+) -> None:
+    titles = _titles(catalog_index, catalog_index.lookup({}, domain))
+
+    assert len(titles) == 8
+    assert titles[0] == "The Shawshank Redemption"
+    assert "Bad Comedy" not in titles
+
+
+@pytest.mark.parametrize(
+    "frame_CIN, expected",
+    [
+        (
+            {"genres": ["drama"], "actors": "tom hanks"},
+            ["Forrest Gump", "Saving Private Ryan"],
+        ),
+        (
+            {"genres": ["drama", ".NOT.war"], "actors": "tom hanks"},
+            ["Forrest Gump"],
+        ),
+        (
+            {"actors": "tom hank"},
+            ["Forrest Gump", "Saving Private Ryan", "Toy Story"],
+        ),
+        (
+            {"actors": "hanks"},
+            ["Forrest Gump", "Saving Private Ryan", "Toy Story"],
+        ),
+        ({"actors": "om hanks"}, []),
+        ({"keywords": "world wa"}, ["Saving Private Ryan"]),
+        ({"keywords": "vietnam"}, ["Forrest Gump"]),
+        ({"directors": "christopher nolan", "year": "> 2009"}, ["Inception"]),
+        (
+            {"genres": ["drama"], "year": "BETWEEN 1990 AND 1995"},
+            ["The Shawshank Redemption", "Forrest Gump"],
+        ),
+        ({"genres": ["western"]}, []),
+    ],
+)
+def test_lookup(
+    catalog_index: MovieCatalogIndex,
+    domain: MovieDomain,
+    frame_CIN: dict,
+    expected: list,
+) -> None:
+    titles = _titles(catalog_index, catalog_index.lookup(frame_CIN, domain))
+
+    assert titles == expected
+
+
+def test_lookup_titles(catalog_index: MovieCatalogIndex) -> None:
+    positions = catalog_index.lookup_titles(["Toy Story", "Inception", "?"])
+
+    assert _titles(catalog_index, positions) == ["Inception", "Toy Story"]
+
+
+def test_get_catalog_index_is_shared(movies_db_path: str) -> None:
+    db = DataBase(movies_db_path)
+
+    assert get_catalog_index(db) is get_catalog_index(DataBase(movies_db_path))
+
+
+def test_recommend_items(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    recommender = IndexedSlotBasedRecommenderModel(db, domain)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "tom hank"
+
+    results = recommender.recommend_items(dialogue_state)
+
+    assert isinstance(results, CatalogResults)
+    assert list(results) == list(
+        db.database_lookup(dialogue_state, domain).iter_items()
+    )
+    assert get_rowids(results).tolist() == [
+        item["rowid"] for item in db.database_lookup(dialogue_state, domain)
+    ]
+    assert recommender.get_previous_recommend_items() is results
+    assert recommender.recommend_items(dialogue_state) is results
+
+
+def test_catalog_results(catalog_index: MovieCatalogIndex) -> None:
+    results = CatalogResults(catalog_index, catalog_index.lookup_titles([]))
+
+    assert len(results) == 0
+    with pytest.raises(IndexError):
+        results[0]
@@ -0,0 +1,69 @@
+"""Tests for the schema migration of the movie catalog."""
+
+import sqlite3
+from typing import List
+
+import pytest
+
+from moviebot.database.catalog_schema import migrate_catalog
+from moviebot.database.connection_pool import ConnectionPool
+from moviebot.database.db_movies_inverted import build_slot_value_tables
+from moviebot.database.query_builder import QueryBuilder, get_slot_predicate
+
+
+def _explain(db_path: str, sql: str, params: List) -> str:
+    connection = sqlite3.connect(db_path)
+    plan = connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    connection.close()
+    return " ".join(row[-1] for row in plan)
+
+
+@pytest.fixture
+def migrated_db_path(movies_db_path: str) -> str:
+    build_slot_value_tables(movies_db_path, "movies", normalize=str.lower)
+    migrate_catalog(movies_db_path, "movies")
+    return movies_db_path
+
+
+def test_migrate_catalog(migrated_db_path: str) -> None:
+    connection = sqlite3.connect(migrated_db_path)
+    rows = connection.execute(
+        "SELECT rowid, typeof(year), typeof(imdb_rating), title FROM movies "
+        "ORDER BY rowid LIMIT 2;"
+    ).fetchall()
+    connection.close()
+
+    assert rows == [
+        (1, "integer", "real", "The Shawshank Redemption"),
+        (2, "integer", "real", "Star Wars"),
+    ]
+    assert ConnectionPool(migrated_db_path).table_name == "movies"
+
+
+@pytest.mark.parametrize(
+    "predicates, index",
+    [
+        ([], "COVERING INDEX movies_rating_idx"),
+        ([get_slot_predicate("year", "> 2010")], "movies_rating_idx"),
+        ([get_slot_predicate("genres", "drama")], "movies_rating_idx"),
+    ],
+)
+def test_select_uses_rating_index(
+    migrated_db_path: str, predicates: List, index: str
+) -> None:
+    sql, params = QueryBuilder("movies").build_select(predicates)
+
+    plan = _explain(migrated_db_path, sql, params)
+
+    assert index in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_count_uses_year_index(migrated_db_path: str) -> None:
+    sql, params = QueryBuilder("movies").build_count(
+        [get_slot_predicate("year", "BETWEEN 1990 AND 2000")]
+    )
+
+    plan = _explain(migrated_db_path, sql, [*params, -1])
+
+    assert "COVERING INDEX movies_year_rating_idx" in plan
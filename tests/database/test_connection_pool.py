@@ -0,0 +1,114 @@
+"""Tests for the catalog connection pool."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from moviebot.database.connection_pool import (
+    ConnectionPool,
+    get_connection_pool,
+)
+
+
+@pytest.fixture
+def pool(movies_db_path: str) -> ConnectionPool:
+    pool = ConnectionPool(movies_db_path)
+    yield pool
+    pool.close()
+
+
+def test_connection_reused_in_thread(pool: ConnectionPool) -> None:
+    assert pool.get_connection() is pool.get_connection()
+    stats = pool.get_stats()
+    assert stats["opened"] == 1
+    assert stats["reused"] == 1
+    assert stats["connections"] == 1
+
+
+def test_connection_per_thread(pool: ConnectionPool) -> None:
+    main_connection = pool.get_connection()
+    connections = []
+    barrier = threading.Barrier(2)
+
+    def worker() -> None:
+        connections.append(pool.get_connection())
+        barrier.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert main_connection not in connections
+    assert connections[0] is not connections[1]
+    assert pool.get_stats()["opened"] == 3
+
+
+def test_connection_handoff(pool: ConnectionPool) -> None:
+    connections = []
+    for _ in range(2):
+        thread = threading.Thread(
+            target=lambda: connections.append(pool.get_connection())
+        )
+        thread.start()
+        thread.join()
+
+    assert connections[0] is connections[1]
+    stats = pool.get_stats()
+    assert stats["opened"] == 1
+    assert stats["handoffs"] == 1
+    # The handed over connection can be used from the new thread.
+    thread = threading.Thread(
+        target=lambda: connections.append(
+            pool.cursor().execute("SELECT count(*) FROM movies").fetchone()
+        )
+    )
+    thread.start()
+    thread.join()
+    assert connections[-1] == (9,)
+
+
+def test_schema(pool: ConnectionPool) -> None:
+    assert pool.table_name == "movies"
+    assert "title" in pool.columns
+    assert "imdb_rating" in pool.columns
+
+
+def test_read_only(pool: ConnectionPool) -> None:
+    with pytest.raises(sqlite3.OperationalError):
+        pool.cursor().execute("DELETE FROM movies")
+
+
+def test_shared_pool(movies_db_path: str) -> None:
+    assert get_connection_pool(movies_db_path) is get_connection_pool(
+        movies_db_path
+    )
+
+
+def test_immutable_pool(movies_db_path: str) -> None:
+    pool = ConnectionPool(movies_db_path, immutable=True, mmap_size=1 << 20)
+    cursor = pool.cursor()
+
+    assert "immutable=1" in pool._get_uri()
+    assert cursor.execute("PRAGMA mmap_size;").fetchone() == (1 << 20,)
+    assert pool.table_name == "movies"
+    with pytest.raises(sqlite3.OperationalError):
+        cursor.execute("DELETE FROM movies")
+    pool.close()
+
+
+def test_immutable_pool_modified_catalog(movies_db_path: str) -> None:
+    pool = ConnectionPool(movies_db_path, immutable=True)
+    pool.get_connection()
+    connection = sqlite3.connect(movies_db_path)
+    with connection:
+        connection.execute("DELETE FROM movies WHERE year < 1990")
+    connection.execute("VACUUM")
+    connection.close()
+
+    pool.close()
+
+    with pytest.raises(ValueError):
+        pool.get_connection()
@@ -0,0 +1,190 @@
+"""Tests for the movie database."""
+
+from collections import Counter
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.lookup_result import (
+    LookupResult,
+    ResultCursor,
+    iter_items,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.dialogue_manager.dialogue_state_tracker import (
+    DialogueStateTracker,
+)
+from moviebot.domain.movie_domain import MovieDomain
+
+
+def test_database_lookup(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "tom hank"
+
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == [
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+    assert db.backup_db_results == results
+
+
+def test_database_lookup_reuses_connection(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.isBot = True
+    for genre in ["drama", "action", "comedy"]:
+        dialogue_state.frame_CIN["genres"] = [genre]
+        db.database_lookup(dialogue_state, domain)
+
+    assert db.connection_pool.get_stats()["opened"] == 1
+
+
+def test_database_lookup_is_bounded(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+
+    results = db.database_lookup(dialogue_state, domain)
+    results.page_size = 2
+
+    assert results.bounded_count(2) == 2
+    assert results[0]["title"] == "The Shawshank Redemption"
+    assert results.nbytes > 0
+    assert len(results) == 4
+    assert [r["title"] for r in results] == [
+        "The Shawshank Redemption",
+        "The Dark Knight",
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+
+
+def test_database_lookup_hydrates_candidates(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["directors"] = "nolan"
+
+    results = db.database_lookup(dialogue_state, domain)
+    candidate = results[0]
+    item = results.hydrate(candidate)
+
+    assert set(candidate) == {"rowid", "ID", "title", "imdb_rating"}
+    assert item["title"] == "The Dark Knight"
+    assert item["directors"] == "Christopher Nolan"
+    assert results.hydrate(candidate) is item
+    assert db.item_store.get_stats()["hits"] >= 1
+
+
+def test_result_cursor(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    results = db.database_lookup(dialogue_state, domain)
+    results.page_size = 1
+    cursor = ResultCursor()
+    recommended = {}
+
+    titles = []
+    while True:
+        result = cursor.next_item(results, recommended)
+        if result is None:
+            break
+        titles.append(result["title"])
+        recommended[result["title"]] = []
+
+    assert titles == [r["title"] for r in results]
+    assert cursor.position == 4
+    # A new exclusion set starts from the first result.
+    assert cursor.next_item(results, {})["title"] == titles[0]
+    assert cursor.next_item([{"title": "Avatar"}], {"Avatar": []}) is None
+
+
+def test_database_lookup_narrows_results(
+    movies_db_path: str,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+    monkeypatch,
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    db.database_lookup(dialogue_state, domain)
+
+    def lookup(predicates):
+        raise AssertionError("Narrowed lookups must not query the database.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db, "_lookup", lookup)
+        dialogue_state.frame_CIN["actors"] = "tom hank"
+        actors = db.database_lookup(dialogue_state, domain)
+        dialogue_state.frame_CIN["year"] = "> 1995"
+        year = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in actors] == [
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+    assert [r["title"] for r in year] == ["Saving Private Ryan"]
+    assert year.hydrate(year[0])["directors"] == "Steven Spielberg"
+
+
+def test_database_lookup_does_not_narrow_removals(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "tom hank"
+    db.database_lookup(dialogue_state, domain)
+
+    dialogue_state.frame_CIN["actors"] = ""
+    dialogue_state.frame_CIN["keywords"] = ".NOT.prison"
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == [
+        "The Dark Knight",
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+
+
+def test_state_tracker_skips_stale_rowids(
+    movies_db_path: str, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    tracker = DialogueStateTracker(
+        {"domain": domain, "slots": domain.slots_annotation}, False
+    )
+    tracker.initialize()
+    tracker.dialogue_state.agent_req_filled = True
+    rows = [
+        {"rowid": 999999, "title": "Removed Movie"},
+        db.top_lists.get(Counter(), db.catalog_version)[0],
+    ]
+
+    tracker.update_state_db(LookupResult.from_rows(rows, db.item_store))
+
+    assert tracker.dialogue_state.item_in_focus["title"] == (
+        "The Shawshank Redemption"
+    )
+    assert tracker.dialogue_state.agent_should_make_offer
+
+
+def test_iter_items_skips_stale_rowids(movies_db_path: str) -> None:
+    db = DataBase(movies_db_path)
+    rows = [
+        {"rowid": 999999, "title": "Removed Movie"},
+        db.top_lists.get(Counter(), db.catalog_version)[0],
+    ]
+
+    results = LookupResult.from_rows(rows, db.item_store)
+
+    assert results.hydrate(rows[0]) is None
+    assert [item["title"] for item in iter_items(results)] == [
+        "The Shawshank Redemption"
+    ]
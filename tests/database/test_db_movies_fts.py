@@ -0,0 +1,71 @@
+"""Tests for the FTS5-backed movie database."""
+
+import pytest
+
+from moviebot.database.db_movies_fts import (
+    FTSDataBase,
+    build_fts_index,
+    get_fts_phrase,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+
+@pytest.fixture
+def fts_db(movies_db_path: str) -> FTSDataBase:
+    build_fts_index(movies_db_path, "movies")
+    return FTSDataBase(movies_db_path)
+
+
+def test_missing_index(movies_db_path: str) -> None:
+    with pytest.raises(ValueError):
+        FTSDataBase(movies_db_path)
+
+
+def test_get_fts_phrase() -> None:
+    assert get_fts_phrase("actors", "tom hank") == 'actors : "tom hank" *'
+    assert get_fts_phrase("title", 'say "hi"') == 'title : "say ""hi""" *'
+
+
+@pytest.mark.parametrize(
+    "frame, expected",
+    [
+        (
+            {"genres": ["drama"], "actors": "tom hank"},
+            ["Forrest Gump", "Saving Private Ryan"],
+        ),
+        (
+            {"genres": ["drama", ".NOT.war"], "actors": "tom hank"},
+            ["Forrest Gump"],
+        ),
+        ({"genres": [".NOT.drama", ".NOT.action"]}, ["Toy Story"]),
+        ({"keywords": "friendship", "year": "> 1994"}, ["Toy Story"]),
+        (
+            {"directors": "christopher nolan", "year": ".NOT.2010"},
+            ["The Dark Knight"],
+        ),
+    ],
+)
+def test_database_lookup(
+    fts_db: FTSDataBase,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+    frame,
+    expected,
+) -> None:
+    dialogue_state.frame_CIN.update(frame)
+
+    results = fts_db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == expected
+
+
+def test_database_lookup_similar(
+    fts_db: FTSDataBase, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    dialogue_state.agent_should_offer_similar = True
+    dialogue_state.similar_movies = {"Star Wars": ["Avatar", "Inception"]}
+
+    results = fts_db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == ["Inception", "Avatar"]
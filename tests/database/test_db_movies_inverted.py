@@ -0,0 +1,102 @@
+"""Tests for the inverted index movie database."""
+
+import sqlite3
+
+import pytest
+
+from moviebot.database.db_movies_inverted import (
+    InvertedIndexDataBase,
+    build_slot_value_tables,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.slot_values import split_slot_value
+
+SLOT_VALUES = {"actors": {"Tom Hanks": "tom hank"}}
+
+
+def mock_normalize(value: str) -> str:
+    """Returns a mocked normalized value."""
+    value = value.lower()
+    return "tom hank" if value == "tom hanks" else value
+
+
+@pytest.fixture
+def inverted_db(movies_db_path: str) -> InvertedIndexDataBase:
+    build_slot_value_tables(
+        movies_db_path, "movies", SLOT_VALUES, normalize=mock_normalize
+    )
+    return InvertedIndexDataBase(movies_db_path, normalize=mock_normalize)
+
+
+def test_missing_tables(movies_db_path: str) -> None:
+    with pytest.raises(ValueError):
+        InvertedIndexDataBase(movies_db_path, normalize=mock_normalize)
+
+
+def test_split_slot_value() -> None:
+    assert split_slot_value("genres", "Drama, War") == ["drama", "war"]
+    assert split_slot_value("actors", "Tom Hanks, Tim Allen") == [
+        "Tom Hanks",
+        "Tim Allen",
+    ]
+    assert split_slot_value("actors", None) == []
+
+
+def test_slot_value_tables(
+    movies_db_path: str, inverted_db: InvertedIndexDataBase
+) -> None:
+    connection = sqlite3.connect(movies_db_path)
+    movie_ids = connection.execute(
+        "SELECT movie_id FROM movie_actors WHERE value_norm = 'tom hank';"
+    ).fetchall()
+    assert len(movie_ids) == 4
+    assert inverted_db.count_postings("genres", "drama") == 4
+    assert inverted_db.count_postings("genres", "western") == 0
+
+
+@pytest.mark.parametrize(
+    "frame, expected",
+    [
+        (
+            {"genres": ["drama"], "actors": "Tom Hanks"},
+            ["Forrest Gump", "Saving Private Ryan"],
+        ),
+        (
+            {"genres": ["drama", ".NOT.war"], "actors": "tom hanks"},
+            ["Forrest Gump"],
+        ),
+        ({"keywords": "war"}, ["Avatar"]),
+        ({"keywords": "friendship", "year": "> 1994"}, ["Toy Story"]),
+        # Partial values fall back to substring matching.
+        ({"directors": "nolan"}, ["The Dark Knight", "Inception"]),
+    ],
+)
+def test_database_lookup(
+    inverted_db: InvertedIndexDataBase,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+    frame,
+    expected,
+) -> None:
+    dialogue_state.frame_CIN.update(frame)
+
+    results = inverted_db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == expected
+
+
+def test_join_order(
+    inverted_db: InvertedIndexDataBase,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["keywords"] = "prison"
+
+    predicates = inverted_db.get_sql_predicates(dialogue_state, domain)
+
+    assert predicates[0].params == ("prison", "drama")
+    assert "movie_keywords AS t0 CROSS JOIN movie_genres AS t1" in (
+        predicates[0].template
+    )
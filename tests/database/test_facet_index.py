@@ -0,0 +1,121 @@
+"""Tests for the facet counts over candidate movies."""
+
+import numpy as np
+import pytest
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.facet_index import (
+    FacetIndex,
+    SlotFacet,
+    get_decade,
+    get_facet_index,
+    get_year_mask,
+)
+from moviebot.database.lookup_result import get_rowids
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+
+@pytest.fixture
+def db(movies_db_path: str) -> DataBase:
+    return DataBase(movies_db_path)
+
+
+def test_slot_facet_count() -> None:
+    facet = SlotFacet([["a", "b"], [], ["b"], ["c", "a", "a"]])
+
+    assert list(facet.values) == ["a", "b", "c"]
+    assert facet.count(np.array([0, 1, 2, 3])).tolist() == [2, 2, 1]
+    assert facet.count(np.array([3, 1])).tolist() == [1, 0, 1]
+    assert facet.count(np.array([], dtype=np.int64)).tolist() == [0, 0, 0]
+
+
+def test_slot_facet_matches() -> None:
+    facet = SlotFacet([["Tom Hanks", "Matt Damon"], [], ["Tom Cruise"]])
+
+    assert facet.matches(np.array([0, 1, 2]), "tom").tolist() == [
+        True,
+        False,
+        True,
+    ]
+    assert facet.matches(np.array([2, 0]), "hanks").tolist() == [False, True]
+
+
+def test_get_year_mask() -> None:
+    years = np.array([1977, 1994, 2010, -1])
+
+    assert get_year_mask(years, "> 1990").tolist() == [0, 1, 1, 0]
+    assert get_year_mask(years, "BETWEEN 1990 AND 2000").tolist() == [
+        0,
+        1,
+        0,
+        0,
+    ]
+
+
+def test_get_decade() -> None:
+    assert get_decade(1994) == "1990s"
+    assert get_decade("2008") == "2000s"
+    assert get_decade(None) is None
+
+
+def test_get_rowids(
+    db: DataBase, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert sorted(get_rowids(results).tolist()) == sorted(
+        result["rowid"] for result in results
+    )
+    assert get_rowids([{"rowid": 3}, {"title": "Avatar"}]).tolist() == [3]
+
+
+def test_histogram(
+    db: DataBase, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    facet_index = get_facet_index(db.connection_pool)
+    dialogue_state.frame_CIN["actors"] = "Tom Hanks"
+    rowids = get_rowids(db.database_lookup(dialogue_state, domain))
+
+    genres = facet_index.get_histogram(rowids, "genres", 2)
+    assert genres[0] == ("drama", 2)
+    assert genres[1][1] == 1
+    assert len(facet_index.get_histogram(rowids, "genres")) == 6
+    assert facet_index.get_histogram(rowids, "year") == [("1990s", 3)]
+    assert facet_index.get_histogram(rowids, "plot") == []
+    # Unknown row ids are ignored.
+    counts = facet_index.get_counts(np.array([10**6]), ["year"])
+    assert counts["year"].sum() == 0
+
+
+def test_information_gain(
+    db: DataBase, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    facet_index = FacetIndex(db.connection_pool)
+    dialogue_state.frame_CIN["actors"] = "Tom Hanks"
+    rowids = get_rowids(db.database_lookup(dialogue_state, domain))
+
+    gains = facet_index.get_information_gain(
+        rowids, ["year", "directors", "genres"]
+    )
+
+    # All candidates are from the 1990s, and they all have other directors.
+    assert gains["year"] == 0
+    assert gains["directors"] == pytest.approx(np.log2(3))
+    assert 0 < gains["genres"] < gains["directors"]
+    assert facet_index.get_information_gain(np.array([]), ["year"]) == {
+        "year": 0.0
+    }
+
+
+def test_filter(db: DataBase) -> None:
+    facet_index = FacetIndex(db.connection_pool)
+    rowids = np.arange(1, 10)
+
+    mask = facet_index.filter(rowids, [("genres", "drama"), ("year", "< 2000")])
+
+    assert mask.sum() == 3
+    assert facet_index.can_filter("actors", "tom hank")
+    assert not facet_index.can_filter("actors", "tom, hank")
+    assert not facet_index.can_filter("title", "avatar")
@@ -0,0 +1,172 @@
+"""Tests for the query time budget."""
+
+import itertools
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from moviebot.database import query_budget
+from moviebot.database.db_movies import DataBase
+from moviebot.database.query_budget import QueryBudget, QueryTimeoutError
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+    "SELECT max(i) FROM (SELECT i FROM n LIMIT 100000000);"
+)
+
+
+def test_query_budget_records_steps() -> None:
+    connection = sqlite3.connect(":memory:")
+    budget = QueryBudget(time_budget=10, progress_steps=100)
+
+    value, vm_steps = budget.run(
+        connection,
+        lambda: connection.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+            "SELECT max(i) FROM (SELECT i FROM n LIMIT 10000);"
+        ).fetchone()[0],
+    )
+
+    assert value == 10000
+    assert vm_steps > 10000
+    assert budget.get_stats() == {
+        "queries": 1,
+        "interrupted": 0,
+        "vm_steps": vm_steps,
+    }
+
+
+def test_query_budget_interrupts_query() -> None:
+    connection = sqlite3.connect(":memory:")
+    budget = QueryBudget(time_budget=0.01)
+
+    with pytest.raises(QueryTimeoutError):
+        budget.run(
+            connection, lambda: connection.execute(SLOW_QUERY).fetchone()
+        )
+
+    assert budget.get_stats()["interrupted"] == 1
+    # The connection can still be used, without progress handler.
+    assert connection.execute("SELECT 1;").fetchone() == (1,)
+
+
+def test_query_budget_timer_is_shared_by_steps() -> None:
+    connection = sqlite3.connect(":memory:")
+    budget = QueryBudget(time_budget=10)
+    timer = budget.start()
+
+    budget.run(
+        connection,
+        lambda: connection.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+            "SELECT max(i) FROM (SELECT i FROM n LIMIT 10000);"
+        ).fetchone(),
+        timer,
+    )
+    elapsed = timer.elapsed
+    budget.run(connection, lambda: connection.execute("SELECT 1;"), timer)
+
+    assert 0 < elapsed < timer.elapsed
+    assert timer.remaining == 10 - timer.elapsed
+
+    # Once the budget is used up, the following steps are not run.
+    timer.elapsed = 10
+    with pytest.raises(QueryTimeoutError):
+        budget.run(
+            connection,
+            lambda: pytest.fail("Steps of an expired lookup must not run."),
+            timer,
+        )
+    assert budget.get_stats()["interrupted"] == 1
+
+
+def test_query_budget_reraises_other_errors() -> None:
+    connection = sqlite3.connect(":memory:")
+
+    with pytest.raises(sqlite3.OperationalError):
+        QueryBudget().run(
+            connection, lambda: connection.execute("SELECT * FROM missing;")
+        )
+
+
+def test_interrupted_lookup_degrades(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    db.query_budget = QueryBudget(time_budget=1e-9, progress_steps=1)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["keywords"] = ".NOT.prison"
+    dialogue_state.frame_CIN["actors"] = "tom hank"
+
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == [
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+    assert results.degraded
+    assert results.vm_steps > 0
+    assert results.hydrate(results[0])["title"] == "Forrest Gump"
+
+    db.current_CIN = None
+    db.query_budget = QueryBudget(progress_steps=10)
+    results = db.database_lookup(dialogue_state, domain)
+
+    # Degraded results are not reused from the result cache.
+    assert db.result_cache.get_stats()["degraded"] >= 1
+    assert not results.degraded
+    assert len(results) == 2
+    assert results.vm_steps > 0
+
+
+def test_shared_result_budget_is_per_step(
+    movies_db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Every query step takes 0.4 seconds of a 1 second budget.
+    clock = itertools.count(0, 0.4)
+    monkeypatch.setattr(
+        query_budget, "time", SimpleNamespace(monotonic=lambda: next(clock))
+    )
+    db = DataBase(movies_db_path)
+    db.query_budget = QueryBudget(time_budget=1, progress_steps=10**9)
+    results = db._lookup([])
+    results.page_size = 1
+
+    # An earlier session reads a few pages of the shared result, spending
+    # more than one budget in total.
+    assert [r["title"] for r in itertools.islice(results, 4)] == [
+        "The Shawshank Redemption",
+        "The Dark Knight",
+        "Forrest Gump",
+        "Inception",
+    ]
+
+    # Movies rated 5 or lower are not recommended.
+    assert len(list(results)) == 8
+    assert len(results) == 8
+    assert len(results.get_rowids()) == 8
+    assert not results.degraded
+    assert db.query_budget.get_stats()["interrupted"] == 0
+
+
+def test_degraded_results_are_not_narrowed(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    db.query_budget = QueryBudget(time_budget=1e-9, progress_steps=1)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "tom hank"
+    assert list(db.database_lookup(dialogue_state, domain))
+    assert db.backup_db_results.degraded
+
+    db.query_budget = QueryBudget(progress_steps=10)
+    dialogue_state.frame_CIN["keywords"] = "soldier"
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == ["Saving Private Ryan"]
+    # The results were queried, not narrowed down from degraded results.
+    assert results.vm_steps > 0
+    assert not results.degraded
@@ -0,0 +1,123 @@
+"""Tests for the parameterized query builder."""
+
+import pytest
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.query_builder import (
+    Predicate,
+    QueryBuilder,
+    get_slot_predicate,
+    get_titles_predicate,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+
+@pytest.mark.parametrize(
+    "slot, value, expected",
+    [
+        ("genres", "drama", Predicate("genres LIKE ?", ("%drama%",))),
+        ("genres", ".NOT.drama", Predicate("genres NOT LIKE ?", ("%drama%",))),
+        ("title", 'say "hi"', Predicate("title LIKE ?", ('%say "hi"%',))),
+        ("year", "1994", Predicate("year = ?", (1994,))),
+        (
+            "year",
+            ".NOT.1994",
+            Predicate("(year < ? OR year > ?)", (1994, 1994)),
+        ),
+        ("year", "> 2010", Predicate("year > ?", (2010,))),
+        ("year", ".NOT.> 2010", Predicate("year < ?", (2010,))),
+        (
+            "year",
+            "BETWEEN 1990 AND 2000",
+            Predicate("year BETWEEN ? AND ?", (1990, 2000)),
+        ),
+        (
+            "year",
+            ".NOT.BETWEEN 1990 AND 2000",
+            Predicate("(year < ? OR year > ?)", (1990, 2000)),
+        ),
+    ],
+)
+def test_get_slot_predicate(slot: str, value: str, expected: Predicate) -> None:
+    assert get_slot_predicate(slot, value) == expected
+
+
+def test_get_titles_predicate() -> None:
+    assert get_titles_predicate([]) is None
+    assert get_titles_predicate(["Avatar", "Inception"]) == Predicate(
+        "title IN (?, ?)", ("Avatar", "Inception")
+    )
+
+
+def test_statement_cache() -> None:
+    builder = QueryBuilder("movies")
+    statement, params = builder.build_select(
+        [get_slot_predicate("genres", "drama")]
+    )
+    assert params == ["%drama%"]
+    same_statement, params = builder.build_select(
+        [get_slot_predicate("genres", "comedy")]
+    )
+    assert same_statement is statement
+    assert params == ["%comedy%"]
+    builder.build_select([get_slot_predicate("year", "1994")])
+
+    assert builder.get_stats() == {"statements": 2, "hits": 1, "misses": 2}
+
+
+def test_statement_cache_eviction() -> None:
+    builder = QueryBuilder("movies", cache_size=1)
+    builder.build_select([get_slot_predicate("genres", "drama")])
+    builder.build_select([get_slot_predicate("year", "1994")])
+    builder.build_select([get_slot_predicate("genres", "drama")])
+
+    assert builder.get_stats() == {"statements": 1, "hits": 0, "misses": 3}
+
+
+def test_build_count() -> None:
+    builder = QueryBuilder("movies")
+    predicates = [get_slot_predicate("genres", "drama")]
+    count_statement, params = builder.build_count(predicates)
+
+    assert count_statement != builder.build_select(predicates)[0]
+    assert count_statement.endswith("LIMIT ?);")
+    assert params == ["%drama%"]
+
+
+def test_database_lookup_year_and_negation(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama", ".NOT.romance"]
+    dialogue_state.frame_CIN["year"] = "BETWEEN 1990 AND 2000"
+
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == [
+        "The Shawshank Redemption",
+        "Saving Private Ryan",
+    ]
+
+
+def test_database_lookup_value_with_quotes(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.frame_CIN["title"] = 'the "dark" knight'
+
+    assert list(db.database_lookup(dialogue_state, domain)) == []
+
+
+def test_database_lookup_similar(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    dialogue_state.agent_should_offer_similar = True
+    dialogue_state.similar_movies = {
+        "Star Wars": ["Avatar", "Bad Comedy", "Inception"]
+    }
+
+    results = db.database_lookup(dialogue_state, domain)
+
+    assert [r["title"] for r in results] == ["Inception", "Avatar"]
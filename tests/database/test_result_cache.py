@@ -0,0 +1,109 @@
+"""Tests for the result cache shared by dialogue sessions."""
+
+import threading
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.result_cache import ResultCache, get_result_cache_key
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.time = 0.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def test_get_result_cache_key_is_canonical() -> None:
+    key = get_result_cache_key(
+        "DataBase", "db", [("genres", "drama"), ("year", "1994")]
+    )
+
+    assert key == get_result_cache_key(
+        "DataBase", "db", [("year", "1994"), ("genres", "drama")]
+    )
+    assert key != get_result_cache_key("FTSDataBase", "db", [])
+
+
+def test_result_cache_ttl_and_version() -> None:
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.put("a", "v1", [{"title": "A"}])
+    cache.put("b", "v1", [{"title": "B"}])
+
+    assert cache.get("a", "v1") == [{"title": "A"}]
+    assert cache.get("a", "v2") is None
+    clock.time = 10
+    assert cache.get("b", "v1") is None
+    assert cache.get_stats() == {
+        "entries": 0,
+        "bytes": 0,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "expirations": 1,
+        "invalidations": 1,
+        "degraded": 0,
+    }
+
+
+def test_result_cache_evicts_least_recently_used() -> None:
+    results = [{"title": "A"}]
+    cache = ResultCache()
+    cache.put("a", "v1", results)
+    cache.max_bytes = cache.get_stats()["bytes"] * 2
+    cache.put("b", "v1", results)
+    cache.get("a", "v1")
+    cache.put("c", "v1", results)
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") is results
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_database_lookup_shares_results_between_sessions(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    session_db = DataBase(movies_db_path)
+    session_db.result_cache = ResultCache()
+    dialogue_state.frame_CIN["genres"] = ["drama", "war"]
+    results = session_db.database_lookup(dialogue_state, domain)
+
+    other_session_db = DataBase(movies_db_path)
+    other_session_db.result_cache = session_db.result_cache
+    dialogue_state.frame_CIN["genres"] = ["war", "drama"]
+
+    assert other_session_db.database_lookup(dialogue_state, domain) is results
+    assert other_session_db.backup_db_results is results
+    assert session_db.result_cache.get_stats()["hits"] == 1
+
+
+def test_shared_results_fetch_on_calling_thread(
+    movies_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(movies_db_path)
+    db.result_cache = ResultCache()
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "tom hank"
+    results = db.database_lookup(dialogue_state, domain)
+    results.page_size = 1
+    connections = []
+
+    def fetch_second() -> None:
+        connections.append(db.sql_connection)
+        connections.append(results[1]["title"])
+
+    assert results[0]["title"] == "Forrest Gump"
+    thread = threading.Thread(target=fetch_second)
+    thread.start()
+    thread.join()
+
+    assert connections[0] is not db.sql_connection
+    assert connections[1] == "Saving Private Ryan"
+    assert [r["title"] for r in results] == [
+        "Forrest Gump",
+        "Saving Private Ryan",
+    ]
+    assert db.sql_connection not in results._cursors
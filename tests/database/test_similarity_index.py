@@ -0,0 +1,56 @@
+"""Tests for the item-to-item similarity index."""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.similarity_index import (
+    BYTES_PER_SCORE,
+    build_similarity_index,
+    get_block_size,
+    get_similarity_index,
+    get_top_k,
+)
+
+
+@pytest.mark.parametrize(
+    "max_block_bytes", [1, 3 * 4 * BYTES_PER_SCORE, 2**20]
+)
+def test_get_top_k(max_block_bytes: int) -> None:
+    matrix = sparse.csr_matrix(
+        np.array([[1, 0], [0.6, 0.8], [0, 1], [1, 0]], dtype=np.float32)
+    )
+
+    top_k = get_top_k(matrix, 2, max_block_bytes)
+
+    assert [[j for j, _ in similar] for similar in top_k] == [
+        [3, 1],
+        [2, 0],
+        [1],
+        [0, 1],
+    ]
+    assert top_k[0][0][1] == 1.0
+
+
+def test_get_block_size() -> None:
+    assert get_block_size(1000, 1000 * BYTES_PER_SCORE * 256) == 256
+    assert get_block_size(4000, 1000 * BYTES_PER_SCORE * 256) == 64
+    assert get_block_size(10**9, 2**20) == 1
+
+
+def test_similarity_index(movies_db_path: str) -> None:
+    db = DataBase(movies_db_path)
+    assert get_similarity_index(db) is None
+
+    build_similarity_index(movies_db_path, "movies", k=3)
+    similarity_index = get_similarity_index(db)
+
+    assert similarity_index.get_similar_titles("tt1375666", 1) == [
+        "The Dark Knight"
+    ]
+    assert similarity_index.get_similar_titles("tt0120815", 1) == [
+        "Forrest Gump"
+    ]
+    assert len(similarity_index.get_similar_titles("tt0109830")) == 3
+    assert similarity_index.get_similar_titles("unknown") == []
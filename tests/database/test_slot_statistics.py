@@ -0,0 +1,166 @@
+"""Tests for the slot value statistics."""
+
+import sqlite3
+
+import pytest
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.db_movies_inverted import (
+    InvertedIndexDataBase,
+    build_slot_value_tables,
+)
+from moviebot.database import slot_statistics
+from moviebot.database.query_builder import EMPTY_PREDICATE
+from moviebot.database.slot_statistics import (
+    SlotStatistics,
+    build_slot_statistics,
+    get_slot_statistics,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+
+
+@pytest.fixture
+def statistics_db_path(movies_db_path: str, domain: MovieDomain) -> str:
+    """Returns the path to a small movie catalog with slot statistics."""
+    build_slot_statistics(movies_db_path, "movies", domain.slots_annotation)
+    return movies_db_path
+
+
+@pytest.fixture
+def statistics(statistics_db_path: str) -> SlotStatistics:
+    return DataBase(statistics_db_path).slot_statistics
+
+
+def test_get_slot_statistics(movies_db_path: str) -> None:
+    assert DataBase(movies_db_path).slot_statistics is None
+
+
+def test_get_frequency(statistics: SlotStatistics) -> None:
+    assert statistics.total == 9
+    assert statistics.get_frequency("genres", "drama") == 4
+    assert statistics.get_frequency("actors", "tom hanks") == 4
+    assert statistics.get_frequency("year", "1994") == 2
+    assert statistics.get_frequency("actors", "Nobody") == 0
+    assert statistics.get_top_values("genres", 2) == [
+        ("action", 4),
+        ("adventure", 4),
+    ]
+
+
+@pytest.mark.parametrize(
+    "slot, value, expected",
+    [
+        ("genres", "drama", 4),
+        ("genres", ".NOT.drama", 5),
+        ("keywords", "war", 1),
+        ("keywords", "vietnam", 1),
+        ("keywords", "zombie", 0),
+        ("year", "1994", 2),
+        ("year", "BETWEEN 1990 AND 2000", 4),
+        ("year", "> 2008", 3),
+        ("year", ".NOT.1994", None),
+        ("plot", "joker", None),
+    ],
+)
+def test_estimate(
+    statistics: SlotStatistics, slot: str, value: str, expected: int
+) -> None:
+    assert statistics.estimate(slot, value) == expected
+
+
+def test_estimate_substring_is_cached(statistics: SlotStatistics) -> None:
+    statements = []
+    statistics.connection_pool.get_connection().set_trace_callback(
+        statements.append
+    )
+
+    assert statistics.estimate("keywords", "vietnam") == 1
+    assert statistics.estimate("keywords", ".NOT.Vietnam") == 8
+    assert sum("LIKE" in statement for statement in statements) == 1
+
+
+def test_predicates_ordered_by_selectivity(
+    statistics_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(statistics_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "Matt Damon"
+    dialogue_state.frame_CIN["year"] = "> 1950"
+
+    predicates = db.get_sql_predicates(dialogue_state, domain)
+
+    assert [predicate.params[0] for predicate in predicates] == [
+        "%Matt Damon%",
+        "%drama%",
+        1950,
+    ]
+    # The year range matches most movies and does not use the year index.
+    assert predicates[-1].template == "+year > ?"
+    assert [r["title"] for r in db.database_lookup(dialogue_state, domain)] == [
+        "Saving Private Ryan"
+    ]
+
+
+def test_unmatched_constraint(
+    statistics_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    db = DataBase(statistics_db_path)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["keywords"] = "zombie"
+
+    assert db.get_sql_predicates(dialogue_state, domain) == [EMPTY_PREDICATE]
+    assert db.database_lookup(dialogue_state, domain) == []
+
+    dialogue_state.frame_CIN["keywords"] = ".NOT.zombie"
+    assert len(db.database_lookup(dialogue_state, domain)) == 4
+
+
+def test_stale_statistics_ignored(
+    statistics_db_path: str, dialogue_state: DialogueState, domain: MovieDomain
+) -> None:
+    # A movie added after the statistics were counted: they would estimate
+    # that no movie matches and return nothing.
+    connection = sqlite3.connect(statistics_db_path)
+    with connection:
+        connection.execute(
+            "INSERT INTO movies (ID, title, genres, keywords, imdb_rating) "
+            "VALUES ('tt0063350', 'Night of the Living Dead', 'Horror', "
+            "'zombie', 7.8);"
+        )
+    connection.close()
+    db = DataBase(statistics_db_path)
+    dialogue_state.frame_CIN["keywords"] = "zombie"
+
+    assert db.slot_statistics is None
+    assert db.get_sql_predicates(dialogue_state, domain) != [EMPTY_PREDICATE]
+    assert [r["title"] for r in db.database_lookup(dialogue_state, domain)] == [
+        "Night of the Living Dead"
+    ]
+
+    build_slot_statistics(statistics_db_path, "movies", domain.slots_annotation)
+    statistics = DataBase(statistics_db_path).slot_statistics
+    assert statistics.is_current()
+    assert statistics.estimate("keywords", "zombie") == 1
+
+
+def test_inverted_index_scan(
+    statistics_db_path: str,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(slot_statistics, "SCAN_SELECTIVITY", 0.3)
+    build_slot_value_tables(statistics_db_path, "movies", normalize=str.lower)
+    db = InvertedIndexDataBase(statistics_db_path, normalize=str.lower)
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["actors"] = "Matt Damon"
+
+    predicates = db.get_sql_predicates(dialogue_state, domain)
+
+    assert predicates[0].template.startswith("rowid IN")
+    assert predicates[1].template.startswith("EXISTS")
+    assert [r["title"] for r in db.database_lookup(dialogue_state, domain)] == [
+        "Saving Private Ryan"
+    ]
+    assert get_slot_statistics(db.connection_pool) is db.slot_statistics
@@ -0,0 +1,81 @@
+"""Tests for the precomputed top lists."""
+
+from collections import Counter
+
+import pytest
+
+from moviebot.database.db_movies import DataBase
+from moviebot.database.query_builder import get_slot_predicate
+from moviebot.database.top_lists import (
+    ALL_MOVIES,
+    get_decade_value,
+    get_list_key,
+    get_top_lists,
+)
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.nlu.annotation.values import Values
+
+
+@pytest.mark.parametrize(
+    "constraints, key",
+    [
+        ([], ALL_MOVIES),
+        ([("genres", " Drama")], ("genres", "drama")),
+        ([("year", "BETWEEN 1990 AND 2000")], ("year", "1990")),
+        ([("year", "BETWEEN 1990 AND 1995")], None),
+        ([("genres", ".NOT.drama")], None),
+        ([("genres", "drama"), ("year", "> 2000")], None),
+        ([("actors", "tom hanks")], None),
+    ],
+)
+def test_get_list_key(constraints, key) -> None:
+    assert get_list_key(Counter(constraints)) == key
+
+
+def test_get_list_key_without_substrings() -> None:
+    assert get_list_key(Counter([("genres", "drama")]), False) is None
+    assert get_list_key(Counter(), False) == ALL_MOVIES
+
+
+def test_top_lists_match_lookups(movies_db_path: str) -> None:
+    db = DataBase(movies_db_path)
+    top_lists = get_top_lists(db.connection_pool)
+    version = db.catalog_version
+    lookups = [
+        ("genres", genre)
+        for genre in ["drama", "action", "comedy", "sci-fi", "war"]
+    ] + [("year", get_decade_value(decade)) for decade in (1970, 1990, 2000)]
+
+    for slot, value in lookups:
+        expected = db._lookup([get_slot_predicate(slot, value)])
+        result = top_lists.get(Counter([(slot, value)]), version)
+        assert [r["title"] for r in result] == [r["title"] for r in expected]
+    assert len(top_lists.get(Counter(), version)) == len(db._lookup([]))
+
+
+def test_database_lookup_uses_top_lists(
+    movies_db_path: str,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+    monkeypatch,
+) -> None:
+    db = DataBase(movies_db_path)
+
+    def lookup(predicates):
+        raise AssertionError("Top lists must not query the database.")
+
+    monkeypatch.setattr(db, "_lookup", lookup)
+    dialogue_state.frame_CIN["genres"] = [Values.DONT_CARE]
+    results = db.database_lookup(dialogue_state, domain)
+    dialogue_state.frame_CIN["year"] = "BETWEEN 1990 AND 2000"
+    decade = db.database_lookup(dialogue_state, domain)
+
+    assert results[0]["title"] == "The Shawshank Redemption"
+    assert [r["title"] for r in decade] == [
+        "The Shawshank Redemption",
+        "Forrest Gump",
+        "Saving Private Ryan",
+        "Toy Story",
+    ]
+    assert decade.hydrate(decade[0])["year"] == 1994
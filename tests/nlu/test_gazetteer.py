@@ -0,0 +1,74 @@
+"""Tests for the token-level gazetteer."""
+
+import pytest
+
+from moviebot.nlu.annotation.gazetteer import (
+    Gazetteer,
+    GazetteerMatch,
+    get_gazetteer,
+)
+
+VALUES = [
+    "the godfather",
+    "the godfather part ii",
+    "the lion king",
+    "othello",
+    "the godfather",
+]
+
+
+@pytest.fixture
+def gazetteer() -> Gazetteer:
+    return Gazetteer(VALUES, max_length=3)
+
+
+def test_find_exact_and_partial(gazetteer: Gazetteer) -> None:
+    matches = gazetteer.find("one of the godfather movie".split())
+
+    assert matches == [
+        GazetteerMatch(2, 4, 2, True),
+        GazetteerMatch(2, 3, 3, False),
+        GazetteerMatch(3, 4, 2, False),
+    ]
+
+
+def test_find_longest_first(gazetteer: Gazetteer) -> None:
+    matches = gazetteer.find("othello or a lion king".split())
+
+    assert [(m.start, m.end) for m in matches] == [
+        (3, 5),
+        (0, 1),
+        (3, 4),
+        (4, 5),
+    ]
+    assert matches[1].exact
+    assert not matches[0].exact
+
+
+def test_find_follows_failure_links(gazetteer: Gazetteer) -> None:
+    # "godfather part" fails on "the", which starts "the lion king".
+    matches = gazetteer.find("godfather part the lion king".split())
+
+    assert (2, 5, 1, True) in matches
+    assert (0, 2, 1, False) in matches
+
+
+def test_find_truncates_long_values(gazetteer: Gazetteer) -> None:
+    matches = gazetteer.find("the godfather part ii".split())
+
+    assert max(m.end - m.start for m in matches) == 3
+    assert (0, 2, 2, True) in matches
+    assert not any(m.exact for m in matches if m.end - m.start == 3)
+
+
+def test_find_no_match(gazetteer: Gazetteer) -> None:
+    assert gazetteer.find("a weekend trip movie".split()) == []
+    assert gazetteer.find([]) == []
+
+
+def test_get_gazetteer_shared(tmp_path) -> None:
+    path = str(tmp_path / "slot_values.json")
+    gazetteer = get_gazetteer(path, "title", VALUES, 3)
+
+    assert get_gazetteer(path, "title", [], 3) is gazetteer
+    assert get_gazetteer(path, "keywords", [], 3) is not gazetteer
@@ -0,0 +1,67 @@
+"""Tests for the lemma lexicon of the tokenizer."""
+
+import json
+
+from moviebot.nlu.lemma_lexicon import (
+    build_lemma_lexicon,
+    iter_slot_value_texts,
+    iter_utterance_texts,
+)
+
+SLOT_VALUES = {
+    "title": {"Toy Story": "toy story"},
+    "genres": {"Dramas": "drama"},
+}
+UTTERANCES = "reveal:\n  - I like [movies](genres)\nbye:\n"
+
+
+def test_iter_slot_value_texts() -> None:
+    assert list(iter_slot_value_texts(SLOT_VALUES)) == [
+        "Toy Story",
+        "toy story",
+        "Dramas",
+        "drama",
+    ]
+
+
+def test_iter_utterance_texts() -> None:
+    utterances = {"reveal": ["I like [movies](genres)"], "bye": None}
+
+    assert list(iter_utterance_texts(utterances)) == ["I like [movies](genres)"]
+
+
+def test_build_lemma_lexicon(tmp_path) -> None:
+    slot_values_path = tmp_path / "slot_values.json"
+    slot_values_path.write_text(json.dumps(SLOT_VALUES))
+    utterances_path = tmp_path / "utterances.yaml"
+    utterances_path.write_text(UTTERANCES)
+    output_path = tmp_path / "lemma_lexicon.json"
+
+    lexicon = build_lemma_lexicon(
+        str(slot_values_path), str(utterances_path), str(output_path)
+    )
+
+    assert lexicon == {
+        "drama": "drama",
+        "dramas": "drama",
+        "genres": "genre",
+        "i": "i",
+        "like": "like",
+        "movies": "movie",
+        "story": "story",
+        "toy": "toy",
+    }
+    assert json.loads(output_path.read_text()) == lexicon
+
+
+def test_build_lemma_lexicon_missing_files(tmp_path) -> None:
+    output_path = tmp_path / "lemma_lexicon.json"
+
+    lexicon = build_lemma_lexicon(
+        str(tmp_path / "missing.json"),
+        str(tmp_path / "missing.yaml"),
+        str(output_path),
+    )
+
+    assert lexicon == {}
+    assert json.loads(output_path.read_text()) == {}
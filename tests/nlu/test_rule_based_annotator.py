@@ -229,6 +229,20 @@ def test__person_name_annotator_actor_and_director(
     assert result[0].value == "tom hank"
 
 
+def test_annotate(annotator: RBAnnotator) -> None:
+    utterance = UserUtterance("an action movie from the 90s with tom hank")
+    slots = ["genres", "actors", "directors", "year", "title"]
+
+    result = annotator.annotate(utterance, slots)
+
+    assert [(r.slot, r.value) for r in result] == [
+        ("genres", "action"),
+        ("directors", "tom hank"),
+        ("year", "BETWEEN 1990 AND 2000"),
+    ]
+    assert annotator.annotate(utterance, []) == []
+
+
 @pytest.mark.parametrize(
     "utterance",
     [
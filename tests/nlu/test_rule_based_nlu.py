@@ -111,6 +111,24 @@ def test_selected_option(nlu, dialogue_state, user_intent):
     assert dacts[0].intent == user_intent
 
 
+def test_selected_option_continue_recommendation(nlu, dialogue_state):
+    utterance = UserUtterance("selected option")
+    options = {
+        DialogueAct(UserIntents.CONTINUE_RECOMMENDATION): "selected option"
+    }
+    dialogue_state.item_in_focus = {"ID": "tt0111161", "title": "Heat"}
+    nlu.similarity_index = Mock()
+    nlu.similarity_index.get_similar_titles.return_value = ["Ronin"]
+
+    dacts = nlu.generate_dacts(utterance, options, dialogue_state)
+
+    assert len(dacts) == 1
+    assert dacts[0].params == [
+        ItemConstraint("title", Operator.EQ, str(["Ronin"]))
+    ]
+    nlu.similarity_index.get_similar_titles.assert_called_once_with("tt0111161")
+
+
 @pytest.mark.parametrize(
     "last_dacts, utterance, expected_intent",
     [
@@ -3,7 +3,13 @@ from typing import List
 
 import pytest
 
-from moviebot.nlu.text_processing import Token, Tokenizer
+from moviebot.nlu import text_processing
+from moviebot.nlu.text_processing import (
+    Token,
+    Tokenizer,
+    configure_tokenizer,
+    get_tokenizer,
+)
 
 
 @pytest.mark.parametrize(
@@ -40,3 +46,43 @@ def test_process_text(utterance: str, expected: List[Token]) -> None:
 
     assert len(result) == len(expected)
     assert all(r == e for r, e in zip(result, expected))
+
+
+def test_process_text_lexicon() -> None:
+    tp = Tokenizer(lexicon={"movies": "film", "dont": "do not"})
+    result = tp.process_text("Movies? I don't know")
+
+    assert [t.lemma for t in result] == ["film", "i", "do not", "know"]
+    assert result[2] == Token("don't", 10, 15, "do not", True)
+
+
+def test_lemmatize_text_cache() -> None:
+    tp = Tokenizer(lexicon={"movies": "film"}, cache_size=1)
+    tp.lemmatize_text("movies")
+    tp.lemmatize_text("tabs")
+    tp.lemmatize_text("Tabs")
+
+    cache_info = tp._lemmatize_unseen.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (1, 1)
+    assert cache_info.maxsize == 1
+
+
+def test_lemmatize_value() -> None:
+    tp = Tokenizer(lexicon={"war": "war", "star": "star"})
+
+    assert tp.lemmatize_value("Star Wars: Rogue's  Tales") == (
+        "star war rogue tale"
+    )
+
+
+def test_get_tokenizer(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # The tokenizer shared by the process is restored after the test.
+    monkeypatch.setattr(text_processing, "_tokenizer", None)
+    lexicon_path = tmp_path / "lemma_lexicon.json"
+    lexicon_path.write_text('{"movies": "film"}')
+
+    tokenizer = configure_tokenizer(str(lexicon_path))
+
+    assert get_tokenizer() is tokenizer
+    assert get_tokenizer().lemmatize_text("Movies") == "film"
+    assert configure_tokenizer(str(tmp_path / "missing.json")).lexicon == {}
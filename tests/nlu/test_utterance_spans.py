@@ -0,0 +1,60 @@
+"""Tests for the token features shared by the slot annotators."""
+
+import pytest
+
+from moviebot.nlu.annotation.utterance_spans import UtteranceSpans
+from moviebot.nlu.text_processing import Token
+
+
+@pytest.fixture
+def spans() -> UtteranceSpans:
+    text = "the lion king of 1994 or the 2nd"
+    tokens = []
+    for word in text.split():
+        start = text.index(word, tokens[-1].end if tokens else 0)
+        tokens.append(Token(word, start))
+    return UtteranceSpans(tokens, {"the", "of", "or"})
+
+
+def test_lemmas(spans: UtteranceSpans) -> None:
+    assert len(spans) == 8
+    assert spans.lemmas[:3] == ["the", "lion", "king"]
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [(0, 1, True), (0, 2, False), (3, 4, True), (5, 7, True), (6, 8, False)],
+)
+def test_is_stop(
+    spans: UtteranceSpans, start: int, end: int, expected: bool
+) -> None:
+    assert spans.is_stop(start, end) is expected
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [(1, 3, True), (0, 3, False), (2, 4, False), (4, 5, False), (7, 8, False)],
+)
+def test_is_content(
+    spans: UtteranceSpans, start: int, end: int, expected: bool
+) -> None:
+    assert spans.is_content(start, end) is expected
+
+
+def test_get_lemma(spans: UtteranceSpans) -> None:
+    assert spans.get_lemma(1, 2) == "lion"
+    assert spans.get_lemma(0, 3) == "the lion king"
+    assert spans.get_lemma(0, 3) is spans.get_lemma(0, 3)
+
+
+@pytest.mark.parametrize("start, end", [(1, 2), (0, 3), (2, 5)])
+def test_ngram_to_span(spans: UtteranceSpans, start: int, end: int) -> None:
+    ngram = spans.get_ngram(start, end)
+
+    assert len(ngram) == end - start
+    assert ngram.lemma == spans.get_lemma(start, end)
+    assert ngram.to_span() == sum(spans.tokens[start:end])
+
+
+def test_ngram_to_span_unigram(spans: UtteranceSpans) -> None:
+    assert spans.get_ngram(1, 2).to_span() is spans.tokens[1]
@@ -0,0 +1,73 @@
+"""Tests for the positional inverted index of slot values."""
+
+import pytest
+
+from moviebot.nlu.annotation.value_index import ValueIndex
+
+VALUES = ["tom hank", "tom hanson", "hank azaria", "tom hank"]
+
+
+@pytest.fixture
+def index() -> ValueIndex:
+    return ValueIndex(VALUES)
+
+
+@pytest.mark.parametrize(
+    "lemmas, count",
+    [
+        (["hank"], 2),
+        (["tom"], 2),
+        (["tom", "hank"], 1),
+        (["hank", "tom"], 0),
+        (["tom", "hank", "azaria"], 0),
+        (["azaria", "tom"], 0),
+        (["spielberg"], 0),
+        ([], 0),
+    ],
+)
+def test_get_postings(index: ValueIndex, lemmas, count: int) -> None:
+    assert index.count_values(index.get_postings(lemmas)) == count
+
+
+def test_get_postings_positions(index: ValueIndex) -> None:
+    postings = index.get_postings(["hank"])
+
+    assert [divmod(p, index.stride) for p in postings] == [(0, 1), (2, 0)]
+
+
+def test_extend(index: ValueIndex) -> None:
+    postings = index.get_postings(["tom"])
+
+    assert list(index.extend(postings, 1, "hanson")) == [index.stride]
+    assert len(index.extend(postings, 1, "azaria")) == 0
+    assert len(index.extend(postings, 1, "unknown")) == 0
+
+
+@pytest.mark.parametrize(
+    "prefix, tokens",
+    [
+        ("han", ["hank", "hanson"]),
+        ("hank", ["hank"]),
+        ("to", ["tom"]),
+        ("z", []),
+        ("", ["azaria", "hank", "hanson", "tom"]),
+    ],
+)
+def test_complete(index: ValueIndex, prefix: str, tokens) -> None:
+    assert index.complete(prefix) == tokens
+
+
+@pytest.mark.parametrize(
+    "lemmas, value_ids",
+    [
+        (["han"], [0, 1, 2]),
+        (["tom", "han"], [0, 1]),
+        (["tom", "hans"], [1]),
+        (["hank", "az"], [2]),
+        (["hanson", "tom"], []),
+        (["an"], []),
+        ([], []),
+    ],
+)
+def test_match(index: ValueIndex, lemmas, value_ids) -> None:
+    assert list(index.match(lemmas)) == value_ids
@@ -0,0 +1,121 @@
+"""Tests for the collaborative filtering recommender."""
+
+import numpy as np
+import pytest
+
+from moviebot.database.db_movies import DataBase
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.recommender.collaborative_filtering_recommender_model import (
+    CollaborativeFilteringRecommenderModel,
+)
+from moviebot.recommender.item_factors import (
+    ItemFactors,
+    train_item_factors,
+)
+from tests.database.conftest import create_movies_table
+
+LINKS = "movieId,imdbId,tmdbId\n1,120815,857\n2,109830,13\n3,111161,278\n"
+# Saving Private Ryan is rated best and The Shawshank Redemption worst. The
+# Dark Knight has no MovieLens id.
+RATINGS = [
+    (user, movie, rating)
+    for user in range(1, 21)
+    for movie, rating in ((1, 5.0), (2, 4.0), (3, 1.0))
+]
+
+
+@pytest.fixture
+def item_factors_path(tmp_path) -> str:
+    ratings_path = tmp_path / "ratings.csv"
+    ratings_path.write_text(
+        "userId,movieId,rating,timestamp\n"
+        + "".join(f"{u},{m},{r},0\n" for u, m, r in RATINGS)
+    )
+    links_path = tmp_path / "links.csv"
+    links_path.write_text(LINKS)
+    output_dir = str(tmp_path / "item_factors")
+    train_item_factors(
+        str(ratings_path), output_dir, str(links_path), n_factors=2
+    )
+    return output_dir
+
+
+@pytest.fixture
+def domain() -> MovieDomain:
+    return MovieDomain("data/movies_domain.yaml")
+
+
+@pytest.fixture
+def dialogue_state(domain: MovieDomain) -> DialogueState:
+    dialogue_state = DialogueState(domain, domain.slots_annotation, False)
+    dialogue_state.initialize()
+    return dialogue_state
+
+
+@pytest.fixture
+def recommender(
+    tmp_path, domain: MovieDomain, item_factors_path: str
+) -> CollaborativeFilteringRecommenderModel:
+    db_path = str(tmp_path / "movies_dbase.db")
+    create_movies_table(db_path)
+    return CollaborativeFilteringRecommenderModel(
+        DataBase(db_path), domain, item_factors_path
+    )
+
+
+def test_item_factors_memory_mapped(item_factors_path: str) -> None:
+    item_factors = ItemFactors(item_factors_path)
+
+    assert isinstance(item_factors.factors, np.memmap)
+    assert item_factors.factors.shape == (3, 2)
+    assert item_factors.get_index("tt0111161") == 1
+    assert item_factors.get_index("tt0468569") == -1
+    assert (
+        item_factors.biases[item_factors.get_index("tt0120815")]
+        > item_factors.biases[item_factors.get_index("tt0111161")]
+    )
+
+
+def test_item_factors_not_trained(tmp_path) -> None:
+    with pytest.raises(FileNotFoundError):
+        ItemFactors(str(tmp_path)).factors
+
+
+def test_recommend_items_ranks_candidates(
+    recommender: CollaborativeFilteringRecommenderModel,
+    dialogue_state: DialogueState,
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+
+    results = recommender.recommend_items(dialogue_state)
+
+    assert [r["title"] for r in results] == [
+        "Saving Private Ryan",
+        "Forrest Gump",
+        "The Shawshank Redemption",
+        "The Dark Knight",
+    ]
+    assert results.hydrate(results[0])["directors"] == "Steven Spielberg"
+    assert recommender.get_previous_recommend_items() is results
+    assert recommender.recommend_items(dialogue_state) is results
+
+
+def test_recommend_items_reranks_on_feedback(
+    recommender: CollaborativeFilteringRecommenderModel,
+    dialogue_state: DialogueState,
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    results = recommender.recommend_items(dialogue_state)
+
+    dialogue_state.movies_recommended["Saving Private Ryan"] = [
+        "reject",
+        "inquire",
+    ]
+
+    assert recommender.get_preferences(dialogue_state) == {
+        "Saving Private Ryan": -1.0
+    }
+    reranked = recommender.recommend_items(dialogue_state)
+    assert reranked is not results
+    assert {r["title"] for r in reranked} == {r["title"] for r in results}
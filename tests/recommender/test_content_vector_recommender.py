@@ -0,0 +1,157 @@
+"""Tests for the content-based recommender."""
+
+import pytest
+
+from moviebot.database.db_movies import DataBase
+from moviebot.dialogue_manager.dialogue_state import DialogueState
+from moviebot.domain.movie_domain import MovieDomain
+from moviebot.recommender.content_vector_recommender_model import (
+    ContentVectorRecommenderModel,
+    ItemFeatureIndex,
+)
+from tests.database.conftest import create_movies_table
+
+
+@pytest.fixture
+def domain() -> MovieDomain:
+    return MovieDomain("data/movies_domain.yaml")
+
+
+@pytest.fixture
+def dialogue_state(domain: MovieDomain) -> DialogueState:
+    dialogue_state = DialogueState(domain, domain.slots_annotation, False)
+    dialogue_state.initialize()
+    return dialogue_state
+
+
+@pytest.fixture
+def recommender(tmp_path, domain: MovieDomain) -> ContentVectorRecommenderModel:
+    db_path = str(tmp_path / "movies_dbase.db")
+    create_movies_table(db_path)
+    return ContentVectorRecommenderModel(DataBase(db_path), domain)
+
+
+def test_recommend_items_ranks_by_matches(
+    recommender: ContentVectorRecommenderModel, dialogue_state: DialogueState
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["drama", "war"]
+    dialogue_state.frame_CIN["actors"] = "tom hanks"
+
+    results = recommender.recommend_items(dialogue_state)
+
+    assert [r["title"] for r in results][:2] == [
+        "Saving Private Ryan",
+        "Forrest Gump",
+    ]
+    assert len(results) == 5
+    assert results.hydrate(results[0])["directors"] == "Steven Spielberg"
+    assert recommender.get_previous_recommend_items() is results
+    assert recommender.recommend_items(dialogue_state) is results
+
+
+def test_recommend_items_excludes_negations(
+    recommender: ContentVectorRecommenderModel, dialogue_state: DialogueState
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+    dialogue_state.frame_CIN["keywords"] = ".NOT.prison"
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert "The Shawshank Redemption" not in titles
+    assert titles[0] == "The Dark Knight"
+
+
+def test_recommend_items_by_decade(
+    recommender: ContentVectorRecommenderModel, dialogue_state: DialogueState
+) -> None:
+    dialogue_state.frame_CIN["year"] = "BETWEEN 1990 AND 2000"
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert titles == [
+        "The Shawshank Redemption",
+        "Forrest Gump",
+        "Saving Private Ryan",
+        "Toy Story",
+    ]
+
+
+def test_recommend_items_by_year(
+    recommender: ContentVectorRecommenderModel,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+) -> None:
+    dialogue_state.frame_CIN["year"] = "1994"
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert titles == [
+        r["title"]
+        for r in recommender._db.database_lookup(dialogue_state, domain)
+    ]
+    assert titles == ["The Shawshank Redemption", "Forrest Gump"]
+
+
+def test_recommend_items_excludes_years(
+    recommender: ContentVectorRecommenderModel,
+    dialogue_state: DialogueState,
+    domain: MovieDomain,
+) -> None:
+    dialogue_state.frame_CIN["year"] = ".NOT.1994"
+    dialogue_state.frame_CIN["genres"] = ["drama"]
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert titles == [
+        r["title"]
+        for r in recommender._db.database_lookup(dialogue_state, domain)
+    ]
+    assert titles == ["The Dark Knight", "Saving Private Ryan"]
+
+
+def test_recommend_items_by_title(
+    recommender: ContentVectorRecommenderModel, dialogue_state: DialogueState
+) -> None:
+    dialogue_state.frame_CIN["title"] = "incep"
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert titles == ["Inception"]
+
+
+def test_recommend_items_excludes_titles(
+    recommender: ContentVectorRecommenderModel, dialogue_state: DialogueState
+) -> None:
+    dialogue_state.frame_CIN["genres"] = ["action"]
+    dialogue_state.frame_CIN["title"] = ".NOT.the dark knight"
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert "The Dark Knight" not in titles
+    assert titles[0] == "Inception"
+
+
+@pytest.mark.parametrize("value", ["Tom Hanks", "tom hank", "hanks"])
+def test_recommend_items_matches_word_prefixes(
+    recommender: ContentVectorRecommenderModel,
+    dialogue_state: DialogueState,
+    value: str,
+) -> None:
+    dialogue_state.frame_CIN["actors"] = value
+
+    titles = [r["title"] for r in recommender.recommend_items(dialogue_state)]
+
+    assert titles == ["Forrest Gump", "Saving Private Ryan", "Toy Story"]
+
+
+def test_item_feature_index_reloads_changed_catalog(
+    recommender: ContentVectorRecommenderModel,
+) -> None:
+    index = ItemFeatureIndex(recommender._db)
+    items = index.load("v1")
+
+    assert index.load("v1") is items
+    assert index.load("v2") is not items
+    assert index.rank([("genres", "war")], "v2")[0]["title"] == (
+        "Saving Private Ryan"
+    )